@@ -1,11 +1,11 @@
 import os
 
 import io_manager
-from executor import Executor
+from analysis.generic_analysis import GenericAnalysis
 from report.generic_report import GenericReport
 
 
-class CompilerAnalysis(Executor):
+class CompilerAnalysis(GenericAnalysis):
     """
     Class of compiler-based tests
     """
@@ -21,6 +21,9 @@ class CompilerAnalysis(Executor):
             'flags': [],
         }
 
+        # Compile all sets of flags at once (if the code is not compiled inside the job scripts)
+        self.build_executables(list(range(num_tests)))
+
         for flag_id in range(num_tests):
             counter += 1
             self.report_start_of_test(counter, num_tests)
@@ -31,21 +34,23 @@ class CompilerAnalysis(Executor):
 
             # create temp directory with a working copy of sources
             tmp_dir_name = 'run' + postfix
-            self.create_wrk_copy(self.get_src_data(), tmp_dir_name)
+            self.create_wrk_copy(self.get_src_data(), tmp_dir_name, flag_id)
             full_tmp_path = os.path.join(self.get_full_wrk_dir_path(), tmp_dir_name)
-            batch_file_name = self.get_batch_data().generate_job_script(self.get_src_data(), full_tmp_path,
-                                                                        postfix, flag_id)
-
             # Repeat tests a given number of times
-            self.run_repetitive_tests(batch_file_name, full_tmp_path,
-                                      self._src_data.get_compiler_flags()[flag_id],
-                                      successful_jobs['id'], successful_jobs['dir'], successful_jobs['flags'])
+            self.run_test_case(full_tmp_path, postfix,
+                               self._src_data.get_compiler_flags()[flag_id],
+                               successful_jobs['id'], successful_jobs['dir'], successful_jobs['flags'],
+                               flag_id)
 
             self.report_end_of_test(counter, num_tests)
 
+        # Wait for the jobs that were submitted asynchronously
+        self.complete_sweep()
+
         report = GenericReport()
         flags, res = report.report_flags_results(self, self.get_src_data(), successful_jobs,
                                                  successful_jobs['flags'], 'compiler_flags')
+        spread = report.get_spread()
 
 
         self.write_results_to_log(successful_jobs, 
@@ -57,5 +62,9 @@ class CompilerAnalysis(Executor):
                                     {
                                         'name': 'results',
                                         'list': res
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
                                     }
                                 ])
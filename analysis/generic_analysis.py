@@ -1,6 +1,7 @@
 import os
-import json
 
+import io_manager
+import options_template
 from executor import Executor
 from report.generic_report import GenericReport
 
@@ -9,18 +10,38 @@ class GenericAnalysis(Executor):
     """
     Class of generic tests
     """
-    _log_file = 'output.log'
-
     def write_results_to_log(self, successful_jobs, results_dict):
+        """
+        Store the summary of the sweep in the results database and finish the sweep.
+        The next job will start a new sweep.
+        :param successful_jobs: Successful jobs of the sweep
+        :param results_dict: List of dictionaries with the 'name' and the 'list' of results
+        :return: None
+        """
         json_data = {}
         json_data['successful_jobs'] = successful_jobs
         json_data['results'] = results_dict
-        with open(self._log_file, 'w') as file:
-            file.write(json.dumps(json_data, indent=4))
+        self.get_results_db().finish_sweep(self.get_sweep_id(), json_data)
+        self._sweep_id = None
 
-    def scalability(self, cores_list, test_name, modify_batch_script=None, no_report=False):
+    def get_template_variables(self, num_cores):
+        """
+        :param num_cores: Number of cores/threads of the test case
+        :return: Dictionary with values of the variables of the 'executable_options' template:
+                 user defined variables, 'cores', 'nodes', 'tasks' and 'threads'
         """
-        Generic scalability test
+        variables = dict(self.get_batch_data().get_template_variables())
+        variables['cores'] = num_cores
+        variables['nodes'] = self.get_batch_data().get_nodes()
+        variables['tasks'] = self.get_batch_data().get_ntasks()
+        variables['threads'] = self.get_batch_data().get_cpus()
+        return variables
+
+    def scalability(self, cores_list, test_name, modify_batch_script=None, no_report=False, weak_scaling=False):
+        """
+        Generic scalability test. In the weak scaling mode the 'executable_options' are a
+        template that is evaluated for every test case (see get_template_variables()), so
+        the problem size can grow with the number of cores.
         :param cores_list: List of cores/threads
         :param test_name: Name of the test, e.g. 'omp'
         :param modify_envars: Function pointer to set environmnet variables before
@@ -30,6 +51,7 @@ class GenericAnalysis(Executor):
                            ('remove') from the internal list of envars
                            - one optional integer argumetn that indicates the current
                            test case number
+        :param weak_scaling: True for the weak scaling test
         """
         counter = 0
         num_tests = len(cores_list)
@@ -57,27 +79,40 @@ class GenericAnalysis(Executor):
             if modify_batch_script is not None:
                 modify_batch_script('set', num_cores)
 
-            batch_file_name = self.get_batch_data().generate_job_script(self.get_src_data(), full_tmp_path,
-                                                                        postfix)
+            exec_options = self.get_batch_data().get_exec_options()
+            if weak_scaling:
+                self.get_batch_data().set_exec_options(
+                    options_template.render(exec_options, self.get_template_variables(num_cores)))
+                io_manager.print_info('Executable options: ' + self.get_batch_data().get_exec_options())
+
+            # Repeat tests a given number of times
+            self.run_test_case(full_tmp_path, postfix, num_cores,
+                               local_successful_jobs['id'],
+                               local_successful_jobs['dir'],
+                               local_successful_jobs['cores'])
+
+            self.get_batch_data().set_exec_options(exec_options)
 
             if modify_batch_script is not None:
                 modify_batch_script('remove', num_cores)
 
-            # Repeat tests a given number of times
-            self.run_repetitive_tests(batch_file_name, full_tmp_path, num_cores,
-                                      local_successful_jobs['id'], 
-                                      local_successful_jobs['dir'], 
-                                      local_successful_jobs['cores'])
-
             self.report_end_of_test(counter, num_tests)
 
+        # Wait for the jobs that were submitted asynchronously
+        self.complete_sweep()
+
         successful_jobs.append(local_successful_jobs)
 
         cores = []
         res = []
+        spread = []
+        models = []
         if not no_report:
             report = GenericReport()
-            cores, res = report.report_parallel_results(self, self.get_src_data(), successful_jobs)
+            cores, res = report.report_parallel_results(self, self.get_src_data(), successful_jobs,
+                                                        weak_scaling=weak_scaling, fit_models=True)
+            spread = report.get_spread()
+            models = report.get_scaling_models()
 
         self.write_results_to_log(successful_jobs, 
                                 [
@@ -88,5 +123,13 @@ class GenericAnalysis(Executor):
                                     {
                                         'name': 'results',
                                         'list': res
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
+                                    },
+                                    {
+                                        'name': 'scaling_model',
+                                        'list': models
                                     }
                                 ])
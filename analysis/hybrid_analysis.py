@@ -0,0 +1,114 @@
+import os
+
+import io_manager
+from analysis.generic_analysis import GenericAnalysis
+from report.generic_report import GenericReport
+
+
+class HybridAnalysis(GenericAnalysis):
+    """
+    Class of hybrid MPI x OpenMP tests
+    """
+    def get_decompositions(self):
+        """
+        :return: List of tuples (tasks, threads) of the combinations of 'tasks_range' and
+                 'thread_range' that use one of the total numbers of cores of 'cores_range'
+                 (full nodes if it is not set) and fit into the nodes, sorted by the total
+                 number of cores
+        """
+        max_cores = self.get_batch_data().get_max_cores_pre_node()
+        cores_list = self.get_src_data().get_cores_list()
+        decompositions = []
+        for num_tasks in self.get_src_data().get_tasks_list():
+            for num_threads in self.get_src_data().get_threads_list():
+                num_cores = num_tasks * num_threads
+                if cores_list and num_cores not in cores_list:
+                    continue
+                if not cores_list and num_cores % max_cores != 0:
+                    continue
+                if self.get_batch_data().get_num_nodes(num_tasks, num_threads) == 0:
+                    io_manager.print_dbg_info('Skipping ' + str(num_tasks) + ' tasks x ' + str(num_threads)
+                                              + ' threads: a task does not fit into a node with '
+                                              + str(max_cores) + ' cores')
+                    continue
+                decompositions.append((num_tasks, num_threads))
+        return sorted(decompositions, key=lambda decomposition: decomposition[0] * decomposition[1])
+
+    def modify_decomposition(self, step, num_tasks=1, num_threads=1):
+        if step == 'set':
+            nodes = self.get_batch_data().get_num_nodes(num_tasks, num_threads)
+            self.get_batch_data().set_nodes(nodes)
+            self.get_batch_data().set_ntasks(num_tasks)
+            self.get_batch_data().set_cpus(num_threads)
+            self.get_batch_data().get_envars().append(('OMP_NUM_THREADS', num_threads))
+        elif step == 'remove':
+            self.get_batch_data().get_envars().pop()
+        else:
+            io_manager.print_err_info('Unrecognized step name. Use \'set\' or \'remove\' keywords')
+
+    def run_scalability(self):
+        """
+        Run all combinations of MPI tasks and OpenMP threads and find the best decomposition
+        for every total number of cores
+        """
+        decompositions = self.get_decompositions()
+        test_name = self.get_src_data().get_type()
+        counter = 0
+        num_tests = len(decompositions)
+        successful_jobs = {
+            'id': [],
+            'dir': [],
+            'decomposition': [],
+        }
+
+        for num_tasks, num_threads in decompositions:
+            counter += 1
+            self.report_start_of_test(counter, num_tests)
+            self.report_test_info(test_name, str(num_tasks) + ' tasks x ' + str(num_threads) + ' threads')
+
+            postfix = self.asemble_postfix(test_name, str(num_tasks) + 'x' + str(num_threads))
+
+            # create temp directory with a working copy of sources
+            tmp_dir_name = 'run' + postfix
+            self.create_wrk_copy(self.get_src_data(), tmp_dir_name)
+            full_tmp_path = os.path.join(self.get_full_wrk_dir_path(), tmp_dir_name)
+
+            self.modify_decomposition('set', num_tasks, num_threads)
+
+            # Repeat tests a given number of times
+            self.run_test_case(full_tmp_path, postfix, (num_tasks, num_threads),
+                               successful_jobs['id'],
+                               successful_jobs['dir'],
+                               successful_jobs['decomposition'])
+
+            self.modify_decomposition('remove')
+
+            self.report_end_of_test(counter, num_tests)
+
+        # Wait for the jobs that were submitted asynchronously
+        self.complete_sweep()
+
+        report = GenericReport()
+        best = report.report_hybrid_results(self, self.get_src_data(), successful_jobs,
+                                            self.get_src_data().get_tasks_list(),
+                                            self.get_src_data().get_threads_list())
+        spread = report.get_spread()
+
+        io_manager.print_info('Best decomposition per number of cores:', '')
+        for decomposition in best:
+            io_manager.print_info(str(decomposition['cores']) + ' cores: '
+                                  + str(decomposition['tasks']) + ' tasks x '
+                                  + str(decomposition['threads']) + ' threads | '
+                                  + str(decomposition['value']))
+
+        self.write_results_to_log(successful_jobs,
+                                [
+                                    {
+                                        'name': 'best_decomposition',
+                                        'list': best
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
+                                    }
+                                ])
@@ -1,5 +1,4 @@
 import os
-import math
 
 import io_manager
 from report.generic_report import GenericReport
@@ -36,6 +35,9 @@ class MPIAnalysis(GenericAnalysis):
         'OMPI_MCA_coll_tuned_reduce_algorithm': 7,
     }
 
+    # Script with the tuned envars, see run_collective_tuning()
+    _snippet_file_name = 'mpi_collectives.sh'
+
     def get_impi_collectives(self):
         return self._impi_collectives
 
@@ -48,12 +50,12 @@ class MPIAnalysis(GenericAnalysis):
             num_tests += _mpi_coll_dict[key]
         return num_tests
 
-    def run_collectives(self):
+    def _get_mpi_collectives(self):
         """
-        Run tests with different compiler flags
+        Define what dictionary of collectives to use based on the 'compile_command'
+        from the config file. Exit on failure.
+        :return: Tuple (dictionary of collectives, name of the MPI vendor)
         """
-        # Define what dictionary of collectives to use based on the 'compile_command'
-        # from the config file
         ompi_wrappers = ['mpiCC', 'mpic++', 'mpicc', 'mpicxx', 'mpif77', 'mpif90', 'mpifort']
         impi_wrappers = ['mpiicc', 'mpiicpc', 'mpiifort']
         mpi_coll_dict = None
@@ -82,6 +84,14 @@ class MPIAnalysis(GenericAnalysis):
             io_manager.print_err_info('Cannot determine vendor of the MPI compiler wrapper: ' + str(compiler_cmd))
             exit(1)
 
+        return mpi_coll_dict, mpi_vendor
+
+    def run_collectives(self):
+        """
+        Run tests with different compiler flags
+        """
+        mpi_coll_dict, mpi_vendor = self._get_mpi_collectives()
+
         counter = 0
         num_tests = self._get_num_tests(mpi_coll_dict)
         successful_jobs = {
@@ -111,22 +121,25 @@ class MPIAnalysis(GenericAnalysis):
 
                 # Append and then pop a new envar to the list of already existing envars
                 self.get_batch_data().get_envars().append((col_type, value))
-                batch_file_name = self.get_batch_data().generate_job_script(self.get_src_data(), full_tmp_path,
-                                                                            postfix)
-                self.get_batch_data().get_envars().pop()
 
                 # Repeat tests a given number of times
-                self.run_repetitive_tests(batch_file_name, full_tmp_path,
-                                          test_case,
-                                          successful_jobs['id'], 
-                                          successful_jobs['dir'],
-                                          successful_jobs['type'])
+                self.run_test_case(full_tmp_path, postfix,
+                                   test_case,
+                                   successful_jobs['id'],
+                                   successful_jobs['dir'],
+                                   successful_jobs['type'])
+
+                self.get_batch_data().get_envars().pop()
 
                 self.report_end_of_test(counter, num_tests)
 
+        # Wait for the jobs that were submitted asynchronously
+        self.complete_sweep()
+
         report = GenericReport()
         flags, res = report.report_flags_results(self, self.get_src_data(), successful_jobs,
                                                          successful_jobs['type'], 'collective_calls')
+        spread = report.get_spread()
 
         self.write_results_to_log(successful_jobs, 
                                 [
@@ -137,13 +150,186 @@ class MPIAnalysis(GenericAnalysis):
                                     {
                                         'name': 'results',
                                         'list': res
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
+                                    }
+                                ])
+
+    def _run_collective_cases(self, cases, successful_jobs, num_repetitions, stage):
+        """
+        Run test cases with different collective algorithms and wait for all of them
+        :param cases: List of tuples (name of the test case, list of envars (name, value))
+        :param successful_jobs: Dictionary of lists of successful jobs with 'id', 'dir' and
+                                'type' keys (in/out)
+        :param num_repetitions: Number of repetitions of every test case
+        :param stage: Name of the tuning stage
+        :return: None
+        """
+        counter = 0
+        for test_case, envars in cases:
+            counter += 1
+            self.report_start_of_test(counter, len(cases))
+            self.report_test_info(stage, test_case)
+
+            postfix = self.asemble_postfix('col_tuning', test_case)
+
+            # create temp directory with a working copy of sources
+            tmp_dir_name = 'run' + postfix
+            self.create_wrk_copy(self.get_src_data(), tmp_dir_name)
+            full_tmp_path = os.path.join(self.get_full_wrk_dir_path(), tmp_dir_name)
+
+            # Append and then pop new envars to the list of already existing envars
+            self.get_batch_data().get_envars().extend(envars)
+
+            self.run_test_case(full_tmp_path, postfix,
+                               test_case,
+                               successful_jobs['id'],
+                               successful_jobs['dir'],
+                               successful_jobs['type'],
+                               num_repetitions=num_repetitions)
+
+            for envar in envars:
+                self.get_batch_data().get_envars().pop()
+
+            self.report_end_of_test(counter, len(cases))
+
+        # Wait for the jobs that were submitted asynchronously
+        self.complete_sweep()
+
+    def _select_jobs(self, successful_jobs, test_cases):
+        """
+        :param successful_jobs: Dictionary of lists of successful jobs with 'id', 'dir' and 'type' keys
+        :param test_cases: Names of the test cases to select
+        :return: Dictionary of lists of successful jobs of the given test cases
+        """
+        selected = {
+            'id': [],
+            'dir': [],
+            'type': [],
+        }
+        for job_id, job_dir, test_case in zip(successful_jobs['id'], successful_jobs['dir'], successful_jobs['type']):
+            if test_case in test_cases:
+                selected['id'].append(job_id)
+                selected['dir'].append(job_dir)
+                selected['type'].append(test_case)
+        return selected
+
+    def run_collective_tuning(self):
+        """
+        Tune the algorithms of collective calls in three stages:
+        1. screen all algorithms of all collectives with a single run each;
+        2. repeat the best algorithms of every collective (see SrcData.get_tuning_top_k())
+           the full number of times;
+        3. run the best algorithms of all collectives together.
+        The best set of envars (the default one, the best single algorithm or the combination)
+        is written to a script that can be sourced from production job scripts.
+        """
+        mpi_coll_dict, mpi_vendor = self._get_mpi_collectives()
+
+        start_range = 1
+        base_envars = []
+        if mpi_vendor == _OMPINAME:
+            start_range = 0
+            # Algorithms set via MCA parameters are ignored without dynamic rules
+            base_envars = [('OMPI_MCA_coll_tuned_use_dynamic_rules', 1)]
+
+        # Test case name -> envar (name, value)
+        algorithms = {}
+        for col_type in mpi_coll_dict:
+            for value in range(start_range, mpi_coll_dict[col_type] + 1):
+                algorithms[col_type + '_' + str(value)] = (col_type, value)
+
+        num_rep = self.get_src_data().get_num_repetitions()
+        top_k = self.get_src_data().get_tuning_top_k()
+        report = GenericReport()
+        successful_jobs = {
+            'id': [],
+            'dir': [],
+            'type': [],
+        }
+
+        # Stage 1: screen all algorithms
+        io_manager.print_info('Screening ' + str(len(algorithms)) + ' algorithm(s) with a single run each', '')
+        cases = [('default', base_envars)]
+        cases += [(test_case, base_envars + [envar]) for test_case, envar in algorithms.items()]
+        self._run_collective_cases(cases, successful_jobs, 1, 'screening')
+        screening = self._select_jobs(successful_jobs, [case for case, envars in cases])
+        ranking = dict(report.rank_test_cases(self, self.get_src_data(),
+                                              screening['id'], screening['dir'], screening['type']))
+
+        # Stage 2: repeat the best algorithms of every collective
+        contenders = {}
+        for col_type in mpi_coll_dict:
+            ranked = sorted([test_case for test_case, envar in algorithms.items()
+                             if envar[0] == col_type and test_case in ranking], key=ranking.get)
+            if ranked:
+                contenders[col_type] = ranked[:top_k]
+        cases = [('default', base_envars)]
+        for col_type in contenders:
+            cases += [(test_case, base_envars + [algorithms[test_case]]) for test_case in contenders[col_type]]
+        io_manager.print_info('Repeating ' + str(len(cases)) + ' candidate(s) ' + str(num_rep) + ' time(s)', '')
+        if num_rep > 1:
+            self._run_collective_cases(cases, successful_jobs, num_rep - 1, 'refinement')
+        candidates = self._select_jobs(successful_jobs, [case for case, envars in cases])
+        ranking = dict(report.rank_test_cases(self, self.get_src_data(),
+                                              candidates['id'], candidates['dir'], candidates['type']))
+        best_envars = []
+        for col_type in contenders:
+            ranked = [test_case for test_case in contenders[col_type] if test_case in ranking]
+            if ranked:
+                best_envars.append(algorithms[min(ranked, key=ranking.get)])
+
+        # Stage 3: combine the best algorithms of all collectives
+        io_manager.print_info('Combining the best algorithms: '
+                              + ', '.join(name + '=' + str(value) for name, value in best_envars), '')
+        cases.append(('combined', base_envars + best_envars))
+        self._run_collective_cases(cases[-1:], successful_jobs, num_rep, 'combination')
+
+        final_jobs = self._select_jobs(successful_jobs, [case for case, envars in cases])
+        flags, res = report.report_flags_results(self, self.get_src_data(), final_jobs,
+                                                 final_jobs['type'], 'collective_tuning')
+        spread = report.get_spread()
+
+        # The winner is the default set of envars, a single algorithm or the combination
+        results = dict(zip(flags, res))
+        winner = min([case for case in cases if case[0] in results], key=lambda case: results[case[0]],
+                     default=('default', base_envars))
+        io_manager.print_info('Best set of envars: ' + winner[0] + ' | '
+                              + str(results.get(winner[0])), '')
+
+        snippet = self.get_batch_data().generate_envars_snippet(
+            winner[1], 'Collective algorithms of ' + mpi_vendor + ' tuned for '
+            + str(self.get_batch_data().get_ntasks()) + ' tasks on '
+            + str(self.get_batch_data().get_nodes()) + ' node(s)')
+        snippet_file_name = os.path.join(self.get_root_dir_name(), self._snippet_file_name)
+        self.get_batch_data().dump_text_to_file(snippet_file_name, snippet)
+        io_manager.print_dbg_info('File ' + snippet_file_name + ' is saved')
+
+        self.write_results_to_log(final_jobs,
+                                [
+                                    {
+                                        'name': 'flags',
+                                        'list': flags
+                                    },
+                                    {
+                                        'name': 'results',
+                                        'list': res
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
+                                    },
+                                    {
+                                        'name': 'best_envars',
+                                        'list': [[name, value] for name, value in winner[1]]
                                     }
                                 ])
 
     def modify_ntasks(self, step, num_cores=0):
         if step == 'set':
-            max_tasks_per_node = self.get_batch_data().get_max_cores_pre_node()
-            nodes = int(math.ceil(num_cores / max_tasks_per_node))
+            nodes = self.get_batch_data().get_num_nodes(num_cores)
             self.get_batch_data().set_nodes(nodes)
             self.get_batch_data().set_ntasks(num_cores)
         elif step == 'remove':
@@ -155,3 +341,9 @@ class MPIAnalysis(GenericAnalysis):
         self.scalability(self.get_src_data().get_tasks_list(),
                          self.get_src_data().get_type(),
                          self.modify_ntasks)
+
+    def run_weak_scalability(self):
+        self.scalability(self.get_src_data().get_tasks_list(),
+                         self.get_src_data().get_type(),
+                         self.modify_ntasks,
+                         weak_scaling=True)
@@ -1,3 +1,4 @@
+import math
 import os
 from re import S
 
@@ -51,6 +52,12 @@ class OMPAnalysis(GenericAnalysis):
                          self.get_src_data().get_type(),
                          self.modify_omp_envar)
 
+    def run_weak_scalability(self):
+        self.scalability(self.get_src_data().get_threads_list(),
+                         self.get_src_data().get_type(),
+                         self.modify_omp_envar,
+                         weak_scaling=True)
+
     def run_affinity(self):
         cores_list = self.get_src_data().get_threads_list()
         num_tests = self.get_num_affinity_tests() * len(cores_list)
@@ -88,24 +95,25 @@ class OMPAnalysis(GenericAnalysis):
                     if modify_batch_script is not None:
                         modify_batch_script('set', num_cores, bind, place)
 
-                    batch_file_name = self.get_batch_data().generate_job_script(self.get_src_data(), full_tmp_path,
-                                                                                postfix)
+                    # Repeat tests a given number of times
+                    self.run_test_case(full_tmp_path, postfix, num_cores,
+                                       local_successful_jobs['id'],
+                                       local_successful_jobs['dir'],
+                                       local_successful_jobs['cores'])
 
                     if modify_batch_script is not None:
                         modify_batch_script('remove', num_cores, bind, place)
 
-                    # Repeat tests a given number of times
-                    self.run_repetitive_tests(batch_file_name, full_tmp_path, num_cores,
-                                              local_successful_jobs['id'], 
-                                              local_successful_jobs['dir'],
-                                              local_successful_jobs['cores'])
-
                     self.report_end_of_test(counter, num_tests)
 
                 successful_jobs.append(local_successful_jobs)
 
+        # Wait for the jobs that were submitted asynchronously
+        self.complete_sweep()
+
         report = GenericReport()
         cores, res = report.report_parallel_results(self, self.get_src_data(), successful_jobs)
+        spread = report.get_spread()
 
         self.write_results_to_log(successful_jobs, 
                                 [
@@ -116,5 +124,144 @@ class OMPAnalysis(GenericAnalysis):
                                     {
                                         'name': 'results',
                                         'list': res
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
+                                    }
+                                ])
+
+    def run_affinity_search(self):
+        """
+        Search for the best OMP affinity with successive halving. All combinations of
+        OMP_PROC_BIND and OMP_PLACES run at the smallest number of threads, then only the
+        best fraction of them (see SrcData.get_search_keep_fraction()) is promoted to the
+        next number of threads. The search stops when the job budget is exhausted (see
+        SrcData.get_search_job_budget()). Reports the best affinity per number of threads.
+        """
+        cores_list = self.get_src_data().get_threads_list()
+        test_name = self.get_src_data().get_type()
+        keep_fraction = self.get_src_data().get_search_keep_fraction()
+        job_budget = self.get_src_data().get_search_job_budget()
+        modify_batch_script = self.modify_omp_envar_affinity
+
+        # Max number of jobs submitted per combination and number of threads
+        if self.get_src_data().is_adaptive_repetitions():
+            jobs_per_case = self.get_src_data().get_max_repetitions()
+        else:
+            jobs_per_case = self.get_src_data().get_num_repetitions()
+
+        contenders = [(bind, place)
+                      for bind in self.get_omp_affinity()['OMP_PROC_BIND']
+                      for place in self.get_omp_affinity()['OMP_PLACES']]
+        all_successful_jobs = {}
+        for bind, place in contenders:
+            all_successful_jobs[bind + '+' + place] = {
+                'id': [],
+                'dir': [],
+                'cores': [],
+                'label': bind + '+' + place,
+            }
+
+        report = GenericReport()
+        best_affinity = []
+        first_job = self.get_num_submitted_jobs()
+        for num_cores in cores_list:
+            if job_budget > 0:
+                used_jobs = self.get_num_submitted_jobs() - first_job
+                affordable = (job_budget - used_jobs) // jobs_per_case
+                if affordable < len(contenders):
+                    io_manager.print_info('Job budget allows only ' + str(max(affordable, 0))
+                                          + ' of ' + str(len(contenders)) + ' combination(s)', '')
+                    contenders = contenders[:max(affordable, 0)]
+            if not contenders:
+                break
+
+            io_manager.print_info('Threads: ' + str(num_cores) + ' | '
+                                  + str(len(contenders)) + ' combination(s)', '')
+            step_jobs = {
+                'id': [],
+                'dir': [],
+                'label': [],
+            }
+            counter = 0
+            for bind, place in contenders:
+                counter += 1
+                self.report_start_of_test(counter, len(contenders))
+                self.report_test_info(test_name, bind + '/' + place + ' | ' + str(num_cores))
+
+                postfix = self.asemble_postfix(test_name, str(num_cores) + '_' + bind + '_' + place)
+
+                # create temp directory with a working copy of sources
+                tmp_dir_name = 'run' + postfix
+                self.create_wrk_copy(self.get_src_data(), tmp_dir_name)
+                full_tmp_path = os.path.join(self.get_full_wrk_dir_path(), tmp_dir_name)
+
+                modify_batch_script('set', num_cores, bind, place)
+
+                # Repeat tests a given number of times
+                self.run_test_case(full_tmp_path, postfix, bind + '+' + place,
+                                   step_jobs['id'],
+                                   step_jobs['dir'],
+                                   step_jobs['label'])
+
+                modify_batch_script('remove', num_cores, bind, place)
+
+                self.report_end_of_test(counter, len(contenders))
+
+            # Wait for the jobs that were submitted asynchronously
+            self.complete_sweep()
+
+            for job_id, job_dir, label in zip(step_jobs['id'], step_jobs['dir'], step_jobs['label']):
+                all_successful_jobs[label]['id'].append(job_id)
+                all_successful_jobs[label]['dir'].append(job_dir)
+                all_successful_jobs[label]['cores'].append(num_cores)
+
+            ranking = report.rank_test_cases(self, self.get_src_data(),
+                                             step_jobs['id'], step_jobs['dir'], step_jobs['label'])
+            if not ranking:
+                io_manager.print_err_info('No successful jobs with ' + str(num_cores) + ' threads')
+                break
+            best_affinity.append({
+                'threads': num_cores,
+                'affinity': ranking[0][0],
+                'value': ranking[0][1],
+            })
+
+            # Promote the best combinations to the next number of threads
+            num_promoted = max(1, math.ceil(len(ranking) * keep_fraction))
+            contenders = [tuple(label.split('+', 1)) for label, value in ranking[:num_promoted]]
+
+        io_manager.print_info('Best affinity per number of threads ('
+                              + str(self.get_num_submitted_jobs() - first_job) + ' job(s) submitted):', '')
+        for best in best_affinity:
+            io_manager.print_info(str(best['threads']) + ' threads: ' + best['affinity']
+                                  + ' | ' + str(best['value']))
+
+        successful_jobs = [jobs for jobs in all_successful_jobs.values() if jobs['id']]
+        cores = []
+        res = []
+        spread = []
+        if successful_jobs:
+            cores, res = report.report_parallel_results(self, self.get_src_data(), successful_jobs)
+            spread = report.get_spread()
+
+        self.write_results_to_log(successful_jobs,
+                                [
+                                    {
+                                        'name': 'cores',
+                                        'list': cores
+                                    },
+                                    {
+                                        'name': 'results',
+                                        'list': res
+                                    },
+                                    {
+                                        'name': 'spread',
+                                        'list': spread
+                                    },
+                                    {
+                                        'name': 'best_affinity',
+                                        'list': best_affinity
                                     }
                                 ])
@@ -0,0 +1,39 @@
+class GenericBackend:
+    """
+    Base of the execution backends. A backend submits the generated job scripts and keeps
+    track of the submitted jobs. Job records returned by the backend are dictionaries with
+    'state', 'exit_code', 'elapsed', 'node_list' and 'accounting' keys, see
+    JobMonitor.parse_accounting() for the resource usage in 'accounting'.
+
+    Every backend implements:
+    - submit(job_file_name, asynchronous): submit the job script, return the job ID (None
+      on failure) and the job state (empty if 'asynchronous' is True and the job is not
+      finished yet)
+    - submit_interactive(cmd, bash_file_name): run the bash file with the complete command
+    - query(job_ids): return a dictionary with job IDs as keys and job records as values,
+      unknown jobs are not present in the dictionary
+    - wait(job_ids): wait until all jobs are finished, return the same dictionary as query()
+    """
+    _name = 'generic'
+    _records = {}
+
+    def get_name(self):
+        """
+        :return: Name of the backend as used in the config file
+        """
+        return self._name
+
+    def get_record(self, job_id):
+        """
+        :param job_id: Job ID
+        :return: Last known record of the job, or None if the job is unknown
+        """
+        return self._records.get(str(job_id))
+
+    def read_config(self, batch_config):
+        """
+        Read backend specific options
+        :param batch_config: Dictionary of the 'batch_data' section of the config file
+        :return: None
+        """
+        pass
@@ -0,0 +1,283 @@
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import io_manager
+from backend.generic_backend import GenericBackend
+
+
+class LocalBackend(GenericBackend):
+    """
+    Run the generated job scripts on the current machine, e.g. on a workstation or inside
+    an existing allocation. Jobs are executed by a bounded pool of workers, every job is
+    pinned to its own set of cores. The output is written to 'slurm-<job ID>.out' in the
+    directory the job was submitted from and ends with a 'State:' line, so the output
+    files can be parsed in the same way as the SLURM ones.
+    """
+    _name = 'local'
+    _max_workers = 0        # 0 - as many workers as jobs that fit on the available cores
+
+    _pool = None
+    _futures = {}
+    _records = {}
+    _free_cores = None
+    _cores_condition = threading.Condition()
+    # Milliseconds, so job IDs of consecutive runs (e.g. a resumed one) do not overlap
+    _job_counter = int(time.time() * 1000)
+    _counter_lock = threading.Lock()
+
+    def get_max_workers(self):
+        """
+        :return: Max number of jobs that run at the same time
+        """
+        if self._max_workers > 0:
+            return self._max_workers
+        return len(self._get_available_cores())
+
+    def set_max_workers(self, max_workers):
+        """
+        Set max number of jobs that run at the same time (0 - limited by the number of cores)
+        :return: None
+        """
+        self._max_workers = max_workers
+
+    def read_config(self, batch_config):
+        self.set_max_workers(batch_config.get('local_max_workers', self._max_workers))
+
+    def _get_available_cores(self):
+        """
+        :return: Sorted list of cores this process is allowed to run on
+        """
+        return sorted(os.sched_getaffinity(0))
+
+    def _get_pool(self):
+        """
+        :return: Pool of workers, created on the first call
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.get_max_workers())
+            self._free_cores = self._get_available_cores()
+        return self._pool
+
+    def _next_job_id(self):
+        """
+        :return: Synthetic job ID
+        """
+        with self._counter_lock:
+            self._job_counter += 1
+            return str(self._job_counter)
+
+    def _read_resources(self, job_file_name):
+        """
+        Read requested resources from the '#SBATCH' lines of the job script
+        :param job_file_name: Name of the script
+        :return: Number of tasks, number of CPUs per task and the list of array task IDs
+                 (None if the script is not a job array)
+        """
+        ntasks = 1
+        cpus = 1
+        array_ids = None
+        with open(job_file_name, 'r') as file:
+            for line in file:
+                match = re.match(r'#SBATCH\s+(-n|-c|--array=)\s*(\S+)', line)
+                if match is None:
+                    continue
+                if match.group(1) == '-n':
+                    ntasks = int(match.group(2))
+                elif match.group(1) == '-c':
+                    cpus = int(match.group(2))
+                else:
+                    array_ids = []
+                    for array_range in match.group(2).split('%')[0].split(','):
+                        bounds = array_range.split('-')
+                        array_ids += list(range(int(bounds[0]), int(bounds[-1]) + 1))
+        return ntasks, cpus, array_ids
+
+    def _acquire_cores(self, num_cores):
+        """
+        Block until 'num_cores' cores are free and reserve them
+        :param num_cores: Number of cores
+        :return: List of reserved cores
+        """
+        num_cores = min(num_cores, len(self._get_available_cores()))
+        with self._cores_condition:
+            while len(self._free_cores) < num_cores:
+                self._cores_condition.wait()
+            cores = self._free_cores[:num_cores]
+            self._free_cores = self._free_cores[num_cores:]
+        return cores
+
+    def _release_cores(self, cores):
+        """
+        Return reserved cores to the pool of free cores
+        :param cores: List of cores
+        :return: None
+        """
+        with self._cores_condition:
+            self._free_cores = sorted(self._free_cores + cores)
+            self._cores_condition.notify_all()
+
+    def _start_pinned(self, cmd, cores, **kwargs):
+        """
+        Start a process pinned to the given cores. The affinity is set by 'taskset', or by
+        the parent right after the start if 'taskset' is not available. A 'preexec_fn' is
+        not used, it is not safe in the presence of threads.
+        :param cmd: Command as a list of arguments
+        :param cores: List of cores
+        :param kwargs: Arguments of subprocess.Popen()
+        :return: Object of subprocess.Popen
+        """
+        if shutil.which('taskset') is not None:
+            return subprocess.Popen(['taskset', '-c', ','.join(str(core) for core in cores)] + cmd, **kwargs)
+        proc = subprocess.Popen(cmd, **kwargs)
+        try:
+            os.sched_setaffinity(proc.pid, cores)
+        except OSError:
+            # The process has already finished
+            pass
+        return proc
+
+    def _run_job(self, job_id, job_file_name, submit_dir, ntasks, cpus, array_job_id=None, array_task_id=None,
+                 submit_time=None):
+        """
+        Execute a job script and write the output file. The cores are released and the job
+        is marked as failed even if the job script cannot be executed.
+        :return: Job record
+        """
+        cores = self._acquire_cores(ntasks * cpus)
+        record = self._records[job_id]
+        record['state'] = 'RUNNING'
+        start_time = time.time()
+        tmp_dir = None
+        try:
+            tmp_dir = tempfile.mkdtemp(prefix='lassi_' + job_id + '_')
+
+            env = dict(os.environ)
+            env.update({
+                'SLURM_JOB_ID': job_id,
+                'SLURM_JOB_NUM_NODES': '1',
+                'SLURM_NTASKS': str(ntasks),
+                'SLURM_CPUS_PER_TASK': str(cpus),
+                'SLURM_SUBMIT_DIR': submit_dir,
+                'SLURM_JOB_NODELIST': socket.gethostname(),
+                'TMPDIR': tmp_dir,
+            })
+            if array_job_id is not None:
+                env['SLURM_ARRAY_JOB_ID'] = array_job_id
+                env['SLURM_ARRAY_TASK_ID'] = str(array_task_id)
+
+            output_file = os.path.join(submit_dir, 'slurm-' + job_id + '.out')
+            with open(output_file, 'w') as file:
+                proc = self._start_pinned(['bash', job_file_name], cores, cwd=submit_dir, env=env,
+                                          stdout=file, stderr=subprocess.STDOUT)
+                # Wait for the job and collect the resource usage of the job script and its children
+                _, status, usage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+            end_time = time.time()
+            elapsed = end_time - start_time
+
+            state = 'COMPLETED' if proc.returncode == 0 else 'FAILED'
+            with open(output_file, 'a') as file:
+                file.write('\nJob ID: ' + job_id + '\n'
+                           'State: ' + state + ' (exit code ' + str(proc.returncode) + ')\n')
+
+            record['exit_code'] = str(proc.returncode) + ':0'
+            record['elapsed'] = time.strftime('%H:%M:%S', time.gmtime(elapsed))
+            record['accounting'] = {
+                'elapsed': elapsed,
+                'total_cpu': usage.ru_utime + usage.ru_stime,
+                'max_rss': usage.ru_maxrss * 1024,     # kilobytes on Linux
+                'ave_cpu_freq': None,
+                'consumed_energy': None,
+                'alloc_cpus': len(cores),
+                'ntasks': ntasks,
+                'submit_time': submit_time,
+                'start_time': start_time,
+                'end_time': end_time,
+            }
+            record['state'] = state
+        except OSError as err:
+            io_manager.print_err_info('Job #' + job_id + ' cannot be executed: ', str(err))
+        finally:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            self._release_cores(cores)
+            if record['state'] == 'RUNNING':
+                record['state'] = 'FAILED'
+        return record
+
+    def _submit_one(self, job_id, job_file_name, submit_dir, ntasks, cpus, array_job_id=None, array_task_id=None):
+        """
+        Put a job to the pool of workers
+        :return: None
+        """
+        self._records[job_id] = {
+            'state': 'PENDING',
+            'exit_code': '',
+            'elapsed': '',
+            'node_list': socket.gethostname(),
+            'accounting': {},
+        }
+        self._futures[job_id] = self._get_pool().submit(self._run_job, job_id, job_file_name, submit_dir,
+                                                        ntasks, cpus, array_job_id, array_task_id, time.time())
+
+    def submit(self, job_file_name, asynchronous):
+        job_file_name = os.path.abspath(job_file_name)
+        submit_dir = os.getcwd()
+        ntasks, cpus, array_ids = self._read_resources(job_file_name)
+        num_total = len(self._get_available_cores())
+        if ntasks * cpus > num_total:
+            io_manager.print_err_info('The job requests ' + str(ntasks * cpus) + ' cores, only '
+                                      + str(num_total) + ' are available. The node will be oversubscribed')
+        job_id = self._next_job_id()
+
+        if array_ids is None:
+            self._submit_one(job_id, job_file_name, submit_dir, ntasks, cpus)
+            job_ids = [job_id]
+        else:
+            job_ids = []
+            for task_id in array_ids:
+                task_job_id = job_id + '_' + str(task_id)
+                self._submit_one(task_job_id, job_file_name, submit_dir, ntasks, cpus, job_id, task_id)
+                job_ids.append(task_job_id)
+
+        if asynchronous:
+            io_manager.print_dbg_info('Job #' + job_id + ' is submitted')
+            return job_id, ''
+
+        records = self.wait(job_ids)
+        return job_id, records[job_ids[-1]]['state']
+
+    def submit_interactive(self, cmd, bash_file_name):
+        # The SLURM command is not available, run the bash file directly
+        io_manager.print_dbg_info('Interactive command: bash ' + bash_file_name)
+        ntasks, cpus, array_ids = self._read_resources(bash_file_name)
+        self._get_pool()
+        cores = self._acquire_cores(ntasks * cpus)
+        try:
+            self._start_pinned(['bash', bash_file_name], cores).wait()
+        finally:
+            self._release_cores(cores)
+
+    def query(self, job_ids):
+        return {job_id: self._records[job_id] for job_id in job_ids if job_id in self._records}
+
+    def wait(self, job_ids):
+        records = {}
+        io_manager.print_dbg_info('Waiting for ' + str(len(job_ids)) + ' job(s) to finish')
+        for job_id in job_ids:
+            if job_id not in self._futures:
+                io_manager.print_err_info('Unknown job: ' + str(job_id))
+                records[job_id] = {'state': 'UNKNOWN', 'exit_code': '', 'elapsed': '', 'node_list': '',
+                                   'accounting': {}}
+                continue
+            records[job_id] = self._futures[job_id].result()
+            io_manager.print_dbg_info('Job #' + job_id + ' is finished with state: '
+                                      + records[job_id]['state'])
+        return records
@@ -0,0 +1,66 @@
+import os
+import subprocess
+
+import io_manager
+from backend.generic_backend import GenericBackend
+from job_monitor import JobMonitor
+
+
+class SlurmBackend(GenericBackend):
+    """
+    Submit jobs with sbatch/srun and track them with sacct/squeue
+    """
+    _name = 'slurm'
+    _job_monitor = JobMonitor()
+    _records = {}
+
+    def get_job_monitor(self):
+        """
+        :return: Object of JobMonitor that tracks the submitted jobs
+        """
+        return self._job_monitor
+
+    def read_config(self, batch_config):
+        monitor = self.get_job_monitor()
+        monitor.set_initial_interval(batch_config.get('poll_interval', monitor.get_initial_interval()))
+        monitor.set_max_interval(batch_config.get('max_poll_interval', monitor.get_max_interval()))
+        monitor.set_backoff_factor(batch_config.get('poll_backoff_factor', monitor.get_backoff_factor()))
+        monitor.set_poll_budget(batch_config.get('poll_budget', monitor.get_poll_budget()))
+        monitor.set_max_empty_polls(batch_config.get('max_empty_polls', monitor.get_max_empty_polls()))
+
+    def submit(self, job_file_name, asynchronous):
+        # With --parsable the job ID is the first field of the sbatch output, with
+        # --wait sbatch returns only after the job is finished
+        sbatch_call = 'sbatch --parsable '
+        if not asynchronous:
+            sbatch_call += '--wait '
+        sbatch_call += job_file_name
+        proc = subprocess.Popen(sbatch_call, stdout=subprocess.PIPE, shell=True)
+        (out, err) = proc.communicate()
+        if out is None or out.decode('utf-8').strip() == '':
+            io_manager.print_err_info('Could not get the job ID. Returned value is \'None\'')
+            return None, ''
+        job_id = out.decode('utf-8').strip().split(';')[0]
+
+        if asynchronous:
+            io_manager.print_dbg_info('Job #' + str(job_id) + ' is submitted')
+            return job_id, ''
+
+        # Report job ID and exit state. If sacct and squeue do not know the job (e.g. the
+        # accounting is not available), the exit status of 'sbatch --wait' is used
+        fallback_state = 'COMPLETED' if proc.returncode == 0 else 'FAILED'
+        record = self.wait([job_id], {job_id: fallback_state})[job_id]
+        return job_id, record['state']
+
+    def submit_interactive(self, cmd, bash_file_name):
+        os.system('chmod +x ' + bash_file_name)
+        io_manager.print_dbg_info('Interactive command: ' + cmd + ' ' + bash_file_name)
+        os.system(cmd + ' ' + bash_file_name)
+
+    def query(self, job_ids):
+        return self.get_job_monitor().query(job_ids)
+
+    def wait(self, job_ids, fallback_states=None):
+        records = self.get_job_monitor().wait(job_ids, fallback_states)
+        self._records.update(records)
+        return records
@@ -1,12 +1,12 @@
 import json
-import os
+import math
 import sys
-import re
-import time
-import subprocess
 
 from version import *
 import io_manager
+from backend.slurm_backend import SlurmBackend
+from backend.local_backend import LocalBackend
+from systeminfo import SystemInfo
 
 
 class BatchFileData:
@@ -17,9 +17,11 @@ class BatchFileData:
 
     _system_name = 'Snellius'
     _max_cores_pre_node = 128
+    _topology = None
 
     _script_base_name = None
     _exec_options = None
+    _template_variables = {}
     _envars = []
     _nodes = 1
     _ntasks = 1
@@ -28,8 +30,19 @@ class BatchFileData:
     _time = 1
     _launcher = 'srun'
     _job_file_ext = 'sh'
-    _log_name = 'output.log'
     _asynchronous = False
+    _job_array = False
+    _max_array_size = 1000
+    _counters = None
+    _counter_tools = ['perf', 'likwid', 'auto']
+    _default_counter_events = ['cycles', 'instructions', 'LLC-load-misses', 'LLC-store-misses']
+    _default_likwid_group = 'MEM_DP'
+    _mpi_launchers = ['srun', 'mpirun', 'mpiexec']
+    _backend = SlurmBackend()
+    _known_backends = {
+        'slurm': SlurmBackend,
+        'local': LocalBackend,
+    }
 
     def is_asynchronous(self):
         """
@@ -37,6 +50,74 @@ class BatchFileData:
         """
         return self._asynchronous
 
+    def set_asynchronous(self, asynchronous):
+        """
+        Set the submission mode
+        :param asynchronous: True if jobs should be submitted without waiting for them
+        :return: None
+        """
+        self._asynchronous = asynchronous
+
+    def is_job_array(self):
+        """
+        :return: True if test cases of a sweep should be submitted as one job array
+        """
+        return self._job_array
+
+    def get_max_array_size(self):
+        """
+        :return: Max number of tasks in a single job array (see MaxArraySize in slurm.conf)
+        """
+        return self._max_array_size
+
+    def get_counters(self):
+        """
+        :return: Dictionary with 'tool', 'events' and 'likwid_group' keys if hardware counters
+                 should be collected, None otherwise
+        """
+        return self._counters
+
+    def set_counters(self, counters_config):
+        """
+        Set up collection of hardware counters. Exit on failure.
+        :param counters_config: Dictionary with optional 'enabled', 'tool' ('perf', 'likwid' or
+                                'auto' - likwid if available, perf otherwise), 'events' (perf
+                                events) and 'likwid_group' (likwid performance group) keys
+        :return: None
+        """
+        if not counters_config.get('enabled', True):
+            self._counters = None
+            return
+        tool = counters_config.get('tool', 'perf')
+        if tool not in self._counter_tools:
+            io_manager.print_err_info('Unknown hardware counter tool \'' + str(tool) + '\'. Known tools: ',
+                                      self._counter_tools)
+            sys.exit(1)
+        self._counters = {
+            'tool': tool,
+            'events': counters_config.get('events', self._default_counter_events),
+            'likwid_group': counters_config.get('likwid_group', self._default_likwid_group),
+        }
+
+    def get_backend(self):
+        """
+        :return: Execution backend, see backend.generic_backend.GenericBackend
+        """
+        return self._backend
+
+    def set_backend(self, backend_name):
+        """
+        Set execution backend by its name. Exit on failure.
+        :param backend_name: Name of the backend, see the keys of '_known_backends'
+        :return: None
+        """
+        if backend_name not in self._known_backends:
+            io_manager.print_err_info('Unknown backend \'' + str(backend_name) + '\'. Known backends: ',
+                                      list(self._known_backends.keys()))
+            sys.exit(1)
+        if self._backend.get_name() != backend_name:
+            self._backend = self._known_backends[backend_name]()
+
     def get_modules(self):
         """
         :return: List of modules
@@ -55,6 +136,25 @@ class BatchFileData:
         """
         return self._max_cores_pre_node
 
+    def get_topology(self):
+        """
+        :return: Topology of a compute node (see SystemInfo.summarize_topology()), None if
+                 it was not discovered
+        """
+        return self._topology
+
+    def get_num_nodes(self, num_tasks, cpus_per_task=1):
+        """
+        :param num_tasks: Number of MPI tasks
+        :param cpus_per_task: Number of CPUs (e.g. OpenMP threads) per task
+        :return: Min number of nodes that fit all tasks, 0 if a single task does not
+                 fit into a node
+        """
+        tasks_per_node = self.get_max_cores_pre_node() // cpus_per_task
+        if tasks_per_node == 0:
+            return 0
+        return int(math.ceil(num_tasks / tasks_per_node))
+
     def get_script_base_name(self):
         """
         :return: Base name of the batch script
@@ -67,6 +167,19 @@ class BatchFileData:
         """
         return self._exec_options
 
+    def set_exec_options(self, exec_options):
+        """
+        Set executable options
+        :return: None
+        """
+        self._exec_options = exec_options
+
+    def get_template_variables(self):
+        """
+        :return: Dictionary with user defined variables of the 'executable_options' template
+        """
+        return self._template_variables
+
     def get_envars(self):
         """
         :return: List of environment variables
@@ -142,17 +255,17 @@ class BatchFileData:
         """
         self._launcher = launcher
 
-    def get_job_file_ext(self):
+    def has_mpi_launcher(self):
         """
-        :return: Job file extension
+        :return: True if the launcher starts MPI tasks (see '_mpi_launchers')
         """
-        return self._job_file_ext
+        return self.get_launcher().split(' ')[0] in self._mpi_launchers
 
-    def get_log_name(self):
+    def get_job_file_ext(self):
         """
-        :return: Name of the log file
+        :return: Job file extension
         """
-        return self._log_name
+        return self._job_file_ext
 
     def read_config(self, config_file_name):
         """
@@ -165,17 +278,46 @@ class BatchFileData:
         self._modules = data['modules']
 
         self._system_name = data['system_data']['name']
-        self._max_cores_pre_node = data['system_data']['max_cores_pre_node']
+        if 'topology' in data['system_data']:
+            source = data['system_data']['topology']
+            self._topology = SystemInfo().discover_topology(source)
+            if self._topology is None:
+                io_manager.print_err_info('Cannot discover the node topology from \'' + str(source) + '\'')
+                exit(1)
+        if 'max_cores_pre_node' in data['system_data']:
+            self._max_cores_pre_node = data['system_data']['max_cores_pre_node']
+            if self._topology is not None and self._max_cores_pre_node != self._topology['cores']:
+                io_manager.print_err_info('max_cores_pre_node (' + str(self._max_cores_pre_node)
+                                          + ') differs from the number of cores of the discovered topology: ',
+                                          self._topology['cores'])
+        elif self._topology is not None:
+            self._max_cores_pre_node = self._topology['cores']
+        else:
+            io_manager.print_err_info('Either \'max_cores_pre_node\' or \'topology\' should be set in \'system_data\'')
+            exit(1)
 
         self._script_base_name = data['batch_data']['script_base_name']
         self._partition = data['batch_data']['partition']
         self._exec_options = data['batch_data']['executable_options']
+        self._template_variables = data['batch_data'].get('template_variables', self._template_variables)
         self._launcher = data['batch_data']['launcher']
         self._nodes = data['batch_data']['nodes']
         self._ntasks = data['batch_data']['ntasks']
         self._cpus = data['batch_data']['cpus']
         self._time = data['batch_data']['time']
-        
+        self._asynchronous = data['batch_data'].get('asynchronous', self._asynchronous)
+        self.set_backend(data['batch_data'].get('backend', self._backend.get_name()))
+        self.get_backend().read_config(data['batch_data'])
+        self._job_array = data['batch_data'].get('job_array', self._job_array)
+        self._max_array_size = data['batch_data'].get('max_array_size', self._max_array_size)
+        if 'counters' in data['batch_data']:
+            self.set_counters(data['batch_data']['counters'])
+            if self._counters is not None and self._counters['tool'] == 'likwid' and self.has_mpi_launcher():
+                io_manager.print_err_info('likwid-perfctr cannot measure the tasks of \'' + self._launcher
+                                          + '\', all of them would access the same counters. '
+                                          + 'Use \'perf\' or \'auto\' instead')
+                exit(1)
+
         for envar in data['batch_data']['envars']:
             self._envars.append((envar['envar'], envar['value']))
 
@@ -192,74 +334,195 @@ class BatchFileData:
         file.write(text)
         file.close()
 
-    def check_job_state(job_id):
-        cmd = 'sacct -j ' + str(job_id) + ' --format=state'
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
-        (out, err) = proc.communicate()
-        res = out.decode('utf-8')
-        return res
+    def check_job_state(self, job_id):
+        """
+        Ask SLURM about the current state of the job
+        :param job_id: Job ID
+        :return: Job state, or an empty string if the job is not known to SLURM yet
+        """
+        record = self.get_backend().query([str(job_id)]).get(str(job_id))
+        if record is None:
+            return ''
+        return record['state']
 
-    def _assemble_file(self, src, name_postfix='', compiler_flag_id=0):
+    def wait_for_jobs(self, job_ids):
         """
-        Generate batch script from the provided input
-        :param src: Object of ScrData
-        :param name_postfix: Postfix that represents the test case
-        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
-        :return: Full text of the job script and a parsable header string
+        Wait until all asynchronously submitted jobs are finished
+        :param job_ids: List of job IDs
+        :return: Dictionary with job IDs as keys and job records as values
         """
-        file_shebang = '#!/bin/bash'
-        file_version = '#\n' \
-                       '# This batch script was autogenerated by LAsSI v{0}\n' \
-                       '#\n'.format(VERSION)
-        file_header = '###-==[HEADER]==-###'
+        return self.get_backend().wait(job_ids)
 
-        if name_postfix != '':
-            file_header += '#SBATCH -o ./' + name_postfix + '/output.%j.out\n'
+    def _assemble_envars(self, envars, indentation=''):
+        """
+        Assemble export statements for the environment variables
+        :param envars: List of tuples (name, value)
+        :param indentation: String that is prepended to every line
+        :return: Text with export statements
+        """
+        if not envars:
+            return indentation + '# no environment variables set\n'
 
         file_envars = ''
-        if not self.get_envars():
-            file_envars = '# no environment variables set\n'
-        else:
-            for envar, value in self.get_envars():
-                file_envars += 'export ' + envar + '=' + str(value) + '\n'
+        for envar, value in envars:
+            file_envars += indentation + 'export ' + envar + '=' + str(value) + '\n'
+        return file_envars
 
-        # Compile the code
-        file_comp = ''
+    def _assemble_compile(self, src, compiler_flag_id=0):
+        """
+        Assemble the compilation part of the job script
+        :param src: Object of ScrData
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Compile command or a comment if the code should not be recompiled
+        """
         if src.get_recompile_flag():
-            file_comp = src.get_compile_cmd(compiler_flag_id) + '\n'
-        else:
-            file_comp = '# do not rebuild sources \n'
+            if src.get_build_stage() != 'inline':
+                return '# use prebuilt executable \n'
+            return src.get_compile_cmd(compiler_flag_id) + '\n'
+        return '# do not rebuild sources \n'
 
+    def _assemble_modules(self):
+        """
+        :return: Module purge/load statements
+        """
+        file_module = 'module purge\n'
+        for module in self.get_modules():
+            file_module += 'module load ' + module + '\n'
+        return file_module
+
+    def _assemble_body(self, src, name_postfix=''):
+        """
+        Assemble the part of the job script that prepares the run directory
+        :param src: Object of ScrData
+        :param name_postfix: Postfix that represents the test case
+        :return: Body of the job script
+        """
         # TODO;
         # 1) check if self._exec_name can be found in the current folder
         # 2) copy self._exec_name to the TMPDIR
         file_body = 'echo "JOBID: ${SLURM_JOB_ID}"\n'
         file_body += 'cp ' + src.get_exec_name() + ' ${TMPDIR}\n'
         file_body += 'WRKDIR=${PWD}\n'
-        results_dir = '${WRKDIR}/results' + name_postfix
         if name_postfix != '':
-            file_body += 'mkdir ' + results_dir + '\n'
+            file_body += 'mkdir -p ' + self._assemble_results_dir(name_postfix) + '\n'
         file_body += 'cd ${TMPDIR}\n'
+        return file_body
+
+    def _assemble_counters(self):
+        """
+        Assemble the selection of the hardware counter tool. The tool is chosen when the job
+        runs, if it is not available the executable is launched without it. likwid-perfctr
+        is not used with MPI launchers: every task would program the same counters of the
+        node, so perf measures the tasks instead.
+        :return: Commands that set LASSI_COUNTERS, or an empty string if counters are disabled
+        """
+        counters = self.get_counters()
+        if counters is None:
+            return ''
+
+        events = list(counters['events'])
+        if 'duration_time' not in events:
+            events.append('duration_time')
+        tools = []
+        if counters['tool'] in ['likwid', 'auto'] and not self.has_mpi_launcher():
+            tools.append(('likwid-perfctr', 'likwid-perfctr -O -c N -g ' + counters['likwid_group']))
+        if counters['tool'] in ['perf', 'auto']:
+            tools.append(('perf', 'perf stat -x, -e ' + ','.join(events)))
+
+        file_counters = '# hardware counters\n'
+        file_counters += 'LASSI_COUNTERS=""\n'
+        keyword = 'if'
+        for tool, cmd in tools:
+            file_counters += keyword + ' command -v ' + tool + ' > /dev/null 2>&1; then\n'
+            file_counters += '    LASSI_COUNTERS="' + cmd + '"\n'
+            keyword = 'elif'
+        file_counters += 'else\n'
+        file_counters += '    echo "' + ' or '.join(tool for tool, cmd in tools) \
+                         + ' not found, hardware counters are not collected"\n'
+        file_counters += 'fi\n'
+        return file_counters
+
+    def _assemble_cmd(self, src, launcher_options='', exec_options=None):
+        """
+        Assemble the command that launches the executable. If hardware counters are collected,
+        the executable is wrapped in the counter tool (every task is measured separately), or
+        the whole command if the launcher is not an MPI launcher.
+        :param src: Object of ScrData
+        :param launcher_options: Options that should be passed to the launcher
+        :param exec_options: Executable options, get_exec_options() if None
+        :return: Launch command
+        """
+        if exec_options is None:
+            exec_options = self.get_exec_options()
+        launcher = self.get_launcher()
+        if launcher_options != '':
+            launcher += ' ' + launcher_options
+        if self.get_counters() is not None:
+            if self.has_mpi_launcher():
+                launcher += ' ${LASSI_COUNTERS}'
+            else:
+                launcher = '${LASSI_COUNTERS} ' + launcher
+        return self._assemble_counters() + launcher + ' ' + src.get_exec_name() + ' ' + exec_options + '\n'
 
-        file_module = 'module purge\n'
-        for module in self.get_modules():
-            file_module += 'module load ' + module + '\n'
+    def _assemble_results_dir(self, name_postfix):
+        """
+        :param name_postfix: Postfix that represents the test case
+        :return: Directory the results of the job are copied to. Every job (also every task of
+                 a job array) has its own directory, so concurrent repetitions of the test case
+                 do not write into the same one.
+        """
+        return '${WRKDIR}/results' + name_postfix + '_${SLURM_JOB_ID}'
+
+    def _assemble_footer(self, name_postfix=''):
+        """
+        :param name_postfix: Postfix that represents the test case
+        :return: Commands that copy results back to the working directory
+        """
+        if name_postfix != '':
+            return 'cp -r ${TMPDIR} ' + self._assemble_results_dir(name_postfix) + '\n'
+        return ''
+
+    def _assemble_version(self):
+        """
+        :return: Shebang and the version comment of the job script
+        """
+        return '#!/bin/bash\n' \
+               '#\n' \
+               '# This batch script was autogenerated by LAsSI v{0}\n' \
+               '#\n'.format(VERSION)
 
-        file_cmd = self.get_launcher() + ' ' + src.get_exec_name() + ' ' + self.get_exec_options() + '\n'
+    def _assemble_sbatch_header(self, nodes, ntasks, cpus):
+        """
+        :return: Header of the batch script with the requested resources
+        """
+        return '#SBATCH -N {0}\n' \
+               '#SBATCH -n {1}\n' \
+               '#SBATCH -c {2}\n' \
+               '#SBATCH -p {3}\n' \
+               '#SBATCH -t {4}\n'.format(nodes, ntasks, cpus,
+                                         self.get_partition(), self.get_time())
+
+    def _assemble_file(self, src, name_postfix='', compiler_flag_id=0):
+        """
+        Generate batch script from the provided input
+        :param src: Object of ScrData
+        :param name_postfix: Postfix that represents the test case
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Full text of the job script and a parsable header string
+        """
+        file_header = '###-==[HEADER]==-###'
 
-        file_footer = ''
         if name_postfix != '':
-            file_footer = 'cp -r ${TMPDIR} ' + results_dir + '\n'
+            file_header += '#SBATCH -o ./' + name_postfix + '/output.%j.out\n'
 
-        full_text = file_shebang + '\n' \
-                    + file_version + '\n' \
+        full_text = self._assemble_version() + '\n' \
                     + file_header + '\n' \
-                    + file_module + '\n' \
-                    + file_envars + '\n' \
-                    + file_comp + '\n' \
-                    + file_body + '\n' \
-                    + file_cmd + '\n' \
-                    + file_footer
+                    + self._assemble_modules() + '\n' \
+                    + self._assemble_envars(self.get_envars()) + '\n' \
+                    + self._assemble_compile(src, compiler_flag_id) + '\n' \
+                    + self._assemble_body(src, name_postfix) + '\n' \
+                    + self._assemble_cmd(src) + '\n' \
+                    + self._assemble_footer(name_postfix)
 
         return full_text, file_header
 
@@ -282,13 +545,7 @@ class BatchFileData:
         :param compiler_flag_id: ID pointing to an element in the list of compiler flags
         :return: Name of the batch file
         """
-        file_header = '#SBATCH -N {0}\n' \
-                      '#SBATCH -n {1}\n' \
-                      '#SBATCH -c {2}\n' \
-                      '#SBATCH -p {3}\n' \
-                      '#SBATCH -t {4}\n'.format(self.get_nodes(), self.get_ntasks(),
-                                                self.get_cpus(), self.get_partition(),
-                                                self.get_time())
+        file_header = self._assemble_sbatch_header(self.get_nodes(), self.get_ntasks(), self.get_cpus())
 
         full_text, header_str = self._assemble_file(src, name_postfix, compiler_flag_id)
 
@@ -304,6 +561,120 @@ class BatchFileData:
 
         return batch_file_name
 
+    def snapshot_test_case(self, wrk_dir, name_postfix, compiler_flag_id=0):
+        """
+        Store the current job settings, so the test case can be added to a job array later
+        :param wrk_dir: Path to the working directory of the test case
+        :param name_postfix: Postfix that represents the test case
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Dictionary with the settings of the test case
+        """
+        return {
+            'dir': wrk_dir,
+            'postfix': name_postfix,
+            'envars': list(self.get_envars()),
+            'nodes': self.get_nodes(),
+            'ntasks': self.get_ntasks(),
+            'cpus': self.get_cpus(),
+            'exec_options': self.get_exec_options(),
+            'compiler_flag_id': compiler_flag_id,
+        }
+
+    def generate_job_array_script(self, src, test_cases, wrk_dir='.', name_postfix=''):
+        """
+        Generate a single batch script that runs all test cases as a job array. Every test case
+        is repeated 'num_repetitions' times (see the 'num_repetitions' key of the test case), the
+        array task ID is mapped to the test case through a bash array. All test cases should
+        request the same resources (see Executor._group_array_cases()), otherwise the array
+        requests the max resources over all test cases.
+        :param src: Object of ScrData
+        :param test_cases: List of test cases returned by snapshot_test_case() with an additional
+                           'num_repetitions' key
+        :param wrk_dir: Path to the working directory, the SLURM output files will be stored here
+        :param name_postfix: Postfix that represents the sweep
+        :return: Name of the batch file
+        """
+        nodes = max(case['nodes'] for case in test_cases)
+        ntasks = max(case['ntasks'] for case in test_cases)
+        cpus = max(case['cpus'] for case in test_cases)
+        task_to_case = []
+        for case_id, case in enumerate(test_cases):
+            task_to_case += [str(case_id)] * case['num_repetitions']
+
+        file_header = self._assemble_sbatch_header(nodes, ntasks, cpus)
+        file_header += '#SBATCH --array=0-{0}\n'.format(len(task_to_case) - 1)
+
+        # Select the test case from the ID of the array task
+        file_case = 'TASK_TO_CASE=(' + ' '.join(task_to_case) + ')\n'
+        file_case += 'CASE_ID=${TASK_TO_CASE[${SLURM_ARRAY_TASK_ID}]}\n'
+        file_case += 'case ${CASE_ID} in\n'
+        for case_id, case in enumerate(test_cases):
+            indentation = '        '
+            file_case += '    {0})\n'.format(case_id)
+            file_case += indentation + 'cd ' + case['dir'] + '\n'
+            file_case += indentation + 'LASSI_POSTFIX=' + case['postfix'] + '\n'
+            file_case += indentation + 'LASSI_NODES={0}\n'.format(case['nodes'])
+            file_case += indentation + 'LASSI_NTASKS={0}\n'.format(case['ntasks'])
+            file_case += indentation + 'LASSI_CPUS={0}\n'.format(case['cpus'])
+            # A bash array keeps the quoting and expansions of the options as on a command line
+            file_case += indentation + 'LASSI_EXEC_OPTIONS=(' + case['exec_options'] + ')\n'
+            file_case += self._assemble_envars(case['envars'], indentation)
+            file_case += indentation + self._assemble_compile(src, case['compiler_flag_id'])
+            file_case += indentation + ';;\n'
+        file_case += 'esac\n'
+
+        launcher_options = ''
+        if self.get_launcher() == 'srun':
+            launcher_options = '-N ${LASSI_NODES} -n ${LASSI_NTASKS} -c ${LASSI_CPUS}'
+
+        full_text = self._assemble_version() + '\n' \
+                    + file_header + '\n' \
+                    + self._assemble_modules() + '\n' \
+                    + file_case + '\n' \
+                    + self._assemble_body(src, '${LASSI_POSTFIX}') + '\n' \
+                    + self._assemble_cmd(src, launcher_options, '"${LASSI_EXEC_OPTIONS[@]}"') + '\n' \
+                    + self._assemble_footer('${LASSI_POSTFIX}')
+
+        batch_file_name = self._assemble_job_file_name(wrk_dir, name_postfix)
+        self.dump_text_to_file(batch_file_name, full_text)
+
+        return batch_file_name
+
+    def generate_build_script(self, build_cmds, num_cpus):
+        """
+        Generate text of a batch script that compiles the code
+        :param build_cmds: Commands that compile the code
+        :param num_cpus: Number of CPUs that should be requested
+        :return: Full text of the job script
+        """
+        return self._assemble_version() + '\n' \
+               + self._assemble_sbatch_header(1, 1, num_cpus) + '\n' \
+               + self._assemble_modules() + '\n' \
+               + build_cmds
+
+    def generate_module_prologue(self):
+        """
+        Generate the module purge/load statements of the job scripts, so commands that run
+        on the current machine (e.g. the compiler) see the same environment as the jobs
+        :return: Module statements, or an empty string if no modules are given
+        """
+        if not self.get_modules():
+            return ''
+        return self._assemble_modules()
+
+    def generate_envars_snippet(self, envars, comment=''):
+        """
+        Generate text of a script that exports environment variables, so it can be
+        sourced from production job scripts
+        :param envars: List of tuples (name, value)
+        :param comment: Comment that is added after the version comment
+        :return: Full text of the script
+        """
+        text = self._assemble_version().replace('batch script', 'script')
+        if comment:
+            text += '# ' + comment + '\n#\n'
+        return text + '\n' + self._assemble_envars(envars)
+
     def generate_interactive_job_cmd(self, src, wrk_dir='.', name_postfix=''):
         """
         Generate interactive SLURM command and assemble the bash file that should
@@ -341,48 +712,23 @@ class BatchFileData:
 
         return complete_cmd_call, bash_file_name
 
-    def submit_job_script(self, job_file_name):
+    def submit_job_script(self, job_file_name, asynchronous=None):
         """
         Submit job script to the queue
         :param job_file_name: Name of the script
+        :param asynchronous: Overrides is_asynchronous() if not None
         :return: Job ID
         """
+        if asynchronous is None:
+            asynchronous = self.is_asynchronous()
+
         if job_file_name == '':
             io_manager.print_err_info('Batch file name is empty')
             sys.exit(1)
 
-        # clean up the tmp file
-        if os.path.isfile(self.get_log_name()):
-            os.remove(self.get_log_name())
-
         io_manager.print_dbg_info('Submit batch script: ' + job_file_name)
 
-        # Can use --parsable to get JOB_ID right from the sbatch call:
-        job_id = ''
-        state = ''
-        if self.is_asynchronous():
-            sbatch_call = 'sbatch --parsable ' + job_file_name
-            proc = subprocess.Popen(sbatch_call, stdout=subprocess.PIPE, shell=True)
-            (out, err) = proc.communicate()
-            if out is None:
-                io_manager.print_err_info('Could not get the job ID. Returned value is \'None\'')
-            else:
-                job_id = out.decode('utf-8').strip()
-        else:
-            os.system('sbatch --wait ' + job_file_name + ' &> ' + self.get_log_name())
-            job_id = self._extract_job_id(self.get_log_name())
-
-            # Report job ID and exit state
-            slurm_file_name = 'slurm-' + job_id + '.out'
-            state = self._extract_job_state(slurm_file_name)
-            if job_id is None:
-                io_manager.print_err_info('Could not parse the job ID. Returned value is \'None\'')
-            elif state is None:
-                io_manager.print_err_info('Could not parse the job state. Returned value is \'None\'')
-            else:
-                io_manager.print_dbg_info('Job #' + str(job_id) + ' is finished with state: ' + state)
-
-        return job_id, state
+        return self.get_backend().submit(job_file_name, asynchronous)
 
     def submit_interactive_job(self, cmd, bash_file_name):
         """
@@ -398,66 +744,4 @@ class BatchFileData:
             io_manager.print_err_info('Bash file name is empty')
             sys.exit(1)
 
-        os.system('chmod +x ' + bash_file_name)
-        io_manager.print_dbg_info('Interactive command: ' + cmd + ' ' + bash_file_name)
-        os.system(cmd + ' ' + bash_file_name)
-
-    def _wait_for_file(self, filename, max_wait_sec=120, check_interval=0.4):
-        """
-        Wait for file. Return True if file was detected within specified 'max_wait_sec'
-        limit
-        :param filename: filename on task machine
-        :param max_wait_sec: how long to wait in seconds
-        :param check_interval: how often to check in seconds
-        :return: False if waiting was cut short by max_wait_sec limit, True otherwise
-        """
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > max_wait_sec:
-                io_manager.print_dbg_info('Timeout exceeded (' + str(max_wait_sec)
-                                          + ' sec) for ' + filename)
-                return False
-            if not os.path.isfile(filename):
-                time.sleep(check_interval)
-                continue
-            else:
-                break
-        return True
-
-    def _extract_job_id(self, filename):
-        """
-        Extract job id from a file using predefined regex
-        :param filename: Name of the file
-        :return: Job ID
-        """
-        self._wait_for_file(filename)
-        with open(filename, 'r') as file:
-            file_content = file.read()
-
-        regex = r'Submitted\sbatch\sjob\s*([^\n]+)'
-        srch = re.compile(regex, re.MULTILINE)
-        job_id = srch.search(file_content)
-        if job_id is None:
-            io_manager.print_err_info('Cannot extract job ID. Regex search returned \'None\'')
-            return None
-
-        return job_id.group(1)
-
-    def _extract_job_state(self, filename):
-        """
-        Extract job state from a slurm output file using predefined regex
-        :param filename: Name of the file
-        :return: Job state
-        """
-        self._wait_for_file(filename)
-        with open(filename, 'r', encoding='latin1') as file:
-            file_content = file.read()
-
-        regex = r'State:\s*([^\s]+)'
-        srch = re.compile(regex, re.MULTILINE)
-        state = srch.search(file_content)
-        if state is None:
-            io_manager.print_err_info('Cannot extract the job state. Regex search returned \'None\'')
-            return None
-
-        return state.group(1)
+        self.get_backend().submit_interactive(cmd, bash_file_name)
@@ -0,0 +1,322 @@
+"""
+Measure how LAsSI itself scales with the size of a sweep. Synthetic output files and
+sweeps are generated in a temporary directory, then the hot paths are timed: config
+loading, job script generation, parsing of a single output file, parsing and averaging
+the results of a sweep, and plotting. The results are written to a JSON report, which
+can be compared to the report of another version.
+
+Usage: python benchmarks/hot_paths.py [--jobs 100 1000 10000 100000] [--output hot_paths.json]
+                                      [--compare baseline.json] [--quick]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from version import VERSION
+from batch_data import BatchFileData
+from executor import Executor
+from plot import Plot
+from report.generic_report import GenericReport
+from src_data import SrcData
+
+_perf_regex = r'Time:\s+\S+\s+s'
+
+_config = {
+    'modules': [],
+    'system_data': {'name': 'benchmark', 'max_cores_pre_node': 128},
+    'batch_data': {'script_base_name': 'job', 'partition': 'thin', 'nodes': 1, 'ntasks': 1, 'cpus': 1, 'time': 5,
+                   'envars': [], 'launcher': 'srun', 'executable_options': '', 'backend': 'local'},
+    'test_setup': {'type': 'omp_scalability', 'recompile': False, 'path_to_src': '.', 'compile_command': 'g++',
+                   'compiler_flags': ['-O2'], 'executable_name': 'app', 'list_of_src_files': ['app.cpp'],
+                   'thread_range': {'start': 1, 'stop': 128, 'step': 1, 'multiplier': 2},
+                   'tasks_range': {'start': 1, 'stop': 1, 'step': 1, 'multiplier': 1},
+                   'num_repetitions': 1, 'perf_regex': _perf_regex, 'use_only_last_value': False,
+                   'perf_label': 'time, [s]'},
+    'results_db': {'enabled': False},
+}
+
+
+def generate_output(file_name, num_lines, match_density, rng):
+    """
+    Write a synthetic slurm-*.out file
+    :param file_name: Name of the file
+    :param num_lines: Number of lines
+    :param match_density: Fraction of lines that match the performance regex
+    :param rng: Random number generator
+    :return: Number of matching lines
+    """
+    num_matches = 0
+    with open(file_name, 'w') as file:
+        for line in range(num_lines):
+            if rng.random() < match_density:
+                file.write('Time: {0:.6f} s\n'.format(rng.uniform(1.0, 2.0)))
+                num_matches += 1
+            else:
+                file.write('step {0}: residual {1:.6e}, iterations {2}\n'.format(line, rng.random(),
+                                                                                 rng.randint(1, 100)))
+    return num_matches
+
+
+def generate_sweep(root, num_jobs, num_cases, num_lines, match_density, rng):
+    """
+    Write the output files of a synthetic sweep, the jobs are distributed round-robin
+    over the test cases
+    :param root: Directory of the sweep
+    :param num_jobs: Number of jobs
+    :param num_cases: Number of test cases
+    :param num_lines: Number of lines per output file
+    :param match_density: Fraction of lines that match the performance regex
+    :param rng: Random number generator
+    :return: Lists of job IDs, working directories and test cases
+    """
+    job_ids = []
+    wrk_dirs = []
+    tests = []
+    for job_id in range(num_jobs):
+        test = 2 ** (job_id % num_cases)
+        wrk_dir = os.path.join(root, 'run_' + str(test))
+        if not os.path.isdir(wrk_dir):
+            os.makedirs(wrk_dir)
+        generate_output(os.path.join(wrk_dir, 'slurm-' + str(job_id) + '.out'), num_lines, match_density, rng)
+        job_ids.append(job_id)
+        wrk_dirs.append(wrk_dir)
+        tests.append(test)
+    return job_ids, wrk_dirs, tests
+
+
+def measure(function, repetitions):
+    """
+    Time a function, its output to the console is discarded
+    :param function: Function without arguments
+    :param repetitions: Number of timed runs, an untimed warm-up run precedes them
+    :return: List of wall clock times in seconds
+    """
+    times = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        function()
+        for rep in range(repetitions):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def make_result(name, params, times, num_items):
+    """
+    :param name: Name of the benchmark
+    :param params: Dictionary with parameters of the benchmark
+    :param times: List of times, see measure()
+    :param num_items: Number of processed items (files, jobs, scripts, ...) per run
+    :return: Dictionary that describes the result
+    """
+    median = statistics.median(times)
+    result = {
+        'name': name,
+        'params': params,
+        'times': times,
+        'median': median,
+        'min': min(times),
+        'items': num_items,
+        'items_per_second': num_items / median if median > 0 else None,
+    }
+    print('{0:<28} {1:<44} {2:>10.4f} {3:>10.4f} {4:>14.1f}'.format(
+        name, ' '.join(key + '=' + str(value) for key, value in params.items()), median, min(times),
+        result['items_per_second'] or 0))
+    return result
+
+
+def bench_config_loading(config_file_name, repetitions):
+    def load():
+        BatchFileData().read_config(config_file_name)
+        SrcData().read_config(config_file_name)
+    return [make_result('config_loading', {}, measure(load, repetitions), 1)]
+
+
+def bench_job_scripts(work_dir, num_scripts, repetitions):
+    exc = Executor()
+    src_data = exc.get_src_data()
+    batch_data = exc.get_batch_data()
+
+    def generate():
+        for script in range(num_scripts):
+            batch_data.generate_job_script(src_data, work_dir, '_' + str(script))
+    return [make_result('generate_job_script', {'scripts': num_scripts},
+                        measure(generate, repetitions), num_scripts)]
+
+
+def bench_output_parsing(work_dir, file_lines, densities, repetitions, rng):
+    exc = Executor()
+    results = []
+    for num_lines in file_lines:
+        for density in densities:
+            file_name = os.path.join(work_dir, 'slurm-' + str(num_lines) + '-' + str(density) + '.out')
+            generate_output(file_name, num_lines, density, rng)
+            for only_last in [False, True]:
+                times = measure(lambda: exc.parse_output_for_perf(file_name, _perf_regex, only_last), repetitions)
+                results.append(make_result('parse_output_for_perf', {'lines': num_lines, 'density': density,
+                                                                     'only_last': only_last}, times, 1))
+    return results
+
+
+def bench_sweeps(work_dir, sizes, num_cases, num_lines, density, repetitions, rng):
+    exc = Executor()
+    src_data = exc.get_src_data()
+    results = []
+    for num_jobs in sizes:
+        sweep_dir = os.path.join(work_dir, 'sweep_' + str(num_jobs))
+        job_ids, wrk_dirs, tests = generate_sweep(sweep_dir, num_jobs, num_cases, num_lines, density, rng)
+        params = {'jobs': num_jobs, 'cases': num_cases, 'lines': num_lines}
+
+        report = GenericReport()
+        times = measure(lambda: report._parse_results(exc, src_data, job_ids, wrk_dirs, tests), repetitions)
+        results.append(make_result('_parse_results', params, times, num_jobs))
+
+        performance = [rng.uniform(1.0, 2.0) for job in job_ids]
+        times = measure(lambda: report._average_results(src_data, performance, tests), repetitions)
+        results.append(make_result('_average_results', params, times, num_jobs))
+        shutil.rmtree(sweep_dir)
+    return results
+
+
+def bench_plots(work_dir, num_series, num_points, repetitions, rng):
+    if not Plot().is_enabled():
+        return []
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    pl = Plot()
+    x_points = [[2 ** point for point in range(num_points)] for series in range(num_series)]
+    y_points = [[rng.uniform(1.0, 2.0) / (point + 1) for point in range(num_points)] for series in range(num_series)]
+    labels = ['series ' + str(series) for series in range(num_series)]
+    bars = [rng.uniform(1.0, 2.0) for point in range(num_points)]
+    heatmap = [[rng.uniform(1.0, 2.0) for column in range(num_points)] for row in range(num_points)]
+    ticks = [2 ** point for point in range(num_points)]
+    cases = [
+        ('plot_scalability', lambda: pl.plot_scalability(x_points, y_points, 'scalability', labels)),
+        ('plot_parallel_efficiency', lambda: pl.plot_parallel_efficiency(x_points, y_points, 'efficiency', labels)),
+        ('plot_weak_scaling_efficiency', lambda: pl.plot_weak_scaling_efficiency(x_points, y_points, 'weak', labels)),
+        ('plot_resource_usage', lambda: pl.plot_resource_usage(x_points, y_points, 'memory', labels)),
+        ('plot_compiler_flags', lambda: pl.plot_compiler_flags(bars, [str(bar) for bar in ticks], 'flags')),
+        ('plot_heatmap', lambda: pl.plot_heatmap(heatmap, ticks, ticks, 'hybrid')),
+    ]
+    results = []
+    try:
+        for name, function in cases:
+            results.append(make_result(name, {'series': num_series, 'points': num_points},
+                                       measure(function, repetitions), 1))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def get_git_commit():
+    """
+    :return: Hash of the current commit, None if it is not known
+    """
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=_root_dir, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.decode('utf-8').strip()
+
+
+def compare(results, baseline_file_name):
+    """
+    Print the ratio of the median times of the matching benchmarks of two reports
+    :param results: List of results of the current run
+    :param baseline_file_name: Name of the report of the baseline
+    :return: None
+    """
+    with open(baseline_file_name, 'r') as file:
+        baseline = json.load(file)
+    baseline_results = {(result['name'], json.dumps(result['params'], sort_keys=True)): result
+                        for result in baseline['results']}
+    print()
+    print('Compared to ' + baseline_file_name + ' (version ' + str(baseline['version']) + ', commit '
+          + str(baseline['git_commit']) + '), ratio > 1 means slower:')
+    for result in results:
+        key = (result['name'], json.dumps(result['params'], sort_keys=True))
+        if key in baseline_results and baseline_results[key]['median'] > 0:
+            print('{0:<28} {1:<44} {2:>8.2f}'.format(
+                result['name'], ' '.join(name + '=' + str(value) for name, value in result['params'].items()),
+                result['median'] / baseline_results[key]['median']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the hot paths of LAsSI')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                        help='numbers of jobs of the synthetic sweeps (default: 100 1000 10000 100000)')
+    parser.add_argument('--cases', type=int, default=16, help='number of test cases per sweep (default: 16)')
+    parser.add_argument('--lines', type=int, default=100, help='number of lines per output file of a sweep '
+                                                               '(default: 100)')
+    parser.add_argument('--density', type=float, default=0.05,
+                        help='fraction of lines that match the performance regex (default: 0.05)')
+    parser.add_argument('--file-lines', type=int, nargs='+', default=[1000, 100000],
+                        help='numbers of lines of the single output files (default: 1000 100000)')
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.001, 0.1, 1.0],
+                        help='match densities of the single output files (default: 0.001 0.1 1.0)')
+    parser.add_argument('--scripts', type=int, default=1000, help='number of generated job scripts (default: 1000)')
+    parser.add_argument('--repetitions', type=int, default=5, help='number of runs per benchmark (default: 5)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data (default: 0)')
+    parser.add_argument('--quick', action='store_true', help='small sizes and 3 runs per benchmark')
+    parser.add_argument('--output', default='hot_paths.json', help='name of the report (default: hot_paths.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='report of another version to compare with')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.jobs = [job for job in args.jobs if job <= 1000]
+        args.file_lines = [lines for lines in args.file_lines if lines <= 10000] or [1000]
+        args.scripts = min(args.scripts, 100)
+        args.repetitions = 3
+
+    rng = random.Random(args.seed)
+    output_file_name = os.path.abspath(args.output)
+    work_dir = tempfile.mkdtemp(prefix='lassi_bench_')
+    try:
+        config_file_name = os.path.join(work_dir, 'config.json')
+        with open(config_file_name, 'w') as file:
+            json.dump(_config, file)
+        exc = Executor()
+        exc.get_batch_data().read_config(config_file_name)
+        exc.get_src_data().read_config(config_file_name)
+        exc.get_results_db().read_config(config_file_name)
+
+        print('{0:<28} {1:<44} {2:>10} {3:>10} {4:>14}'.format('benchmark', 'parameters', 'median, s', 'min, s',
+                                                                'items/s'))
+        results = []
+        results += bench_config_loading(config_file_name, args.repetitions)
+        results += bench_job_scripts(work_dir, args.scripts, args.repetitions)
+        results += bench_output_parsing(work_dir, args.file_lines, args.densities, args.repetitions, rng)
+        results += bench_sweeps(work_dir, args.jobs, args.cases, args.lines, args.density, args.repetitions, rng)
+        results += bench_plots(work_dir, 4, 8, args.repetitions, rng)
+    finally:
+        shutil.rmtree(work_dir)
+
+    report = {
+        'version': VERSION,
+        'git_commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': len(os.sched_getaffinity(0)),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': vars(args),
+        'results': results,
+    }
+    with open(output_file_name, 'w') as file:
+        json.dump(report, file, indent=2)
+    print('Report is written to ' + output_file_name)
+
+    if args.compare:
+        compare(results, args.compare)
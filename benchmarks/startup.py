@@ -0,0 +1,57 @@
+"""
+Measure the startup time of LAsSI: the time to import all modules that main.py needs
+before the first job is submitted, compared to an empty interpreter and to the import
+of matplotlib that is deferred until the first plot.
+
+Usage: python benchmarks/startup.py [--repetitions N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_cases = [
+    ('empty interpreter', 'pass'),
+    ('import main', 'import main'),
+    ('import main + first plot', 'import main; from plot import Plot; Plot()._get_pyplot()'),
+]
+
+
+def measure(code, repetitions):
+    """
+    :param code: Python code executed by a fresh interpreter
+    :param repetitions: Number of runs
+    :return: List of wall clock times in seconds
+    """
+    times = []
+    for rep in range(repetitions):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=_root_dir, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def loaded_modules(code):
+    """
+    :param code: Python code executed by a fresh interpreter
+    :return: True if matplotlib is loaded after the code is executed
+    """
+    out = subprocess.run([sys.executable, '-c', code + "; import sys; print('matplotlib' in sys.modules)"],
+                         cwd=_root_dir, check=True, stdout=subprocess.PIPE)
+    return out.stdout.decode('utf-8').strip() == 'True'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Startup time of LAsSI')
+    parser.add_argument('--repetitions', type=int, default=10, help='number of runs per case (default: 10)')
+    args = parser.parse_args()
+
+    print('{0:<28} {1:>10} {2:>10} {3:>12}'.format('case', 'median, s', 'min, s', 'matplotlib'))
+    for name, code in _cases:
+        times = measure(code, args.repetitions)
+        print('{0:<28} {1:>10.3f} {2:>10.3f} {3:>12}'.format(name, statistics.median(times), min(times),
+                                                              str(loaded_modules(code))))
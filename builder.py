@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import io_manager
+from file_hash import hash_file
+
+
+class Builder:
+    """
+    Compile every unique combination of the compile command, compiler flags and source files
+    only once. The executables are stored in the build directory under the hash of the
+    combination, so they are reused by all test cases and by later runs.
+    """
+    _build_dir_name = 'build'
+    _build_log_name = 'build.log'
+
+    def get_build_dir(self, wrk_dir):
+        """
+        :param wrk_dir: Full path to the working directory
+        :return: Full path to the build directory
+        """
+        return os.path.join(wrk_dir, self._build_dir_name)
+
+    def get_build_key(self, batch_data, src_data, compiler_flag_id=0):
+        """
+        :param batch_data: Object of BatchFileData
+        :param src_data: Object of SrcData
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Hash of the compile command, the modules and the content of the source files
+        """
+        description = {
+            'compile_command': src_data.get_compile_cmd(compiler_flag_id),
+            'modules': batch_data.get_modules(),
+            'sources': [hash_file(os.path.join(src_data.get_src_path(), src_file))
+                        for src_file in src_data.get_list_of_src_files()],
+        }
+        text = json.dumps(description, sort_keys=True)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_executable(self, batch_data, src_data, wrk_dir, compiler_flag_id=0):
+        """
+        :param batch_data: Object of BatchFileData
+        :param src_data: Object of SrcData
+        :param wrk_dir: Full path to the working directory
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Full path to the prebuilt executable (the file may not exist yet)
+        """
+        key = self.get_build_key(batch_data, src_data, compiler_flag_id)
+        return os.path.join(self.get_build_dir(wrk_dir), key, src_data.get_exec_name())
+
+    def _get_missing_builds(self, batch_data, src_data, wrk_dir, compiler_flag_ids):
+        """
+        :return: Dictionary with the paths of the executables that do not exist yet as keys
+                 and the corresponding compiler flag IDs as values
+        """
+        missing = {}
+        for flag_id in compiler_flag_ids:
+            executable = self.get_executable(batch_data, src_data, wrk_dir, flag_id)
+            if not os.path.isfile(executable) and executable not in missing:
+                missing[executable] = flag_id
+        return missing
+
+    def _compile(self, batch_data, src_data, executable, compiler_flag_id):
+        """
+        Compile a single executable in the directory with the source files. The modules
+        of the job scripts are loaded first.
+        :return: True on success, False otherwise
+        """
+        os.makedirs(os.path.dirname(executable), exist_ok=True)
+        cmd = src_data.get_compile_cmd(compiler_flag_id, executable)
+        log_name = os.path.join(os.path.dirname(executable), self._build_log_name)
+        with open(log_name, 'w') as log:
+            log.write(cmd + '\n')
+            log.flush()
+            proc = subprocess.run(batch_data.generate_module_prologue() + cmd, shell=True, executable='/bin/bash',
+                                  cwd=src_data.get_src_path(), stdout=log, stderr=subprocess.STDOUT)
+        if proc.returncode != 0:
+            io_manager.print_err_info('Compilation failed, see ' + log_name + ': ', cmd)
+            return False
+        return True
+
+    def build_on_host(self, batch_data, src_data, wrk_dir, compiler_flag_ids):
+        """
+        Compile all missing executables on the current machine with a pool of parallel
+        compiler processes. Exit if any of them fails.
+        :param batch_data: Object of BatchFileData
+        :param src_data: Object of SrcData
+        :param wrk_dir: Full path to the working directory
+        :param compiler_flag_ids: List of IDs of the compiler flags
+        :return: None
+        """
+        missing = self._get_missing_builds(batch_data, src_data, wrk_dir, compiler_flag_ids)
+        if not missing:
+            return
+
+        num_workers = src_data.get_build_workers()
+        if num_workers <= 0:
+            num_workers = len(os.sched_getaffinity(0))
+        io_manager.print_info('Building ' + str(len(missing)) + ' executable(s) with '
+                              + str(min(num_workers, len(missing))) + ' compiler process(es)', '')
+
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            succeeded = list(pool.map(lambda item: self._compile(batch_data, src_data, item[0], item[1]),
+                                      missing.items()))
+        if not all(succeeded):
+            sys.exit(1)
+
+    def build_in_job(self, batch_data, src_data, wrk_dir, compiler_flag_ids):
+        """
+        Compile all missing executables in a single job. The compilers run in parallel
+        within the job. Exit if any of the executables is not built.
+        :param batch_data: Object of BatchFileData
+        :param src_data: Object of SrcData
+        :param wrk_dir: Full path to the working directory
+        :param compiler_flag_ids: List of IDs of the compiler flags
+        :return: None
+        """
+        missing = self._get_missing_builds(batch_data, src_data, wrk_dir, compiler_flag_ids)
+        if not missing:
+            return
+
+        num_workers = src_data.get_build_workers()
+        if num_workers <= 0:
+            num_workers = min(len(missing), batch_data.get_max_cores_pre_node())
+        io_manager.print_info('Building ' + str(len(missing)) + ' executable(s) in a build job', '')
+
+        build_dir = self.get_build_dir(wrk_dir)
+        os.makedirs(build_dir, exist_ok=True)
+        file_body = 'cd ' + src_data.get_src_path() + '\n'
+        for counter, (executable, flag_id) in enumerate(missing.items()):
+            os.makedirs(os.path.dirname(executable), exist_ok=True)
+            log_name = os.path.join(os.path.dirname(executable), self._build_log_name)
+            file_body += src_data.get_compile_cmd(flag_id, executable) + ' > ' + log_name + ' 2>&1 &\n'
+            if (counter + 1) % num_workers == 0:
+                file_body += 'wait\n'
+        file_body += 'wait\n'
+
+        full_text = batch_data.generate_build_script(file_body, num_workers)
+        batch_file_name = os.path.join(build_dir, 'build.' + batch_data.get_job_file_ext())
+        batch_data.dump_text_to_file(batch_file_name, full_text)
+
+        current_dir = os.getcwd()
+        os.chdir(build_dir)
+        batch_data.submit_job_script(batch_file_name, asynchronous=False)
+        os.chdir(current_dir)
+
+        failed = [executable for executable in missing if not os.path.isfile(executable)]
+        for executable in failed:
+            io_manager.print_err_info('Compilation failed, see '
+                                      + os.path.join(os.path.dirname(executable), self._build_log_name))
+        if failed:
+            sys.exit(1)
+
+    def build(self, batch_data, src_data, wrk_dir, compiler_flag_ids):
+        """
+        Compile all missing executables according to the build stage of 'src_data'
+        :param batch_data: Object of BatchFileData
+        :param src_data: Object of SrcData
+        :param wrk_dir: Full path to the working directory
+        :param compiler_flag_ids: List of IDs of the compiler flags
+        :return: None
+        """
+        if src_data.get_build_stage() == 'host':
+            self.build_on_host(batch_data, src_data, wrk_dir, compiler_flag_ids)
+        elif src_data.get_build_stage() == 'job':
+            self.build_in_job(batch_data, src_data, wrk_dir, compiler_flag_ids)
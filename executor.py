@@ -1,12 +1,21 @@
-import shutil
+import json
+import math
 import sys
-import re
 import os
+import time
 
 import io_manager
 from batch_data import BatchFileData
 from src_data import SrcData
 from systeminfo import SystemInfo
+from result_cache import ResultCache
+from builder import Builder
+from workspace import Workspace
+from output_parser import OutputParser
+from results_db import ResultsDB
+from sweep_state import SweepState
+from tracer import Tracer
+from report import stats
 
 
 class Executor:
@@ -19,9 +28,28 @@ class Executor:
 
     _batch_data = BatchFileData()
     _src_data = SrcData()
+    _result_cache = ResultCache()
+    _builder = Builder()
+    _workspace = Workspace()
+    _output_parser = OutputParser()
+    _results_db = ResultsDB()
+    _sweep_state = SweepState()
+    _tracer = Tracer()
+    _config_file_name = None
+    _sweep_id = None
 
     _threads_range = None
 
+    # Jobs submitted asynchronously that are not finished yet
+    _pending_jobs = []
+    # Test cases that will be submitted as a job array
+    _array_cases = []
+    _num_job_arrays = 0
+    # Test cases that are repeated until the confidence interval is narrow enough
+    _adaptive_cases = []
+    # Number of jobs (including array tasks) submitted so far
+    _num_submitted_jobs = 0
+
     _mpi_vendor = ''
 
     def get_src_data(self):
@@ -30,6 +58,24 @@ class Executor:
     def get_batch_data(self):
         return self._batch_data
 
+    def get_result_cache(self):
+        return self._result_cache
+
+    def get_results_db(self):
+        return self._results_db
+
+    def get_sweep_state(self):
+        return self._sweep_state
+
+    def get_tracer(self):
+        return self._tracer
+
+    def get_num_submitted_jobs(self):
+        """
+        :return: Number of jobs (including tasks of job arrays) submitted so far
+        """
+        return self._num_submitted_jobs
+
     def get_root_dir_name(self):
         """
         :return: Root directory of the project
@@ -50,22 +96,36 @@ class Executor:
 
     def get_mpi_vendor(self):
         """
-        :return: Name of the MPI vendor (see SystemInfo.get_list_of_mpi_vendors())
+        :return: Name of the MPI vendor (see SystemInfo.get_list_of_mpi_vendors()), detected
+                 by the same (cached) probes as report_system_info()
         """
+        if self._mpi_vendor == '':
+            self._mpi_vendor = SystemInfo().get_mpi_vendor(self._batch_data.get_modules())
         return self._mpi_vendor
 
-    def prepare_env(self, filename):
+    def prepare_env(self, filename, resume=False):
         """
         Read basic configuration from the configuration file and
         set up the environment for tests. This function should be
         called prior to any test.
         :param filename: Name of the configuration file
+        :param resume: True if the previous (interrupted) run of the test should be resumed,
+                       see SweepState
         :return: None
         """
         # Read basic configuration
         self._batch_data.read_config(filename)
         self._src_data.read_config(filename)
+        self._result_cache.read_config(filename)
+        self._workspace.read_config(filename)
+        self._results_db.read_config(filename)
+        self._config_file_name = filename
+        self._apply_topology()
+        self._apply_build_stage()
         self.create_wrk_dir()
+        state_file_name = os.path.join(self.get_full_wrk_dir_path(),
+                                       'sweep_state_' + self._src_data.get_type() + '.jsonl')
+        self._sweep_state.open(state_file_name, self._src_data.get_type(), filename, resume)
 
     def report_system_info(self):
         """
@@ -75,6 +135,60 @@ class Executor:
         """
         sys_info = SystemInfo()
         self._mpi_vendor = sys_info.report_all(self._batch_data.get_modules())
+        if self._batch_data.get_topology() is not None:
+            sys_info.report_topology(self._batch_data.get_topology())
+
+    def _apply_topology(self):
+        """
+        Derive the ranges of threads and tasks that are not set (or set to 'auto') from the
+        node topology, and warn about test cases that oversubscribe a node
+        :return: None
+        """
+        topology = self._batch_data.get_topology()
+        for name, get_list, set_list in [('thread_range', self._src_data.get_threads_list,
+                                          self._src_data.set_threads_list),
+                                         ('tasks_range', self._src_data.get_tasks_list,
+                                          self._src_data.set_tasks_list)]:
+            if get_list():
+                continue
+            if topology is None:
+                io_manager.print_err_info('\'' + name + '\' is not set and cannot be derived without '
+                                          'the node topology, set \'topology\' in \'system_data\'')
+                exit(1)
+            set_list(SystemInfo().get_aligned_points(topology))
+            io_manager.print_dbg_info('Derived ' + name + ' from the node topology: ' + str(get_list()))
+
+        # Threads of all tasks of a node share its logical CPUs. The number of tasks is
+        # only changed by the MPI and hybrid tests, which place the tasks on enough nodes.
+        if self._src_data.get_type().startswith('omp_'):
+            num_cpus = self._batch_data.get_max_cores_pre_node()
+            if topology is not None:
+                num_cpus = topology['cpus']
+            tasks_per_node = max(self._batch_data.get_ntasks() // max(self._batch_data.get_nodes(), 1), 1)
+            for num_threads in self._src_data.get_threads_list():
+                if num_threads * tasks_per_node > num_cpus:
+                    io_manager.print_err_info(str(num_threads) + ' threads x ' + str(tasks_per_node)
+                                              + ' task(s) oversubscribe a node with ' + str(num_cpus)
+                                              + ' logical CPUs, the job only measures the oversubscription')
+                elif num_threads * tasks_per_node > self._batch_data.get_max_cores_pre_node():
+                    io_manager.print_dbg_info(str(num_threads) + ' threads x ' + str(tasks_per_node)
+                                              + ' task(s) use SMT threads of a node with '
+                                              + str(self._batch_data.get_max_cores_pre_node()) + ' cores')
+
+    def _apply_build_stage(self):
+        """
+        Repetitions of a test case share its run directory. If they run concurrently (asynchronous
+        jobs or job arrays), compiling inside every job script would overwrite the executable
+        while other repetitions use it, so the code is compiled on the submit host instead.
+        :return: None
+        """
+        src_data = self.get_src_data()
+        batch_data = self.get_batch_data()
+        if src_data.get_recompile_flag() and src_data.get_build_stage() == 'inline' \
+                and (batch_data.is_asynchronous() or batch_data.is_job_array()):
+            io_manager.print_info('Repetitions run concurrently, the code is compiled on the submit host '
+                                  '(build_stage \'host\')', '')
+            src_data.set_build_stage('host')
 
     def create_wrk_dir(self):
         """
@@ -83,62 +197,61 @@ class Executor:
         """
         self._create_dir(self.get_full_wrk_dir_path())
 
-    def create_wrk_copy(self, src_data, dir_name):
+    def build_executables(self, compiler_flag_ids):
+        """
+        Compile executables for the given compiler flags in advance, if the code should
+        not be compiled inside the job scripts (see SrcData.get_build_stage())
+        :param compiler_flag_ids: List of IDs of the compiler flags
+        :return: None
+        """
+        if self.get_src_data().get_recompile_flag() and self.get_src_data().get_build_stage() != 'inline':
+            with self._tracer.span('build_executables', {'compiler_flag_ids': compiler_flag_ids}):
+                self._builder.build(self.get_batch_data(), self.get_src_data(),
+                                    self.get_full_wrk_dir_path(), compiler_flag_ids)
+
+    def create_wrk_copy(self, src_data, dir_name, compiler_flag_id=0):
         """
         Make a working copy of the source code
+        :param src_data: Object of ScrData
+        :param dir_name: Name of the directory of the test case
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
         :return: None
         """
-        if src_data.get_recompile_flag():
-            self._copy_src(src_data, dir_name)
-        else:
-            self._copy_bin(src_data, dir_name)
+        with self._tracer.span('create_wrk_copy', {'dir': dir_name}):
+            if src_data.get_recompile_flag():
+                if src_data.get_build_stage() == 'inline':
+                    self._copy_src(src_data, dir_name)
+                else:
+                    self._copy_prebuilt(src_data, dir_name, compiler_flag_id)
+            else:
+                self._copy_bin(src_data, dir_name)
 
-    def parse_output_for_perf(self, filename, regex):
+    def parse_output_for_perf(self, filename, regex, only_last=False):
         """
         Parse file 'filename' and find all values that correspond to the 
         'regex'
         :param filename: Name of the file to parse
         :param regex: Regular expression to look for in the file
+        :param only_last: True if only the last value is needed, the file is
+                          then scanned backwards from its end
         :return: List of found values
         """
-        with open(filename, 'r', encoding='latin1') as file:
-            file_content = file.read()
-        file.close()
-
-        # parse using regex
-        srch = re.compile(regex)
-        res = srch.findall(file_content)
-        # extract all numbers
-        numbers = []
-        for elt in res:
-            # check for numbers written in different formats
-            float_int_num = r'\d+'
-            float_dec_num = r'(\d+\.\d*|\d*\.\d+)'
-            float_sci_num = r'(\d\.?\d*[Ee][+\-]?\d+'
-            full_regex = '-?' + float_sci_num + '|' + float_dec_num + '|' + float_int_num + ')'
-            number = float(re.search(full_regex, elt).group(0))
-            numbers.append(number)
-        
+        with self._tracer.span('parse_output_for_perf', {'file': filename}):
+            numbers = self._output_parser.parse(filename, regex, only_last)
+
         io_manager.print_dbg_info(filename, numbers)
         return numbers
 
-    def _copy_tree(self, src, dst, symlinks=False, ignore=None):
+    def _copy_tree(self, src, dst):
         """
-        Copy files recursively
+        Copy files recursively. Depending on the workspace mode, files are shared with
+        the source tree via links instead of being copied (see Workspace).
         :param src: Copy from
         :param dst: Copy to
-        :param symlinks: Include symlinks
-        :param ignore: File to ignore
         :return: None
         """
         if os.path.exists(src):
-            for item in os.listdir(src):
-                s = os.path.join(src, item)
-                d = os.path.join(dst, item)
-                if os.path.isdir(s):
-                    shutil.copytree(s, d, symlinks, ignore)
-                else:
-                    shutil.copy2(s, d)
+            self._workspace.populate_tree(src, dst)
         else:
             io_manager.print_err_info('The source directory does not exist: ' + src)
             sys.exit(1)
@@ -172,7 +285,27 @@ class Executor:
         src_full_path = os.path.join(src_full_path, src_data.get_exec_name())
         dst_full_path = os.path.join(dst_full_path, src_data.get_exec_name())
         if src_data.check_if_exec_exists():
-            shutil.copy2(src_full_path, dst_full_path)
+            self._workspace.populate_file(src_full_path, dst_full_path)
+
+    def _copy_prebuilt(self, src_data, dir_name, compiler_flag_id=0):
+        """
+        Copy prebuilt executable, build it first if it does not exist yet
+        :param src_data: Object of ScrData
+        :param dir_name: Name of the directory of the test case
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: None
+        """
+        self.build_executables([compiler_flag_id])
+        src_full_path = self._builder.get_executable(self.get_batch_data(), src_data, self.get_full_wrk_dir_path(),
+                                                     compiler_flag_id)
+        dst_full_path = os.path.join(self.get_full_wrk_dir_path(), dir_name)
+        io_manager.print_dbg_info('Copy a prebuilt executable to the working directory: '
+                                  + src_full_path + ' --> ' + dst_full_path)
+        if not os.path.isfile(src_full_path):
+            io_manager.print_err_info('The prebuilt executable does not exist: ' + src_full_path)
+            sys.exit(1)
+        self._create_dir(dst_full_path)
+        self._workspace.populate_file(src_full_path, os.path.join(dst_full_path, src_data.get_exec_name()))
 
     def _create_dir(self, dir_name):
         """
@@ -188,7 +321,8 @@ class Executor:
             io_manager.print_dbg_info('Directory already exists: ' + full_path)
 
     def run_repetitive_tests(self, batch_file_name, full_path_wrk_dir, test_case,
-                             successful_jobs_id, successful_jobs_dir, successful_jobs_test_case):
+                             successful_jobs_id, successful_jobs_dir, successful_jobs_test_case,
+                             num_repetitions=None, test_config=None):
         """
         Repeat tests a given number of times
         :param batch_file_name: Name of the job script
@@ -197,30 +331,507 @@ class Executor:
         :param successful_jobs_id: List of successful jobs IDs (in/out)
         :param successful_jobs_dir: List of successful job working directories (in/out)
         :param successful_jobs_test_case: st of successful test case names (in/out)
+        :param num_repetitions: Number of repetitions, if None the value from the config file is used
+        :param test_config: Dictionary that describes the test case, see _describe_test_case()
         :return: True if no data was appended to 'successful_jobs_X', False otherwise
         """
 
         failed = True
-        max_rep = self.get_src_data().get_num_repetitions()
+        max_rep = num_repetitions
+        if max_rep is None:
+            max_rep = self.get_src_data().get_num_repetitions()
         for rep in range(0, max_rep):
             io_manager.print_info('Iteration: ' + str(rep + 1) + '/' + str(max_rep))
 
             # Submit job script
             # Change to test directory
             os.chdir(full_path_wrk_dir)
-            job_id, state = self.get_batch_data().submit_job_script(batch_file_name)
+            with self._tracer.span('submit_job_script', {'file': batch_file_name}):
+                job_id, state = self.get_batch_data().submit_job_script(batch_file_name)
             # Change back to working directory
             os.chdir(self.get_root_dir_name())
 
+            if job_id is None or job_id == '':
+                continue
+            self._num_submitted_jobs += 1
+
+            job = self._make_job(job_id, full_path_wrk_dir, test_case,
+                                 (successful_jobs_id, successful_jobs_dir, successful_jobs_test_case),
+                                 test_config)
+            self.get_sweep_state().submit(job)
+
+            if self.get_batch_data().is_asynchronous():
+                # The job is still in the queue, its state is checked in complete_sweep()
+                self._pending_jobs.append(job)
+                failed = False
+                continue
+
             # Skip failing jobs (won't be used in the report)
-            if (job_id is not None) and (state != 'CANCELLED'):
-                successful_jobs_id.append(job_id)
-                successful_jobs_dir.append(full_path_wrk_dir)
-                successful_jobs_test_case.append(test_case)
+            if self._finish_job(job, state):
                 failed = False
         
         return failed
 
+    def _describe_test_case(self, compiler_flag_id=0):
+        """
+        Describe the test case that is currently set up in the batch data
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Dictionary with the 'description' of the test case, its 'hash' and the
+                 'cache_key' (None if the result cache is disabled)
+        """
+        description = self.get_result_cache().describe(self.get_batch_data(), self.get_src_data(),
+                                                       compiler_flag_id)
+        config_hash = self.get_result_cache().compute_key(description)
+        return {
+            'description': description,
+            'hash': config_hash,
+            'cache_key': config_hash if self.get_result_cache().is_enabled() else None,
+        }
+
+    def _make_job(self, job_id, full_path_wrk_dir, test_case, lists, test_config=None):
+        """
+        :param job_id: Job ID
+        :param full_path_wrk_dir: Directory with the SLURM output file of the job
+        :param test_case: Name of the test case (e.g. number of threads)
+        :param lists: Tuple of lists of successful jobs IDs, directories and test cases
+        :param test_config: Dictionary that describes the test case, see _describe_test_case()
+        :return: Dictionary that describes the submitted job
+        """
+        if test_config is None:
+            test_config = {'description': None, 'hash': None, 'cache_key': None}
+        return {
+            'id': job_id,
+            'dir': full_path_wrk_dir,
+            'test_case': test_case,
+            'lists': lists,
+            'cache_key': test_config['cache_key'],
+            'config_hash': test_config['hash'],
+            'config': test_config['description'],
+            'submitted_at': time.time(),
+            'metrics': test_config.get('metrics'),
+        }
+
+    def get_sweep_id(self):
+        """
+        :return: ID of the current sweep in the results database, the sweep is
+                 started on the first call
+        """
+        if self._sweep_id is None:
+            with open(self._config_file_name) as file:
+                config = json.load(file)
+            self._sweep_id = self.get_results_db().start_sweep(self.get_src_data().get_type(), config)
+        return self._sweep_id
+
+    def _finish_job(self, job, state):
+        """
+        Store the output of a finished job in the result cache, in the results database
+        and in the sweep state, and append the job to the lists of successful jobs if it is
+        completed. Failed jobs, jobs that timed out and jobs in the 'UNKNOWN' state (see
+        JobMonitor.wait()) are not used in the report. Jobs of a resumed run that had already finished (see _resume_jobs()) were stored back then,
+        they are only appended.
+        :param job: Dictionary that describes the job (see run_repetitive_tests())
+        :param state: Final state of the job
+        :return: True if the job was appended, False otherwise
+        """
+        node_list = ''
+        accounting = {}
+        record = self.get_batch_data().get_backend().get_record(job['id'])
+        if record is not None:
+            node_list = record['node_list']
+            accounting = record.get('accounting', {})
+            self._tracer.add_job(job['id'], accounting.get('submit_time'), accounting.get('start_time'),
+                                 accounting.get('end_time'))
+        stored = job.get('stored', False)
+        if not stored:
+            # Jobs taken from the result cache are only added if they are not in the database yet
+            self.get_results_db().record_job(self.get_sweep_id(), self.get_src_data().get_type(),
+                                             job, state, node_list, accounting, job['submitted_at'] is None)
+
+        values = []
+        if state == 'COMPLETED':
+            values = self._parse_job_values(job)
+        if job['submitted_at'] is not None and not stored:
+            # Jobs taken from the result cache are not a part of the sweep state
+            self.get_sweep_state().finish(job, state, values)
+
+        if state != 'COMPLETED':
+            io_manager.print_dbg_info('Job #' + str(job['id']) + ' is not used in the report, its state is ' + state)
+            return False
+
+        if job.get('cache_key') is not None and not stored:
+            output_file = os.path.join(job['dir'], 'slurm-' + str(job['id']) + '.out')
+            self.get_result_cache().store(job['cache_key'], job['id'], output_file)
+
+        successful_jobs_id, successful_jobs_dir, successful_jobs_test_case = job['lists']
+        successful_jobs_id.append(job['id'])
+        successful_jobs_dir.append(job['dir'])
+        successful_jobs_test_case.append(job['test_case'])
+
+        if job['metrics'] is not None and values:
+            # The same value of the job as in the report
+            src_data = self.get_src_data()
+            job['metrics'].append(stats.reduce_output(values, src_data.get_use_only_last_value(),
+                                                      src_data.get_warmup_values(), src_data.get_statistic()))
+        return True
+
+    def _parse_job_values(self, job):
+        """
+        Extract the performance values of a finished job. The extracted values are stored
+        in the results database, so they are not parsed again when the report is generated.
+        :param job: Dictionary that describes the job (see run_repetitive_tests())
+        :return: List of values, empty if the output cannot be parsed
+        """
+        output_file = os.path.join(job['dir'], 'slurm-' + str(job['id']) + '.out')
+        regex = self.get_src_data().get_perf_regex()
+        only_last = self.get_src_data().get_use_only_last_value()
+        try:
+            with self._tracer.span('parse_output_for_perf', {'file': output_file}):
+                values = self._output_parser.parse(output_file, regex, only_last)
+        except (OSError, ValueError, AttributeError):
+            return []
+        if values:
+            self.get_results_db().store_values([{'job_id': job['id'], 'dir': job['dir'], 'values': values, 'error': None}],
+                                               regex, only_last)
+        return values
+
+    def _resume_jobs(self, test_case, lists, test_config):
+        """
+        Reuse the jobs of the test case from the interrupted run that is resumed (see
+        SweepState). Completed jobs are appended to the lists of successful jobs, jobs that
+        are still known to the scheduler are waited for. Jobs the scheduler does not know
+        anymore are submitted again.
+        :param test_case: Name of the test case (e.g. number of threads)
+        :param lists: Tuple of lists of successful jobs IDs, directories and test cases
+        :param test_config: Dictionary that describes the test case, see _describe_test_case()
+        :return: List of IDs of the reused jobs
+        """
+        previous_jobs = self.get_sweep_state().take_jobs(test_config['hash'], test_case)
+        if not previous_jobs:
+            return []
+
+        unfinished = [str(job['id']) for job in previous_jobs if job['state'] is None]
+        known = self.get_batch_data().get_backend().query(unfinished) if unfinished else {}
+        jobs = []
+        for previous_job in previous_jobs:
+            if previous_job['state'] is None and str(previous_job['id']) not in known:
+                continue
+            job = self._make_job(previous_job['id'], previous_job['dir'], test_case, lists, test_config)
+            job['submitted_at'] = previous_job['submitted_at']
+            if previous_job['state'] is not None:
+                job['state'] = previous_job['state']
+                # The job was stored when it finished in the interrupted run
+                job['stored'] = True
+            jobs.append(job)
+        if not jobs:
+            return []
+        io_manager.print_info('Resuming ' + str(len(jobs)) + ' job(s) of the previous run')
+
+        if self.get_batch_data().is_asynchronous() or self.get_batch_data().is_job_array():
+            # The jobs are appended in complete_sweep()
+            self._pending_jobs.extend(jobs)
+        else:
+            # Wait right away to keep the order of test cases
+            job_ids = [job['id'] for job in jobs if 'state' not in job]
+            records = {}
+            if job_ids:
+                with self._tracer.span('wait_for_jobs', {'jobs': len(job_ids)}):
+                    records = self.get_batch_data().wait_for_jobs(job_ids)
+            for job in jobs:
+                self._finish_job(job, job['state'] if 'state' in job else records[job['id']]['state'])
+        return [job['id'] for job in jobs]
+
+    def _reuse_cached_jobs(self, test_case, successful_jobs_id, successful_jobs_dir,
+                           successful_jobs_test_case, test_config, num_repetitions, excluded_ids=()):
+        """
+        Append jobs from the result cache to the lists of successful jobs. Jobs that are
+        already in the lists (e.g. from an earlier stage of a tuning run that has the same
+        configuration) are not appended again.
+        :param test_case: Name of the test case (e.g. number of threads)
+        :param successful_jobs_id: List of successful jobs IDs (in/out)
+        :param successful_jobs_dir: List of successful job working directories (in/out)
+        :param successful_jobs_test_case: List of successful test case names (in/out)
+        :param test_config: Dictionary that describes the test case, see _describe_test_case()
+        :param num_repetitions: Max number of jobs to reuse
+        :param excluded_ids: IDs of the jobs that should not be reused, e.g. the resumed ones
+        :return: Number of reused jobs
+        """
+        excluded_ids = [str(job_id) for job_id in list(excluded_ids) + successful_jobs_id]
+        cached_jobs = self.get_result_cache().lookup(test_config['cache_key'])
+        cached_jobs = [(cached_dir, job_id) for cached_dir, job_id in cached_jobs
+                       if job_id not in excluded_ids][:max(num_repetitions, 0)]
+        if cached_jobs:
+            io_manager.print_info('Reusing ' + str(len(cached_jobs)) + ' cached result(s)')
+
+        for cached_dir, job_id in cached_jobs:
+            job = self._make_job(job_id, cached_dir, test_case,
+                                 (successful_jobs_id, successful_jobs_dir, successful_jobs_test_case),
+                                 test_config)
+            job['cache_key'] = None
+            job['submitted_at'] = None
+            job['state'] = 'COMPLETED'
+            if self.get_batch_data().is_asynchronous() or self.get_batch_data().is_job_array():
+                # Keep the order of test cases, the job is appended in complete_sweep()
+                self._pending_jobs.append(job)
+            else:
+                self._finish_job(job, job['state'])
+
+        return len(cached_jobs)
+
+    def run_test_case(self, full_path_wrk_dir, name_postfix, test_case,
+                      successful_jobs_id, successful_jobs_dir, successful_jobs_test_case,
+                      compiler_flag_id=0, num_repetitions=None):
+        """
+        Generate the job script for the test case and repeat it a given number of times.
+        Results that are already in the result cache are reused and only the missing
+        repetitions are submitted. If an interrupted run is resumed, its jobs are reused
+        first (see _resume_jobs()). If job arrays are enabled, the current job settings
+        are only stored and the test case is submitted later as a part of a job array
+        (see complete_sweep()). In the adaptive mode (see SrcData.is_adaptive_repetitions())
+        more repetitions may be submitted by complete_sweep(). Should be called after all
+        envars of the test case are set.
+        :param full_path_wrk_dir: Full path to the working directory
+        :param name_postfix: Postfix that represents the test case
+        :param test_case: Name of the test case (e.g. number of threads)
+        :param successful_jobs_id: List of successful jobs IDs (in/out)
+        :param successful_jobs_dir: List of successful job working directories (in/out)
+        :param successful_jobs_test_case: List of successful test case names (in/out)
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :param num_repetitions: Number of repetitions, if None the value from the config file
+                                is used. A given number of repetitions is never adapted.
+        :return: None
+        """
+        adaptive = self.get_src_data().is_adaptive_repetitions() and num_repetitions is None
+        num_rep = self.get_src_data().get_num_repetitions() if num_repetitions is None else num_repetitions
+        test_config = self._describe_test_case(compiler_flag_id)
+        if adaptive:
+            # Performance of every successful job, see _finish_job()
+            test_config['metrics'] = []
+
+        self.get_sweep_state().plan(test_config['hash'], test_case, num_rep)
+        max_reused = self.get_src_data().get_max_repetitions() if adaptive else num_rep
+        resumed_ids = self._resume_jobs(test_case, (successful_jobs_id, successful_jobs_dir, successful_jobs_test_case),
+                                        test_config)
+        num_reused = len(resumed_ids)
+        if test_config['cache_key'] is not None:
+            num_reused += self._reuse_cached_jobs(test_case, successful_jobs_id, successful_jobs_dir,
+                                                  successful_jobs_test_case, test_config, max_reused - num_reused,
+                                                  resumed_ids)
+        num_rep = max(num_rep - num_reused, 0)
+        if num_rep == 0 and not adaptive:
+            return
+
+        # Everything that is needed to submit repetitions of the test case
+        case = {
+            'dir': full_path_wrk_dir,
+            'test_case': test_case,
+            'lists': (successful_jobs_id, successful_jobs_dir, successful_jobs_test_case),
+            'test_config': test_config,
+            'num_repetitions': num_reused,
+        }
+        if self.get_batch_data().is_job_array():
+            case['array_case'] = self.get_batch_data().snapshot_test_case(full_path_wrk_dir, name_postfix,
+                                                                          compiler_flag_id)
+        else:
+            with self._tracer.span('generate_job_script', {'dir': full_path_wrk_dir}):
+                case['batch_file_name'] = self.get_batch_data().generate_job_script(self.get_src_data(),
+                                                                                    full_path_wrk_dir,
+                                                                                    name_postfix, compiler_flag_id)
+        if adaptive:
+            self._adaptive_cases.append(case)
+
+        self._submit_repetitions(case, num_rep)
+
+    def _submit_repetitions(self, case, num_repetitions):
+        """
+        Submit repetitions of the test case, or store them to be submitted as a part
+        of a job array
+        :param case: Dictionary that describes the test case, see run_test_case()
+        :param num_repetitions: Number of repetitions
+        :return: None
+        """
+        if num_repetitions <= 0:
+            return
+        case['num_repetitions'] += num_repetitions
+
+        if 'array_case' in case:
+            array_case = dict(case['array_case'])
+            array_case['test_case'] = case['test_case']
+            array_case['num_repetitions'] = num_repetitions
+            array_case['test_config'] = case['test_config']
+            array_case['lists'] = case['lists']
+            self._array_cases.append(array_case)
+            return
+
+        successful_jobs_id, successful_jobs_dir, successful_jobs_test_case = case['lists']
+        self.run_repetitive_tests(case['batch_file_name'], case['dir'], case['test_case'],
+                                  successful_jobs_id, successful_jobs_dir, successful_jobs_test_case,
+                                  num_repetitions, case['test_config'])
+
+    def _get_num_extra_repetitions(self, case):
+        """
+        :param case: Dictionary that describes the test case, see run_test_case()
+        :return: Number of repetitions that should be added to make the confidence interval
+                 of the performance narrower than SrcData.get_ci_width()
+        """
+        metrics = case['test_config']['metrics']
+        remaining = self.get_src_data().get_max_repetitions() - case['num_repetitions']
+        if remaining <= 0 or not metrics:
+            # Either the limit is reached, or all jobs failed
+            return 0
+
+        # The warm-up runs are not used in the report either, see stats.summarize()
+        warmup_runs = self.get_src_data().get_warmup_runs()
+        if len(metrics) > warmup_runs:
+            metrics = metrics[warmup_runs:]
+
+        target = self.get_src_data().get_ci_width()
+        width = stats.relative_ci_width(metrics, self.get_src_data().get_ci_confidence())
+        if width <= target:
+            return 0
+
+        if math.isinf(width):
+            num_extra = 1
+        else:
+            # The width of the interval decreases with the square root of the number of values
+            num_extra = math.ceil(len(metrics) * (width / target) ** 2) - len(metrics)
+        io_manager.print_info('Test case: ' + str(case['test_case']) + ' | CI width '
+                              + ('{:.1%}'.format(width) if not math.isinf(width) else 'unknown')
+                              + ' > ' + '{:.1%}'.format(target))
+        return min(max(num_extra, 1), remaining)
+
+    def _top_up_repetitions(self):
+        """
+        Submit more repetitions of the test cases whose confidence interval of the
+        performance is too wide (adaptive mode only)
+        :return: True if any repetitions were submitted, False otherwise
+        """
+        submitted = False
+        for case in self._adaptive_cases:
+            num_extra = self._get_num_extra_repetitions(case)
+            if num_extra > 0:
+                io_manager.print_info('Submitting ' + str(num_extra) + ' more repetition(s)')
+                self._submit_repetitions(case, num_extra)
+                submitted = True
+        return submitted
+
+    def _group_array_cases(self, array_cases, max_array_size):
+        """
+        Group the test cases into job arrays. All tasks of an array request the same resources,
+        so test cases with different numbers of nodes, tasks or CPUs per task (e.g. 128x1 and
+        1x128 in a hybrid sweep) go into different arrays. The test cases of a group are split
+        into several arrays if the number of array tasks exceeds the max array size.
+        :param array_cases: List of test cases, see BatchFileData.snapshot_test_case(), with
+                            additional 'num_repetitions' keys
+        :param max_array_size: Max number of tasks of an array
+        :return: List of arrays, each a list of test cases in the order of 'array_cases'
+        """
+        groups = {}
+        for array_case in array_cases:
+            shape = (array_case['nodes'], array_case['ntasks'], array_case['cpus'])
+            groups.setdefault(shape, []).append(array_case)
+
+        arrays = []
+        for group in groups.values():
+            arrays.append([])
+            num_tasks = 0
+            for array_case in group:
+                if arrays[-1] and num_tasks + array_case['num_repetitions'] > max_array_size:
+                    arrays.append([])
+                    num_tasks = 0
+                arrays[-1].append(array_case)
+                num_tasks += array_case['num_repetitions']
+        return arrays
+
+    def submit_job_arrays(self):
+        """
+        Submit all stored test cases as job arrays, see _group_array_cases(). Every array task
+        is tracked as a separate asynchronous job with ID '<array job ID>_<task ID>'.
+        :return: None
+        """
+        if not self._array_cases:
+            return
+
+        arrays = self._group_array_cases(self._array_cases, self.get_batch_data().get_max_array_size())
+        wrk_dir = self.get_full_wrk_dir_path()
+        for array_id, array_cases in enumerate(arrays):
+            postfix = self.asemble_postfix(self.get_src_data().get_type() + '_array', self._num_job_arrays)
+            self._num_job_arrays += 1
+            with self._tracer.span('generate_job_script', {'dir': wrk_dir, 'array_tasks': len(array_cases)}):
+                batch_file_name = self.get_batch_data().generate_job_array_script(self.get_src_data(), array_cases,
+                                                                                  wrk_dir, postfix)
+            io_manager.print_info('Job array: ' + str(array_id + 1) + '/' + str(len(arrays)) + ' | '
+                                  + str(sum(case['num_repetitions'] for case in array_cases)) + ' tasks')
+
+            os.chdir(wrk_dir)
+            with self._tracer.span('submit_job_script', {'file': batch_file_name}):
+                array_job_id, state = self.get_batch_data().submit_job_script(batch_file_name, asynchronous=True)
+            os.chdir(self.get_root_dir_name())
+
+            if array_job_id is None or array_job_id == '':
+                io_manager.print_err_info('Job array was not submitted: ' + batch_file_name)
+                continue
+            self._num_submitted_jobs += sum(case['num_repetitions'] for case in array_cases)
+
+            task_id = 0
+            for array_case in array_cases:
+                for rep in range(array_case['num_repetitions']):
+                    job = self._make_job(array_job_id + '_' + str(task_id), wrk_dir, array_case['test_case'],
+                                         array_case['lists'], array_case['test_config'])
+                    self.get_sweep_state().submit(job)
+                    self._pending_jobs.append(job)
+                    task_id += 1
+
+        self._array_cases.clear()
+
+    def complete_sweep(self):
+        """
+        Submit the stored job arrays, wait for all asynchronously submitted jobs and
+        append the successful ones to the lists that were passed to run_test_case().
+        Jobs are appended in the order of submission, so the order of test cases is
+        the same as in the synchronous mode. In the adaptive mode, more repetitions are
+        submitted for the test cases whose confidence interval is still too wide, until
+        all intervals are narrow enough or the max number of repetitions is reached.
+        Finally, the result cache is updated.
+        :return: None
+        """
+        while True:
+            self.submit_job_arrays()
+
+            # Cached jobs already have a state, there is no need to wait for them
+            job_ids = [job['id'] for job in self._pending_jobs if 'state' not in job]
+            records = {}
+            if job_ids:
+                with self._tracer.span('wait_for_jobs', {'jobs': len(job_ids)}):
+                    records = self.get_batch_data().wait_for_jobs(job_ids)
+
+            for job in self._pending_jobs:
+                if 'state' in job:
+                    state = job['state']
+                else:
+                    state = records[job['id']]['state']
+                # Skip failing jobs (won't be used in the report)
+                self._finish_job(job, state)
+
+            self._pending_jobs.clear()
+
+            if not self._top_up_repetitions():
+                break
+
+        self._adaptive_cases.clear()
+
+        if self.get_result_cache().is_enabled():
+            self.get_result_cache().evict()
+            self.get_result_cache().save()
+
+    def report_trace(self):
+        """
+        Write the spans of the phases of the run to 'wrk/trace_<type>.json' (Chrome trace
+        format) and print their summary, see Tracer
+        :return: None
+        """
+        self._tracer.report(os.path.join(self.get_full_wrk_dir_path(),
+                                         'trace_' + self.get_src_data().get_type() + '.json'))
+
     def report_start_of_test(self, counter, num_tests):
         io_manager.print_prefix('['
                                 + str(counter) + '/'
@@ -0,0 +1,24 @@
+import hashlib
+import os
+
+# Digests of the files, identified by their path, size and modification time
+_file_digests = {}
+
+
+def hash_file(file_name):
+    """
+    Hash the content of the file. Digests are reused while the file is not modified.
+    :param file_name: Name of the file
+    :return: Hex digest, or an empty string if the file does not exist
+    """
+    if not os.path.isfile(file_name):
+        return ''
+    stat = os.stat(file_name)
+    file_id = (os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns)
+    if file_id not in _file_digests:
+        digest = hashlib.sha256()
+        with open(file_name, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_digests[file_id] = digest.hexdigest()
+    return _file_digests[file_id]
@@ -0,0 +1,403 @@
+import re
+import subprocess
+import time
+
+import io_manager
+
+
+class JobMonitor:
+    """
+    Track the state of submitted SLURM jobs. All outstanding jobs are checked with a single
+    sacct call (and a single squeue call for jobs that are not known to sacct yet), the
+    interval between two checks grows exponentially up to a given limit.
+    """
+    _finished_states = ['COMPLETED', 'FAILED', 'CANCELLED', 'TIMEOUT', 'OUT_OF_MEMORY',
+                        'NODE_FAIL', 'PREEMPTED', 'BOOT_FAIL', 'DEADLINE', 'REVOKED']
+
+    _sacct_fields = ['JobID', 'State', 'ExitCode', 'Elapsed', 'NodeList', 'TotalCPU', 'MaxRSS', 'AveCPUFreq',
+                     'ConsumedEnergy', 'AllocCPUS', 'NTasks', 'Submit', 'Start', 'End']
+
+    # Multipliers of the suffixes of sizes, frequencies and energies reported by sacct
+    _memory_suffixes = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    _decimal_suffixes = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+    _quantity_regex = re.compile(r'^(\d+\.?\d*)([KMGT]?)$')
+    # Array tasks that are not started yet are reported together, e.g. '1234_[5-99%10]'
+    _array_range_regex = re.compile(r'^(\d+)_\[([^\]]*)\]$')
+
+    _initial_interval = 5       # seconds
+    _max_interval = 120         # seconds
+    _backoff_factor = 2.0
+    _poll_budget = 0            # seconds, 0 - wait as long as needed
+    _max_empty_polls = 10       # checks in a row that do not find a job before it is given up
+
+    def get_initial_interval(self):
+        """
+        :return: Interval in seconds between the first two checks
+        """
+        return self._initial_interval
+
+    def set_initial_interval(self, interval):
+        """
+        Set the interval between the first two checks
+        :return: None
+        """
+        self._initial_interval = interval
+
+    def get_max_interval(self):
+        """
+        :return: Max interval in seconds between two checks
+        """
+        return self._max_interval
+
+    def set_max_interval(self, interval):
+        """
+        Set the max interval between two checks
+        :return: None
+        """
+        self._max_interval = interval
+
+    def get_backoff_factor(self):
+        """
+        :return: Factor that is applied to the interval after every check without progress
+        """
+        return self._backoff_factor
+
+    def set_backoff_factor(self, factor):
+        """
+        Set the growth factor of the interval
+        :return: None
+        """
+        self._backoff_factor = factor
+
+    def get_poll_budget(self):
+        """
+        :return: Max time in seconds to wait for the jobs, 0 if there is no limit
+        """
+        return self._poll_budget
+
+    def set_poll_budget(self, budget):
+        """
+        Set the max time to wait for the jobs (0 - no limit)
+        :return: None
+        """
+        self._poll_budget = budget
+
+    def get_max_empty_polls(self):
+        """
+        :return: Number of checks in a row that do not find a job in sacct or squeue, after
+                 which the job is given up with the 'UNKNOWN' state
+        """
+        return self._max_empty_polls
+
+    def set_max_empty_polls(self, max_empty_polls):
+        """
+        Set the number of checks in a row that do not find a job before it is given up
+        :return: None
+        """
+        self._max_empty_polls = max_empty_polls
+
+    def _make_unknown_record(self, state='UNKNOWN'):
+        """
+        :param state: State of the record
+        :return: Record of a job that is not known to SLURM, see parse_sacct_output()
+        """
+        return {'state': state, 'exit_code': '', 'elapsed': '', 'node_list': '', 'accounting': {}}
+
+    def expand_array_ids(self, job_id):
+        """
+        :param job_id: Job ID as reported by sacct or squeue, e.g. '1234', '1234_5' or
+                       '1234_[5-7,9%2]'
+        :return: List of the IDs of all array tasks the ID stands for, e.g. ['1234_5', '1234_6',
+                 '1234_7', '1234_9'], or a list with the job ID itself
+        """
+        match = self._array_range_regex.match(job_id)
+        if match is None:
+            return [job_id]
+        task_ids = []
+        # The max number of simultaneously running tasks ('%N') does not matter here
+        for task_range in match.group(2).split('%')[0].split(','):
+            bounds, step = (task_range.split(':') + ['1'])[:2]
+            bounds = bounds.split('-')
+            try:
+                task_ids += list(range(int(bounds[0]), int(bounds[-1]) + 1, int(step)))
+            except ValueError:
+                continue
+        return [match.group(1) + '_' + str(task_id) for task_id in task_ids]
+
+    def _match_records(self, records, job_ids):
+        """
+        Assign the records of array tasks that are reported together (see expand_array_ids())
+        to the individual tasks
+        :param records: Dictionary of job records, see parse_sacct_output()
+        :param job_ids: List of job IDs that are looked for
+        :return: Dictionary of the records of the given job IDs
+        """
+        matched = {}
+        for record_id, record in records.items():
+            for job_id in self.expand_array_ids(record_id):
+                if job_id in job_ids and job_id not in matched:
+                    matched[job_id] = record
+        return matched
+
+    def get_sacct_fields(self):
+        """
+        :return: List of fields requested from sacct
+        """
+        return self._sacct_fields
+
+    def is_finished_state(self, state):
+        """
+        :param state: Job state as reported by SLURM
+        :return: True if the job with the given state will not change its state anymore
+        """
+        if state is None or state == '':
+            return False
+        # sacct may report states like 'CANCELLED by 12345'
+        return state.split()[0] in self._finished_states
+
+    def parse_duration(self, text):
+        """
+        :param text: Duration in the format of sacct, e.g. '1-02:03:04', '02:03:04' or '03:04.567'
+        :return: Duration in seconds, None if the text is empty or cannot be parsed
+        """
+        days = 0
+        if '-' in text:
+            days, text = text.split('-', 1)
+        try:
+            seconds = 0.0
+            for part in text.split(':'):
+                seconds = seconds * 60 + float(part)
+            return int(days) * 86400 + seconds
+        except ValueError:
+            return None
+
+    def parse_timestamp(self, text):
+        """
+        :param text: Time in the format of sacct, e.g. '2024-03-01T12:34:56'
+        :return: Time in seconds since the epoch, None if the text is empty, 'Unknown' or
+                 cannot be parsed
+        """
+        try:
+            return time.mktime(time.strptime(text.strip(), '%Y-%m-%dT%H:%M:%S'))
+        except ValueError:
+            return None
+
+    def parse_quantity(self, text, suffixes):
+        """
+        :param text: Number with an optional suffix, e.g. '1024K' or '2.60G'
+        :param suffixes: Dictionary with suffixes as keys and multipliers as values
+        :return: Value multiplied by the multiplier of the suffix, None if the text is empty
+                 or cannot be parsed
+        """
+        match = self._quantity_regex.match(text.strip())
+        if match is None:
+            return None
+        return float(match.group(1)) * suffixes[match.group(2)]
+
+    def parse_accounting(self, row):
+        """
+        Convert the resource usage of a single line of the sacct output
+        :param row: Dictionary with sacct fields as keys and strings as values
+        :return: Dictionary with 'elapsed' (seconds), 'total_cpu' (seconds), 'max_rss' (bytes),
+                 'ave_cpu_freq' (Hz), 'consumed_energy' (J), 'alloc_cpus', 'ntasks', 'submit_time',
+                 'start_time' and 'end_time' (seconds since the epoch) keys. Values that are not
+                 reported are None.
+        """
+        ave_cpu_freq = None
+        match = self._quantity_regex.match(row['AveCPUFreq'].strip())
+        if match is not None:
+            # Frequencies without a suffix are in kHz
+            ave_cpu_freq = float(match.group(1)) * (self._decimal_suffixes[match.group(2)] if match.group(2) else 1e3)
+        alloc_cpus = self.parse_quantity(row['AllocCPUS'], self._decimal_suffixes)
+        ntasks = self.parse_quantity(row['NTasks'], self._decimal_suffixes)
+        return {
+            'elapsed': self.parse_duration(row['Elapsed']),
+            'total_cpu': self.parse_duration(row['TotalCPU']),
+            'max_rss': self.parse_quantity(row['MaxRSS'], self._memory_suffixes),
+            'ave_cpu_freq': ave_cpu_freq,
+            'consumed_energy': self.parse_quantity(row['ConsumedEnergy'], self._decimal_suffixes),
+            'alloc_cpus': int(alloc_cpus) if alloc_cpus is not None else None,
+            'ntasks': int(ntasks) if ntasks is not None else None,
+            'submit_time': self.parse_timestamp(row['Submit']),
+            'start_time': self.parse_timestamp(row['Start']),
+            'end_time': self.parse_timestamp(row['End']),
+        }
+
+    def _merge_step(self, accounting, step):
+        """
+        Merge the resource usage of a job step into the one of the job. sacct reports the
+        memory, frequency and number of tasks only for the steps, so the max over the steps
+        is taken. The other values of the job line are kept if they are reported.
+        :param accounting: Resource usage of the job, see parse_accounting()
+        :param step: Resource usage of the step
+        :return: None
+        """
+        for key in ['max_rss', 'ave_cpu_freq', 'ntasks']:
+            if step[key] is not None:
+                accounting[key] = step[key] if accounting[key] is None else max(accounting[key], step[key])
+        for key in ['total_cpu', 'consumed_energy']:
+            if not accounting[key] and step[key] is not None:
+                accounting[key] = step[key]
+
+    def parse_sacct_output(self, text):
+        """
+        Parse the output of 'sacct --parsable2 --noheader' called with get_sacct_fields().
+        The output contains a line per job and a line per job step ('<job ID>.batch',
+        '<job ID>.0', ...), the resource usage of the steps is merged into the job record.
+        :param text: Output of sacct
+        :return: Dictionary with job IDs as keys and dictionaries with job records as values.
+                 Each record has 'state', 'exit_code', 'elapsed', 'node_list' and 'accounting'
+                 (see parse_accounting()) keys
+        """
+        records = {}
+        steps = []
+        fields = self.get_sacct_fields()
+        for line in text.splitlines():
+            values = line.strip().split('|')
+            if len(values) < len(fields):
+                continue
+            row = dict(zip(fields, values))
+            if '.' in row['JobID']:
+                steps.append((row['JobID'].split('.')[0], self.parse_accounting(row)))
+                continue
+            records[row['JobID']] = {
+                'state': row['State'],
+                'exit_code': row['ExitCode'],
+                'elapsed': row['Elapsed'],
+                'node_list': row['NodeList'],
+                'accounting': self.parse_accounting(row),
+            }
+        for job_id, step in steps:
+            if job_id in records:
+                self._merge_step(records[job_id]['accounting'], step)
+        return records
+
+    def parse_squeue_output(self, text):
+        """
+        Parse the output of 'squeue --noheader --format=%i|%T|%M|%N'
+        :param text: Output of squeue
+        :return: Dictionary of job records, see parse_sacct_output()
+        """
+        records = {}
+        for line in text.splitlines():
+            values = line.strip().split('|')
+            if len(values) < 4:
+                continue
+            records[values[0]] = {
+                'state': values[1],
+                'exit_code': '',
+                'elapsed': values[2],
+                'node_list': values[3],
+                'accounting': {},
+            }
+        return records
+
+    def _run(self, cmd):
+        """
+        Run a command and return its stdout
+        :param cmd: Command as a list of arguments
+        :return: Stdout, or an empty string if the command failed
+        """
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as err:
+            io_manager.print_err_info('Cannot call \'' + cmd[0] + '\': ', str(err))
+            return ''
+        return result.stdout.decode('utf-8')
+
+    def query(self, job_ids):
+        """
+        Get the current state and the resource usage of all jobs with one sacct call. Jobs
+        that are not recorded by sacct yet are looked up with one squeue call. Array tasks
+        are listed one per line ('--array' and '-r'); tasks that are still reported together
+        with other tasks of the array are matched as well. An array task that is not found
+        while squeue still lists its array is pending.
+        :param job_ids: List of job IDs
+        :return: Dictionary of job records, see parse_sacct_output(). Jobs that are not
+                 known to SLURM are not present in the dictionary
+        """
+        if not job_ids:
+            return {}
+
+        out = self._run(['sacct', '-j', ','.join(job_ids), '--array',
+                         '--format=' + ','.join(self.get_sacct_fields()),
+                         '--parsable2', '--noheader'])
+        records = self._match_records(self.parse_sacct_output(out), job_ids)
+
+        missing = [job_id for job_id in job_ids if job_id not in records]
+        if missing:
+            array_ids = sorted(set(job_id.split('_')[0] for job_id in missing if '_' in job_id))
+            out = self._run(['squeue', '--noheader', '-r', '-j', ','.join(missing + array_ids),
+                             '--format=%i|%T|%M|%N'])
+            queued = self.parse_squeue_output(out)
+            records.update(self._match_records(queued, missing))
+            queued_arrays = set(record_id.split('_')[0] for record_id in queued)
+            for job_id in missing:
+                if job_id not in records and '_' in job_id and job_id.split('_')[0] in queued_arrays:
+                    records[job_id] = self._make_unknown_record('PENDING')
+
+        return records
+
+    def wait(self, job_ids, fallback_states=None):
+        """
+        Wait until all jobs are finished or the poll budget is exhausted. The state of every
+        job is reported as soon as the job is finished.
+        :param job_ids: List of job IDs
+        :param fallback_states: Dictionary with job IDs as keys and states as values, used for
+                                jobs that are known to be finished (e.g. after 'sbatch --wait')
+                                but are not found by sacct or squeue
+        :return: Dictionary of job records, see parse_sacct_output(). Jobs that did not
+                 finish within the poll budget, or were not found by get_max_empty_polls()
+                 checks in a row, have the 'UNKNOWN' state
+        """
+        if fallback_states is None:
+            fallback_states = {}
+        finished = {}
+        pending = [str(job_id) for job_id in job_ids if job_id not in ('', None)]
+        empty_polls = {job_id: 0 for job_id in pending}
+        io_manager.print_dbg_info('Waiting for ' + str(len(pending)) + ' job(s) to finish')
+
+        start_time = time.time()
+        interval = self.get_initial_interval()
+        while pending:
+            records = self.query(pending)
+            still_pending = []
+            for job_id in pending:
+                record = records.get(job_id)
+                if record is None and job_id in fallback_states:
+                    record = self._make_unknown_record(fallback_states[job_id])
+                if record is None:
+                    empty_polls[job_id] += 1
+                    if empty_polls[job_id] >= self.get_max_empty_polls():
+                        io_manager.print_err_info('Job #' + job_id + ' is not found by sacct or squeue after '
+                                                  + str(empty_polls[job_id]) + ' checks, its state is unknown')
+                        finished[job_id] = self._make_unknown_record()
+                    else:
+                        still_pending.append(job_id)
+                    continue
+                empty_polls[job_id] = 0
+                if self.is_finished_state(record['state']):
+                    finished[job_id] = record
+                    io_manager.print_dbg_info('Job #' + job_id + ' is finished with state: '
+                                              + record['state'])
+                else:
+                    still_pending.append(job_id)
+
+            if len(still_pending) < len(pending):
+                interval = self.get_initial_interval()
+            pending = still_pending
+
+            if not pending:
+                break
+            budget = self.get_poll_budget()
+            if budget > 0 and time.time() - start_time + interval > budget:
+                io_manager.print_err_info('Poll budget exceeded (' + str(budget) + ' sec), '
+                                          'unfinished jobs: ', pending)
+                for job_id in pending:
+                    finished[job_id] = self._make_unknown_record()
+                break
+            time.sleep(interval)
+            # The interval grows only while no job finishes, the first wait is the initial interval
+            interval = min(interval * self.get_backoff_factor(), self.get_max_interval())
+
+        return finished
@@ -1,3 +1,4 @@
+import argparse
 import json
 import time
 import os
@@ -8,7 +9,9 @@ import io_manager
 from analysis.omp_analysis import OMPAnalysis
 from analysis.compiler_analysis import CompilerAnalysis
 from analysis.mpi_analysis import MPIAnalysis
+from analysis.hybrid_analysis import HybridAnalysis
 from plot import Plot
+from result_cache import ResultCache
 
 
 def detect_test_case(_config_file_name):
@@ -19,13 +22,40 @@ def detect_test_case(_config_file_name):
     return _case_name
 
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='LAsSI - LAzy analySIs tool')
+    parser.add_argument('--config', default='config.json',
+                        help='name of the configuration file (default: config.json)')
+    parser.add_argument('--invalidate-cache', nargs='?', const='all', default=None, metavar='KEY',
+                        help='remove a configuration (or all configurations if KEY is not given) '
+                             'from the result cache and exit')
+    parser.add_argument('--no-plot', action='store_true',
+                        help='do not generate plots, only store the results')
+    parser.add_argument('--resume', action='store_true',
+                        help='resume the interrupted run of the test: reuse its completed jobs, wait for '
+                             'its jobs that are still in the queue and submit only the rest')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
 
-    config_file_name = 'config.json'
+    args = parse_arguments()
+    config_file_name = args.config
+
+    if args.invalidate_cache is not None:
+        cache = ResultCache()
+        cache.read_config(config_file_name)
+        cache.invalidate(None if args.invalidate_cache == 'all' else args.invalidate_cache)
+        exit(0)
+
+    if args.no_plot:
+        Plot().set_enabled(False)
+
     case_name = detect_test_case(config_file_name)
     all_known_cases = ['compiler_flags',
-                       'omp_scalability', 'omp_affinity',
-                       'mpi_scalability', 'mpi_collective']
+                       'omp_scalability', 'omp_weak_scalability', 'omp_affinity', 'omp_affinity_search',
+                       'mpi_scalability', 'mpi_weak_scalability', 'mpi_collective', 'mpi_collective_tuning',
+                       'hybrid_scalability']
     case_found = False
 
     for known_case in all_known_cases:
@@ -33,23 +63,37 @@ if __name__ == '__main__':
             case_found = True
             if 'omp_' in case_name:
                 test = OMPAnalysis()
-                test.prepare_env(config_file_name)
+                test.prepare_env(config_file_name, args.resume)
                 test.report_system_info()
-                if '_scalability' in case_name:
+                if '_weak_scalability' in case_name:
+                    test.run_weak_scalability()
+                elif '_scalability' in case_name:
                     test.run_scalability()
-                if '_affinity' in case_name:
+                if '_affinity_search' in case_name:
+                    test.run_affinity_search()
+                elif '_affinity' in case_name:
                     test.run_affinity()             # WIP
             elif 'mpi_' in case_name:
                 test = MPIAnalysis()
-                test.prepare_env(config_file_name)
+                test.prepare_env(config_file_name, args.resume)
                 test.report_system_info()
-                if '_scalability' in case_name:
+                if '_weak_scalability' in case_name:
+                    test.run_weak_scalability()
+                elif '_scalability' in case_name:
                     test.run_scalability()
-                if '_collective' in case_name:
+                if '_collective_tuning' in case_name:
+                    test.run_collective_tuning()
+                elif '_collective' in case_name:
                     test.run_collectives()
+            elif 'hybrid_' in case_name:
+                test = HybridAnalysis()
+                test.prepare_env(config_file_name, args.resume)
+                test.report_system_info()
+                if '_scalability' in case_name:
+                    test.run_scalability()
             elif 'compiler_' in case_name:
                 test = CompilerAnalysis()
-                test.prepare_env(config_file_name)  # Prepare the test environment
+                test.prepare_env(config_file_name, args.resume)  # Prepare the test environment
                 test.report_system_info()           # Report some information about the system
                 test.run_flags()                    # Execute tests
 
@@ -57,3 +101,5 @@ if __name__ == '__main__':
         io_manager.print_err_info('The test case \'' + str(case_name) + '\' is not found '
                                   'in the list of known test case names: ', all_known_cases)
         exit(1)
+
+    test.report_trace()
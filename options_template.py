@@ -0,0 +1,90 @@
+import ast
+import operator
+import re
+
+import io_manager
+
+
+# Expressions in curly braces, e.g. '{n_per_core*cores}'. Shell parameter expansions
+# such as '${SLURM_NTASKS}' are left untouched.
+_expression_regex = re.compile(r'(?<!\$)\{([^{}]+)\}')
+
+_binary_operators = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_unary_operators = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_functions = {
+    'abs': abs,
+    'int': int,
+    'max': max,
+    'min': min,
+    'round': round,
+}
+
+
+def _evaluate_node(node, variables):
+    """
+    Evaluate a node of the syntax tree. Only numbers, variables, arithmetic operators
+    and a few functions are allowed.
+    :param node: Node of the syntax tree
+    :param variables: Dictionary with values of the variables
+    :return: Value of the node
+    """
+    if isinstance(node, ast.Expression):
+        return _evaluate_node(node.body, variables)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in variables:
+            raise ValueError('unknown variable \'' + node.id + '\'')
+        return variables[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _binary_operators:
+        return _binary_operators[type(node.op)](_evaluate_node(node.left, variables),
+                                                _evaluate_node(node.right, variables))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _unary_operators:
+        return _unary_operators[type(node.op)](_evaluate_node(node.operand, variables))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _functions \
+            and not node.keywords:
+        return _functions[node.func.id](*[_evaluate_node(arg, variables) for arg in node.args])
+    raise ValueError('unsupported expression \'' + ast.dump(node) + '\'')
+
+
+def evaluate(expression, variables):
+    """
+    Evaluate an arithmetic expression without executing any code
+    :param expression: Expression, e.g. 'n_per_core*cores'
+    :param variables: Dictionary with values of the variables
+    :return: Value of the expression, floats without a fractional part are converted to int
+    """
+    value = _evaluate_node(ast.parse(expression.strip(), mode='eval'), variables)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value
+
+
+def render(template, variables):
+    """
+    Replace all expressions in curly braces with their values. Exit on failure.
+    :param template: Template, e.g. '-n {n_per_core*cores}'
+    :param variables: Dictionary with values of the variables
+    :return: Rendered string
+    """
+    def replace(match):
+        try:
+            return str(evaluate(match.group(1), variables))
+        except (SyntaxError, ValueError, TypeError, ZeroDivisionError) as err:
+            io_manager.print_err_info('Cannot evaluate \'' + match.group(0) + '\' in \'' + template + '\': ', err)
+            exit(1)
+
+    return _expression_regex.sub(replace, template)
@@ -0,0 +1,136 @@
+import os
+import re
+
+
+class OutputParser:
+    """
+    Extract performance values from (possibly very large) output files. Regular expressions
+    are compiled only once. Files are read in chunks, so the memory footprint does not
+    depend on the file size. If only the last value is needed, the file is scanned backwards
+    from its end, so the cost does not grow with the size of the file.
+
+    Matches are assumed to be shorter than get_overlap() characters.
+    """
+    # check for numbers written in different formats
+    _float_int_num = r'\d+'
+    _float_dec_num = r'(\d+\.\d*|\d*\.\d+)'
+    _float_sci_num = r'(\d\.?\d*[Ee][+\-]?\d+'
+    _number_regex = re.compile('-?' + _float_sci_num + '|' + _float_dec_num + '|' + _float_int_num + ')')
+
+    _chunk_size = 4 * 1024 * 1024   # characters
+    _overlap = 64 * 1024            # characters
+    _encoding = 'latin1'
+
+    _compiled = {}
+
+    def get_chunk_size(self):
+        """
+        :return: Number of characters read from the file at once
+        """
+        return self._chunk_size
+
+    def get_overlap(self):
+        """
+        :return: Max length of a single match
+        """
+        return self._overlap
+
+    def compile(self, regex):
+        """
+        :param regex: Regular expression
+        :return: Compiled regular expression (compiled only on the first call)
+        """
+        if regex not in self._compiled:
+            self._compiled[regex] = re.compile(regex)
+        return self._compiled[regex]
+
+    def _match_text(self, match):
+        """
+        :param match: Match object
+        :return: Matched text. Same as re.findall(): the first group if the regex has groups
+        """
+        if match.re.groups > 0:
+            return match.group(1)
+        return match.group(0)
+
+    def find_all(self, filename, regex):
+        """
+        Find all matches of the regex in the file
+        :param filename: Name of the file
+        :param regex: Regular expression
+        :return: List of matched strings
+        """
+        srch = self.compile(regex)
+        overlap = self.get_overlap()
+        res = []
+        buffer = ''
+        with open(filename, 'r', encoding=self._encoding) as file:
+            while True:
+                chunk = file.read(self.get_chunk_size())
+                eof = chunk == ''
+                buffer += chunk
+                # Matches that end close to the end of the buffer may be incomplete,
+                # they are searched again together with the next chunk
+                safe_end = len(buffer) if eof else len(buffer) - overlap
+                cut = safe_end
+                for match in srch.finditer(buffer):
+                    if match.end() > safe_end:
+                        cut = min(cut, match.start())
+                        break
+                    res.append(self._match_text(match))
+                if eof:
+                    break
+                buffer = buffer[max(cut, 0):]
+        return res
+
+    def find_last(self, filename, regex):
+        """
+        Find the last match of the regex in the file. The file is read backwards in chunks.
+        :param filename: Name of the file
+        :param regex: Regular expression
+        :return: Last matched string, or None if there is no match
+        """
+        srch = self.compile(regex)
+        overlap = self.get_overlap()
+        buffer = ''
+        with open(filename, 'rb') as file:
+            pos = file.seek(0, os.SEEK_END)
+            while True:
+                read_size = min(self.get_chunk_size(), pos)
+                pos -= read_size
+                file.seek(pos)
+                buffer = file.read(read_size).decode(self._encoding) + buffer
+                # A match that starts close to the beginning of the buffer may be a part
+                # of a longer match, unless the buffer starts at the beginning of the file
+                safe_start = 0 if pos == 0 else overlap
+                last_match = None
+                for match in srch.finditer(buffer):
+                    last_match = match
+                if last_match is not None and last_match.start() >= safe_start:
+                    return self._match_text(last_match)
+                if pos == 0:
+                    return None
+                # The last match (if any) lies in the beginning of the buffer
+                buffer = buffer[:2 * overlap]
+
+    def extract_number(self, text):
+        """
+        :param text: Matched text
+        :return: First number found in the text
+        """
+        return float(self._number_regex.search(text).group(0))
+
+    def parse(self, filename, regex, only_last=False):
+        """
+        Find all values that correspond to the regex
+        :param filename: Name of the file
+        :param regex: Regular expression
+        :param only_last: True if only the last value is needed
+        :return: List of found values
+        """
+        if only_last:
+            last = self.find_last(filename, regex)
+            matches = [] if last is None else [last]
+        else:
+            matches = self.find_all(filename, regex)
+        return [self.extract_number(match) for match in matches]
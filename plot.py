@@ -1,19 +1,59 @@
-from cProfile import label
-import matplotlib.pyplot as plt
-import matplotlib.cm as mplcm
-import matplotlib.colors as colors
-import matplotlib.style as style
-import numpy as np
+from functools import wraps
 from textwrap import wrap
 
 import io_manager
+from tracer import Tracer
+
+
+def _traced(function):
+    """
+    Record the time of a plot function as a 'plot' span, see Tracer
+    :param function: Plot function
+    :return: Wrapped function
+    """
+    @wraps(function)
+    def wrapper(self, *args, **kwargs):
+        if not self.is_enabled():
+            return function(self, *args, **kwargs)
+        with Tracer().span('plot', {'function': function.__name__}):
+            return function(self, *args, **kwargs)
+    return wrapper
 
 
 class Plot:
     """
-    Plot data and save plots in files
+    Plot data and save plots in files. Matplotlib is imported on the first plot (with the
+    non-interactive Agg backend), so importing this module is cheap and runs that do not
+    plot anything never load matplotlib.
     """
     _dpi = 120  # default resolution
+    _enabled = True
+    _pyplot = None
+
+    def is_enabled(self):
+        """
+        :return: True if plots should be generated
+        """
+        return Plot._enabled
+
+    def set_enabled(self, enabled):
+        """
+        Enable or disable plotting for all objects of Plot, e.g. on a headless login node
+        :param enabled: False if no plots should be generated
+        :return: None
+        """
+        Plot._enabled = enabled
+
+    def _get_pyplot(self):
+        """
+        :return: matplotlib.pyplot, imported on the first call
+        """
+        if Plot._pyplot is None:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot
+            Plot._pyplot = matplotlib.pyplot
+        return Plot._pyplot
 
     def _get_dpi(self):
         """
@@ -21,7 +61,17 @@ class Plot:
         """
         return self._dpi
 
-    def _plot_line(self, x_points, y_points, highlight, title, key_labels, x_label='omp_threads', y_label='time, [s]'):
+    def _get_error_sizes(self, points, errors):
+        """
+        :param points: List of points
+        :param errors: List of tuples (lower bound, upper bound) of the points
+        :return: Lower and upper error sizes in the format expected by matplotlib
+        """
+        return [[max(point - low, 0.0) for point, (low, high) in zip(points, errors)],
+                [max(high - point, 0.0) for point, (low, high) in zip(points, errors)]]
+
+    def _plot_line(self, x_points, y_points, highlight, title, key_labels, x_label='omp_threads', y_label='time, [s]',
+                   y_errors=None):
         """
         Plot a single line
         :param y_points: Y-axis points
@@ -30,8 +80,13 @@ class Plot:
         :param title: Title of the plot
         :param x_label: X-axis label
         :param y_label: Y-axis label
+        :param y_errors: List of lists of tuples (lower bound, upper bound) of the Y-axis points,
+                         None if no error bars should be plotted
         :return: None
         """
+        if not self.is_enabled():
+            return
+        plt = self._get_pyplot()
         num_data_sets = len(x_points)
 
         # set up the canvas
@@ -43,7 +98,8 @@ class Plot:
         plt.xlabel(x_label)
         plt.ylabel(y_label)
         plt.grid()
-        plt.xticks(x_points[0])
+        # data sets may have different lengths, e.g. if some of them were pruned
+        plt.xticks(sorted(set(x for loc_x_points in x_points for x in loc_x_points)))
         plt.title(title + ' plot')
 
         # for data_set_id in range(num_data_sets):
@@ -70,6 +126,10 @@ class Plot:
                 color_id = float(data_set_id)/float(num_data_sets - 1)
             line[0].set_color(cm(color_id))
             line[0].set_linewidth(2)
+            if y_errors is not None:
+                ax.errorbar(x_points[data_set_id], y_points[data_set_id],
+                            yerr=self._get_error_sizes(y_points[data_set_id], y_errors[data_set_id]),
+                            fmt='none', ecolor=cm(color_id), capsize=4)
             # plot minimum (best) value
             ax.plot(highlight[0][data_set_id], highlight[1][data_set_id], marker="o", markersize=15,
                     markeredgecolor="black", markerfacecolor="red",
@@ -80,9 +140,9 @@ class Plot:
         # plt.show()
         self._save_file(title)
 
-        plt.clf()
+        plt.close(f)
 
-    def _plot_bar(self, data, labels, highlight, title, x_label='time, [s]', y_label='flags'):
+    def _plot_bar(self, data, labels, highlight, title, x_label='time, [s]', y_label='flags', x_errors=None):
         """
         Plot a horizontal bar plot
         :param data: Data values
@@ -91,8 +151,15 @@ class Plot:
         :param title: Title of the plot
         :param x_label: X-axis label
         :param y_label: Y-axis label
+        :param x_errors: List of tuples (lower bound, upper bound) of the data values, None if
+                         no error bars should be plotted
         :return: None
         """
+        if not self.is_enabled():
+            return
+        import numpy as np
+        plt = self._get_pyplot()
+
         # set up the canvas
         f = plt.figure()
         f.set_figwidth(10)
@@ -109,7 +176,10 @@ class Plot:
         # plot performance values
         y_pos = np.arange(len(labels))
 
-        hbars = plt.barh(labels, data, align='center',
+        xerr = None
+        if x_errors is not None:
+            xerr = self._get_error_sizes(data, x_errors)
+        hbars = plt.barh(labels, data, align='center', xerr=xerr, capsize=4,
                          color=['steelblue' if (d > highlight[1])
                                 else 'lightcoral' for d in data])
         plt.bar_label(hbars, label_type='center', fmt='%.4f')
@@ -119,7 +189,7 @@ class Plot:
         # plt.show()
         self._save_file(title)
         
-        plt.clf()
+        plt.close(f)
 
     def _save_file(self, title):
         """
@@ -128,10 +198,11 @@ class Plot:
         :return: None
         """
         output_filename = title + '.png'
-        plt.savefig(output_filename, dpi=self._get_dpi())
+        self._get_pyplot().savefig(output_filename, dpi=self._get_dpi())
         io_manager.print_dbg_info('File ' + output_filename + ' is saved')
 
-    def plot_compiler_flags(self, data, labels, title, x_label='time, [s]', y_label='flags'):
+    @_traced
+    def plot_compiler_flags(self, data, labels, title, x_label='time, [s]', y_label='flags', x_errors=None):
         """
         Generate bar plot for a set of compiler flags
         :param data: Data values
@@ -139,14 +210,17 @@ class Plot:
         :param title: Plot title
         :param x_label: X-axis label
         :param y_label: Y-axis label
+        :param x_errors: List of tuples (lower bound, upper bound) of the data values
         :return: none
         """
         best_value = min(data)
         best_pos = labels[data.index(best_value)]
 
-        self._plot_bar(data, labels, (best_pos, best_value), title, x_label, y_label)
+        self._plot_bar(data, labels, (best_pos, best_value), title, x_label, y_label, x_errors)
 
-    def plot_scalability(self, x_points, y_points, title, key_labels, x_label='cores', y_label='time, [s]'):
+    @_traced
+    def plot_scalability(self, x_points, y_points, title, key_labels, x_label='cores', y_label='time, [s]',
+                         y_errors=None):
         """
         Generate plot for scalability
         :param x_points: X-axis points
@@ -154,6 +228,7 @@ class Plot:
         :param title: Title of the plot
         :param x_label: X-axis label
         :param y_label: Y-axis label
+        :param y_errors: List of lists of tuples (lower bound, upper bound) of the Y-axis points
         :return: None
         """
         self.check_number_of_sets(x_points, y_points)
@@ -172,9 +247,11 @@ class Plot:
             best_value[data_set_id] = loc_best_value
             best_pos[data_set_id] = loc_best_pos
 
-        self._plot_line(x_points, y_points, (best_pos, best_value), title, key_labels, x_label, y_label)
+        self._plot_line(x_points, y_points, (best_pos, best_value), title, key_labels, x_label, y_label, y_errors)
 
-    def plot_parallel_efficiency(self, x_points, y_points, title, key_labels, x_label='cores', y_label='time, [s]'):
+    @_traced
+    def plot_parallel_efficiency(self, x_points, y_points, title, key_labels, x_label='cores', y_label='time, [s]',
+                                 y_errors=None):
         """
         Generate plot for parallel efficiency
         :param x_points: X-axis points
@@ -182,6 +259,8 @@ class Plot:
         :param title: Title of the plot
         :param x_label: X-axis label
         :param y_label: Y-axis label
+        :param y_errors: List of lists of tuples (lower bound, upper bound) of the Y-axis points
+                         (not of the efficiency)
         :return: None
         """
         self.check_number_of_sets(x_points, y_points)
@@ -191,7 +270,10 @@ class Plot:
         best_value = [None] * num_data_sets
         best_pos = [None] * num_data_sets
 
-        efficiency = [[0 for i in range(len(x_points[0]))] for y in range(num_data_sets)]
+        efficiency = [[0 for i in range(len(x_points[y]))] for y in range(num_data_sets)]
+        efficiency_errors = None
+        if y_errors is not None:
+            efficiency_errors = [[(0, 0) for i in range(len(x_points[y]))] for y in range(num_data_sets)]
         for data_set_id in range(num_data_sets):
             loc_x_points = x_points[data_set_id]
             loc_y_points = y_points[data_set_id]
@@ -199,6 +281,11 @@ class Plot:
             for ind, val in enumerate(loc_y_points):
                 procs = loc_x_points[ind] / loc_x_points[0]
                 efficiency[data_set_id][ind] = ref_y_point / val / procs
+                if efficiency_errors is not None:
+                    # the efficiency is inversely proportional to the measured value
+                    low, high = y_errors[data_set_id][ind]
+                    efficiency_errors[data_set_id][ind] = (ref_y_point / high / procs if high > 0 else 0.0,
+                                                           ref_y_point / low / procs if low > 0 else 0.0)
 
             last_value = 0.0
             last_pos = 0
@@ -216,7 +303,153 @@ class Plot:
             best_value[data_set_id] = last_value
             best_pos[data_set_id] = loc_x_points[last_pos]
 
-        self._plot_line(x_points, efficiency, (best_pos, best_value), title, key_labels, x_label, y_label)
+        self._plot_line(x_points, efficiency, (best_pos, best_value), title, key_labels, x_label, y_label,
+                        efficiency_errors)
+
+    @_traced
+    def plot_weak_scaling_efficiency(self, x_points, y_points, title, key_labels, x_label='cores',
+                                     y_label='efficiency', y_errors=None):
+        """
+        Generate plot for weak scaling efficiency T1/Tn, where the problem size grows with
+        the number of cores
+        :param x_points: X-axis points
+        :param y_points: Y-axis points
+        :param title: Title of the plot
+        :param x_label: X-axis label
+        :param y_label: Y-axis label
+        :param y_errors: List of lists of tuples (lower bound, upper bound) of the Y-axis points
+                         (not of the efficiency)
+        :return: None
+        """
+        self.check_number_of_sets(x_points, y_points)
+        self.check_number_of_sets(x_points[0], y_points[0])
+
+        num_data_sets = len(x_points)
+        best_value = [None] * num_data_sets
+        best_pos = [None] * num_data_sets
+
+        efficiency = [[0 for i in range(len(x_points[y]))] for y in range(num_data_sets)]
+        efficiency_errors = None
+        if y_errors is not None:
+            efficiency_errors = [[(0, 0) for i in range(len(x_points[y]))] for y in range(num_data_sets)]
+        for data_set_id in range(num_data_sets):
+            loc_x_points = x_points[data_set_id]
+            loc_y_points = y_points[data_set_id]
+            ref_y_point = loc_y_points[0]
+            for ind, val in enumerate(loc_y_points):
+                efficiency[data_set_id][ind] = ref_y_point / val
+                if efficiency_errors is not None:
+                    # the efficiency is inversely proportional to the measured value
+                    low, high = y_errors[data_set_id][ind]
+                    efficiency_errors[data_set_id][ind] = (ref_y_point / high if high > 0 else 0.0,
+                                                           ref_y_point / low if low > 0 else 0.0)
+
+            # highlight the largest number of cores before the efficiency drops by 20%
+            last_pos = 0
+            threshold = 0.2
+            for ind, val in enumerate(efficiency[data_set_id]):
+                if ind != 0 and val < (1 - threshold):
+                    break
+                last_pos = ind
+            best_value[data_set_id] = efficiency[data_set_id][last_pos]
+            best_pos[data_set_id] = loc_x_points[last_pos]
+
+        self._plot_line(x_points, efficiency, (best_pos, best_value), title, key_labels, x_label, y_label,
+                        efficiency_errors)
+
+    @_traced
+    def plot_resource_usage(self, x_points, y_points, title, key_labels, x_label='cores', y_label='memory per core, [MB]',
+                            highest_is_best=False):
+        """
+        Generate plot of the resource usage, e.g. memory per core or CPU efficiency
+        :param x_points: X-axis points
+        :param y_points: Y-axis points
+        :param title: Title of the plot
+        :param key_labels: Labels of the data sets
+        :param x_label: X-axis label
+        :param y_label: Y-axis label
+        :param highest_is_best: True if the highest value should be highlighted, False for the lowest one
+        :return: None
+        """
+        self.check_number_of_sets(x_points, y_points)
+
+        best_value = []
+        best_pos = []
+        for loc_x_points, loc_y_points in zip(x_points, y_points):
+            loc_best_value = max(loc_y_points) if highest_is_best else min(loc_y_points)
+            best_value.append(loc_best_value)
+            best_pos.append(loc_x_points[loc_y_points.index(loc_best_value)])
+
+        self._plot_line(x_points, y_points, (best_pos, best_value), title, key_labels, x_label, y_label)
+
+    @_traced
+    def plot_resource_usage_bars(self, data, labels, title, x_label='memory per core, [MB]', y_label='flags',
+                                 highest_is_best=False):
+        """
+        Generate bar plot of the resource usage for a set of compiler flags
+        :param data: Data values
+        :param labels: Data labels
+        :param title: Plot title
+        :param x_label: X-axis label
+        :param y_label: Y-axis label
+        :param highest_is_best: True if the highest value should be highlighted, False for the lowest one
+        :return: None
+        """
+        best_value = max(data) if highest_is_best else min(data)
+        best_pos = labels[data.index(best_value)]
+
+        self._plot_bar(data, labels, (best_pos, best_value), title, x_label, y_label)
+
+    @_traced
+    def plot_heatmap(self, data, x_ticks, y_ticks, title, x_label='threads', y_label='tasks', z_label='time, [s]'):
+        """
+        Generate a heatmap, e.g. of the performance of MPI tasks x OpenMP threads combinations.
+        The best (minimum) value is highlighted.
+        :param data: List of rows of values, None for missing values
+        :param x_ticks: Labels of the columns
+        :param y_ticks: Labels of the rows
+        :param title: Title of the plot
+        :param x_label: X-axis label
+        :param y_label: Y-axis label
+        :param z_label: Label of the color bar
+        :return: None
+        """
+        if not self.is_enabled():
+            return
+        import numpy as np
+        plt = self._get_pyplot()
+
+        values = np.array([[np.nan if val is None else val for val in row] for row in data], dtype=float)
+
+        # set up the canvas
+        f = plt.figure()
+        f.set_figwidth(max(len(x_ticks) * 1.2, 8))
+        f.set_figheight(max(len(y_ticks) * 0.8, 6))
+
+        image = plt.imshow(values, cmap='viridis_r', origin='lower', aspect='auto')
+        plt.colorbar(image, label=z_label)
+        plt.xticks(range(len(x_ticks)), x_ticks)
+        plt.yticks(range(len(y_ticks)), y_ticks)
+        plt.xlabel(x_label)
+        plt.ylabel(y_label)
+        plt.title(title + ' plot')
+
+        # print values in the cells
+        for row in range(values.shape[0]):
+            for col in range(values.shape[1]):
+                if not np.isnan(values[row, col]):
+                    plt.text(col, row, '%.4g' % values[row, col], ha='center', va='center', color='black')
+
+        # highlight the minimum (best) value
+        if not np.all(np.isnan(values)):
+            best_row, best_col = np.unravel_index(np.nanargmin(values), values.shape)
+            plt.plot(best_col, best_row, marker="s", markersize=30, markeredgecolor="red",
+                     markerfacecolor="none", markeredgewidth=2)
+
+        plt.tight_layout()
+        self._save_file(title)
+
+        plt.close(f)
 
     def check_number_of_sets(self, x_points, y_points):
         """
@@ -0,0 +1,58 @@
+from report import stats
+
+
+# Derived metrics and their labels, see derive_metrics()
+_metric_labels = {
+    'memory_per_core': 'memory per core, [MB]',
+    'cpu_efficiency': 'CPU efficiency',
+    'energy': 'energy to solution, [J]',
+}
+
+
+def derive_metrics(accounting):
+    """
+    Compute metrics from the resource usage of a job. Metrics that cannot be computed
+    from the reported values are not in the result.
+    :param accounting: Dictionary with the resource usage, see JobMonitor.parse_accounting()
+    :return: Dictionary with 'memory_per_core' (max resident memory of a task divided by
+             the number of CPUs per task, in MB), 'cpu_efficiency' (used CPU time relative
+             to the allocated one) and 'energy' (consumed energy in J) keys
+    """
+    metrics = {}
+    max_rss = accounting.get('max_rss')
+    alloc_cpus = accounting.get('alloc_cpus')
+    if max_rss is not None and alloc_cpus:
+        cpus_per_task = max(alloc_cpus / (accounting.get('ntasks') or 1), 1)
+        metrics['memory_per_core'] = max_rss / cpus_per_task / 1024 ** 2
+
+    elapsed = accounting.get('elapsed')
+    total_cpu = accounting.get('total_cpu')
+    if total_cpu is not None and elapsed and alloc_cpus:
+        metrics['cpu_efficiency'] = total_cpu / (elapsed * alloc_cpus)
+
+    # Clusters without energy accounting report 0
+    if accounting.get('consumed_energy'):
+        metrics['energy'] = accounting['consumed_energy']
+    return metrics
+
+
+def get_metric_labels():
+    """
+    :return: Dictionary with derived metrics as keys and their labels as values
+    """
+    return _metric_labels
+
+
+def summarize(metric_sets, statistic='mean'):
+    """
+    Represent the metrics of repeated runs of a test case by a single value per metric
+    :param metric_sets: List of dictionaries returned by derive_metrics()
+    :param statistic: Statistic, see stats.get_statistics()
+    :return: Dictionary with metrics as keys and values as values
+    """
+    summary = {}
+    for metric in _metric_labels:
+        values = [metrics[metric] for metrics in metric_sets if metric in metrics]
+        if values:
+            summary[metric] = stats.aggregate(values, statistic)
+    return summary
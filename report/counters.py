@@ -0,0 +1,208 @@
+import re
+
+from report import stats
+
+
+# Size of a cache line in bytes, used to estimate the memory bandwidth from LLC misses
+_cache_line_size = 64
+
+# Events (perf names and likwid names) that represent the same counter
+_canonical_events = {
+    'cycles': ['cycles', 'cpu-cycles', 'CPU_CLK_UNHALTED_CORE'],
+    'instructions': ['instructions', 'INSTR_RETIRED_ANY'],
+    'llc_misses': ['LLC-load-misses', 'LLC-store-misses'],
+}
+
+# Floating point operations per event of the 'fp_arith_inst_retired' family
+_fp_weights = {
+    'scalar_double': 1,
+    'scalar_single': 1,
+    '128b_packed_double': 2,
+    '128b_packed_single': 4,
+    '256b_packed_double': 4,
+    '256b_packed_single': 8,
+    '512b_packed_double': 8,
+    '512b_packed_single': 16,
+}
+
+# Values of these events/metrics are the same for every task (or thread), so the max
+# is taken instead of the sum
+_max_events = ['duration_time', 'Runtime (RDTSC) [s]']
+
+# Derived metrics and their labels, see derive_metrics()
+_metric_labels = {
+    'ipc': 'IPC',
+    'bandwidth': 'bandwidth [GB/s]',
+    'gflops': 'GFLOP/s',
+}
+
+_perf_event_regex = re.compile(r'^[A-Za-z][\w\-.:/]*$')
+_likwid_event_regex = re.compile(r'^[A-Z][A-Z0-9_:.]*$')
+_likwid_counter_regex = re.compile(r'^[A-Z]+\d+\w*$')
+_perf_modifier_regex = re.compile(r':[ukhGHpPSD]+$')
+
+
+def _to_float(text):
+    """
+    :param text: String
+    :return: Float value of the string, None if it is not a number
+    """
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _add(counters, event, value):
+    """
+    Add a value of the event (e.g. of another task) to the counters
+    :param counters: Dictionary with events as keys and values as values
+    :param event: Name of the event
+    :param value: Value of the event
+    :return: None
+    """
+    if event in _max_events:
+        counters[event] = max(counters.get(event, value), value)
+    else:
+        counters[event] = counters.get(event, 0.0) + value
+
+
+def parse_perf_stat(lines):
+    """
+    Extract counters from the CSV output of 'perf stat -x,'. Lines have the format
+    'value,unit,event,run time,percentage,...', other lines are ignored. Values of
+    events that were counted by several tasks are summed up.
+    :param lines: Iterable of lines, e.g. an open file
+    :return: Dictionary with events (without modifiers, e.g. 'cycles' for 'cycles:u')
+             as keys and values as values
+    """
+    counters = {}
+    for line in lines:
+        fields = line.strip().split(',')
+        if len(fields) < 5 or not _perf_event_regex.match(fields[2]):
+            continue
+        value = _to_float(fields[0])
+        if value is None or _to_float(fields[3]) is None or _to_float(fields[4]) is None:
+            # '<not counted>', '<not supported>' or an unrelated line
+            continue
+        _add(counters, _perf_modifier_regex.sub('', fields[2]), value)
+    return counters
+
+
+def parse_likwid(lines):
+    """
+    Extract counters from the CSV output of 'likwid-perfctr -O'. Raw events are lines
+    'EVENT,COUNTER,value,...' with a value per hardware thread, metrics are lines
+    'name [unit],value,...'. Statistics lines ('... STAT') are ignored, the values of
+    all threads (and tasks) are summed up.
+    :param lines: Iterable of lines, e.g. an open file
+    :return: Dictionary with events/metrics as keys and values as values
+    """
+    counters = {}
+    for line in lines:
+        fields = line.strip().split(',')
+        if len(fields) < 2 or fields[0].endswith(' STAT'):
+            continue
+        if _likwid_event_regex.match(fields[0]) and len(fields) > 2 and _likwid_counter_regex.match(fields[1]):
+            values = [_to_float(field) for field in fields[2:]]
+        elif fields[0].endswith(']'):
+            values = [_to_float(field) for field in fields[1:]]
+        else:
+            continue
+        values = [value for value in values if value is not None]
+        if values:
+            _add(counters, fields[0], max(values) if fields[0] in _max_events else sum(values))
+    return counters
+
+
+def parse(lines):
+    """
+    Extract counters written by either perf or likwid
+    :param lines: Iterable of lines
+    :return: Dictionary with events as keys and values as values
+    """
+    lines = list(lines)
+    counters = parse_perf_stat(lines)
+    counters.update(parse_likwid(lines))
+    return counters
+
+
+def read(file_name):
+    """
+    :param file_name: Name of the output file
+    :return: Counters found in the file, see parse()
+    """
+    with open(file_name, 'r', encoding='latin1') as file:
+        return parse(file)
+
+
+def _get_event(counters, name):
+    """
+    :param counters: Dictionary with events as keys and values as values
+    :param name: Key of '_canonical_events'
+    :return: Sum of all found events that represent the counter, None if there are none
+    """
+    values = [counters[event] for event in _canonical_events[name] if event in counters]
+    if not values:
+        return None
+    return sum(values)
+
+
+def derive_metrics(counters):
+    """
+    Compute metrics from the counters. Metrics that cannot be computed from the available
+    counters are not in the result.
+    :param counters: Dictionary with events as keys and values as values, see parse()
+    :return: Dictionary with 'ipc' (instructions per cycle), 'bandwidth' (memory bandwidth
+             in GB/s, either measured by likwid, or estimated from LLC misses) and 'gflops'
+             (GFLOP/s) keys
+    """
+    metrics = {}
+    cycles = _get_event(counters, 'cycles')
+    instructions = _get_event(counters, 'instructions')
+    if cycles and instructions is not None:
+        metrics['ipc'] = instructions / cycles
+
+    duration = None
+    if counters.get('duration_time'):
+        duration = counters['duration_time'] * 1e-9
+    elif counters.get('Runtime (RDTSC) [s]'):
+        duration = counters['Runtime (RDTSC) [s]']
+
+    llc_misses = _get_event(counters, 'llc_misses')
+    if llc_misses is None:
+        llc_misses = counters.get('cache-misses')
+    if 'Memory bandwidth [MBytes/s]' in counters:
+        metrics['bandwidth'] = counters['Memory bandwidth [MBytes/s]'] * 1e-3
+    elif duration and llc_misses is not None:
+        metrics['bandwidth'] = llc_misses * _cache_line_size / duration * 1e-9
+
+    fp_events = [(event, weight) for event in counters for suffix, weight in _fp_weights.items()
+                 if event.startswith('fp_arith_inst_retired.') and event.endswith(suffix)]
+    if 'DP [MFLOP/s]' in counters:
+        metrics['gflops'] = counters['DP [MFLOP/s]'] * 1e-3
+    elif duration and fp_events:
+        metrics['gflops'] = sum(counters[event] * weight for event, weight in fp_events) / duration * 1e-9
+    return metrics
+
+
+def get_metric_labels():
+    """
+    :return: Dictionary with derived metrics as keys and their labels as values
+    """
+    return _metric_labels
+
+
+def summarize(metric_sets, statistic='mean'):
+    """
+    Represent the metrics of repeated runs of a test case by a single value per metric
+    :param metric_sets: List of dictionaries returned by derive_metrics()
+    :param statistic: Statistic, see stats.get_statistics()
+    :return: Dictionary with metrics as keys and values as values
+    """
+    summary = {}
+    for metric in _metric_labels:
+        values = [metrics[metric] for metrics in metric_sets if metric in metrics]
+        if values:
+            summary[metric] = stats.aggregate(values, statistic)
+    return summary
@@ -1,11 +1,143 @@
 import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 from plot import Plot
+from output_parser import OutputParser
+from report import stats
+from report import counters
+from report import accounting
+from tracer import Tracer
 import io_manager
 
 
+def _parse_output_file(args):
+    """
+    Parse a single output file. Defined on the module level, so it can be executed
+    by a pool of processes.
+    :param args: Tuple (file name, regex, only_last), see OutputParser.parse()
+    :return: Tuple (list of found values, error message or None)
+    """
+    filename, regex, only_last = args
+    try:
+        return OutputParser().parse(filename, regex, only_last), None
+    except (OSError, ValueError, AttributeError) as err:
+        return [], filename + ': ' + str(err)
+
+
+def _parse_counters_file(filename):
+    """
+    Extract hardware counters from a single output file and derive metrics from them.
+    Defined on the module level, so it can be executed by a pool of processes.
+    :param filename: File name
+    :return: Dictionary with derived metrics, see counters.derive_metrics()
+    """
+    try:
+        return counters.derive_metrics(counters.read(filename))
+    except OSError:
+        return {}
+
+
 class GenericReport:
+    # Output files are parsed serially if there are less files than this
+    _min_files_for_pool = 16
+
+    # Records of the last parsed jobs, see _parse_results()
+    _records = []
+    # Summaries of the test cases of the last parsed data set, see _average_results()
+    _summaries = []
+    # Summaries of all reported data sets
+    _spread = []
+    # Scaling models of all reported data sets, see report_parallel_results()
+    _scaling_models = []
+
+    def get_records(self):
+        """
+        :return: List of records of the last parsed jobs. Every record is a dictionary with
+                 'job_id', 'dir', 'test_case', 'values', 'counters' (derived metrics of the
+                 hardware counters, see counters.derive_metrics()), 'accounting' (derived metrics
+                 of the resource usage, see accounting.derive_metrics()) and 'error' keys
+        """
+        return self._records
+
+    def get_summaries(self):
+        """
+        :return: List of summaries of the test cases of the last parsed data set, see stats.summarize(),
+                 with additional 'counters' (see counters.summarize()) and 'accounting' (see
+                 accounting.summarize()) keys
+        """
+        return self._summaries
+
+    def get_spread(self):
+        """
+        :return: List of summaries of the test cases (see get_summaries()) for every reported data set
+        """
+        return self._spread
+
+    def get_scaling_models(self):
+        """
+        :return: List of scaling models (see scaling_model.analyze()) for every reported data set,
+                 empty if the models were not fitted
+        """
+        return self._scaling_models
+
+    def _get_error_bars(self, summaries):
+        """
+        :param summaries: List of summaries of the test cases, see get_summaries()
+        :return: List of tuples (lower bound, upper bound) of the confidence intervals
+        """
+        return [(summary['ci_low'], summary['ci_high']) for summary in summaries]
+
+    def _parse_files(self, src_data, file_names):
+        """
+        Parse output files, in parallel if there are many of them
+        :param src_data: Object of SrcData
+        :param file_names: List of full paths to the output files
+        :return: List of tuples (list of found values, error message or None) in the
+                 order of 'file_names'
+        """
+        args = [(file_name, src_data.get_perf_regex(), src_data.get_use_only_last_value())
+                for file_name in file_names]
+        return self._map_files(src_data, _parse_output_file, args)
+
+    def _get_accounting(self, exc, list_job_id, list_wrk_dirs):
+        """
+        Find the resource usage of the jobs. Records of the backend are used for the jobs of
+        the current run, the results database for the other ones (e.g. cached jobs).
+        :param exc: Object of Executor
+        :param list_job_id: List of jobs IDs
+        :param list_wrk_dirs: List of working directories
+        :return: List of derived metrics of the resource usage, see accounting.derive_metrics()
+        """
+        backend = exc.get_batch_data().get_backend()
+        jobs = [(str(job_id), wrk_dir) for job_id, wrk_dir in zip(list_job_id, list_wrk_dirs)]
+        job_accounting = {}
+        for job in jobs:
+            record = backend.get_record(job[0])
+            if record is not None and record.get('accounting'):
+                job_accounting[job] = record['accounting']
+        missing = [job for job in jobs if job not in job_accounting]
+        job_accounting.update(exc.get_results_db().lookup_accounting(missing))
+        return [accounting.derive_metrics(job_accounting.get(job, {})) for job in jobs]
+
+    def _map_files(self, src_data, function, args):
+        """
+        Apply the function to every output file, in parallel if there are many of them
+        :param src_data: Object of SrcData
+        :param function: Function defined on the module level
+        :param args: List of arguments of the function, one per file
+        :return: List of results in the order of 'args'
+        """
+        num_workers = src_data.get_report_workers()
+        if num_workers <= 0:
+            num_workers = len(os.sched_getaffinity(0))
+        if num_workers == 1 or len(args) < self._min_files_for_pool:
+            return [function(arg) for arg in args]
+
+        chunk_size = max(1, len(args) // (4 * num_workers))
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            return list(pool.map(function, args, chunksize=chunk_size))
+
     def _parse_results(self, exc, src_data, list_job_id, list_wrk_dirs, list_tests):
         """
         Parse output files and grep performance values
@@ -22,60 +154,191 @@ class GenericReport:
         performance = []
         test_cases = []
 
-        for wrk_dir, job_id, test in zip(list_wrk_dirs, list_job_id, list_tests):
-            output_file = 'slurm-' + str(job_id) + '.out'
-            output_file_full_path = os.path.join(wrk_dir, output_file)
-            extracted_data = exc.parse_output_for_perf(output_file_full_path,
-                                                       src_data.get_perf_regex())
-            if not extracted_data:
-                io_manager.print_err_info('Parser returned an empty list. Data will not be appended.')
+        file_names = [os.path.join(wrk_dir, 'slurm-' + str(job_id) + '.out')
+                      for wrk_dir, job_id in zip(list_wrk_dirs, list_job_id)]
+
+        # Values that were extracted with the same regex earlier are taken from the
+        # results database, only the remaining files are parsed
+        results_db = exc.get_results_db()
+        jobs = [(str(job_id), wrk_dir) for job_id, wrk_dir in zip(list_job_id, list_wrk_dirs)]
+        stored = results_db.lookup_values(jobs, src_data.get_perf_regex(), src_data.get_use_only_last_value())
+        missing = [file_name for file_name, job in zip(file_names, jobs) if job not in stored]
+        with Tracer().span('parse_results', {'files': len(missing)}):
+            parsed_missing = iter(self._parse_files(src_data, missing))
+        parsed = [(stored[job], None) if job in stored else next(parsed_missing) for job in jobs]
+
+        # Hardware counters are always extracted from the files, they are not stored in the database
+        collect_counters = exc.get_batch_data().get_counters() is not None
+        if collect_counters:
+            with Tracer().span('parse_counters', {'files': len(file_names)}):
+                job_counters = self._map_files(src_data, _parse_counters_file, file_names)
+        else:
+            job_counters = [{}] * len(file_names)
+        job_accounting = self._get_accounting(exc, list_job_id, list_wrk_dirs)
+
+        self._records = []
+        errors = []
+        counter_sets = []
+        accounting_sets = []
+        for wrk_dir, job_id, test, (extracted_data, error), metrics, usage in zip(list_wrk_dirs, list_job_id,
+                                                                                  list_tests, parsed, job_counters,
+                                                                                  job_accounting):
+            self._records.append({
+                'job_id': job_id,
+                'dir': wrk_dir,
+                'test_case': test,
+                'values': extracted_data,
+                'counters': metrics,
+                'accounting': usage,
+                'error': error,
+            })
+            if error is not None:
+                errors.append(error)
+            elif not extracted_data:
+                errors.append(os.path.join(wrk_dir, 'slurm-' + str(job_id) + '.out')
+                              + ': parser returned an empty list')
             else:
-                if src_data.get_use_only_last_value():
-                    # If only the last point should be used, then simply append it
-                    # to the list
-                    performance.append(extracted_data[-1])
-                else:
-                    # Otherwise, find the mean of all values and append only it
-                    performance.append(sum(extracted_data) / len(extracted_data))
+                # Either the last value, or the values without the warm-up ones aggregated
+                performance.append(stats.reduce_output(extracted_data, src_data.get_use_only_last_value(),
+                                                       src_data.get_warmup_values(), src_data.get_statistic()))
                 test_cases.append(test)
+                counter_sets.append(metrics)
+                accounting_sets.append(usage)
+
+        results_db.store_values([record for record in self._records
+                                 if (str(record['job_id']), record['dir']) not in stored],
+                                src_data.get_perf_regex(), src_data.get_use_only_last_value())
+
+        if errors:
+            io_manager.print_err_info(str(len(errors)) + ' output file(s) were not used in the report:')
+            for error in errors:
+                io_manager.print_info(error)
 
-        res, cases = self._average_results(performance, test_cases)
+        res, cases = self._average_results(src_data, performance, test_cases, counter_sets, accounting_sets)
+        if collect_counters:
+            self._report_counters(src_data, cases)
 
         return res, cases
 
-    def _average_results(self, performance, test_cases):
+    def _report_counters(self, src_data, cases):
+        """
+        Print the metrics derived from the hardware counters next to the performance values
+        :param src_data: Object of SrcData
+        :param cases: List of test cases in the order of get_summaries()
+        :return: None
+        """
+        labels = counters.get_metric_labels()
+        io_manager.print_info('Hardware counters (' + src_data.get_perf_label() + ' | '
+                              + ' | '.join(labels.values()) + '):', '')
+        for test, summary in zip(cases, self.get_summaries()):
+            metrics = ['{0:.3g}'.format(summary['counters'][metric]) if metric in summary['counters'] else '-'
+                       for metric in labels]
+            io_manager.print_info(str(test) + ': ' + '{0:.6g}'.format(summary['value']) + ' | ' + ' | '.join(metrics))
+
+    def _plot_accounting(self, x_points, key_labels, title, x_label='cores'):
+        """
+        Plot the resource usage of every reported data set (see get_spread()), one plot per
+        metric. Metrics that were not reported for any test case are not plotted.
+        :param x_points: List of lists of X-axis points in the order of the summaries
+        :param key_labels: Labels of the data sets
+        :param title: Basename of the output files, the name of the metric is appended
+        :param x_label: X-axis label
+        :return: None
+        """
+        pl = Plot()
+        for metric, label in accounting.get_metric_labels().items():
+            metric_x_points = []
+            metric_y_points = []
+            metric_labels = []
+            for loc_x_points, summaries, key_label in zip(x_points, self._spread, key_labels):
+                points = [(x, summary['accounting'][metric]) for x, summary in zip(loc_x_points, summaries)
+                          if metric in summary['accounting']]
+                if points:
+                    metric_x_points.append([x for x, y in points])
+                    metric_y_points.append([y for x, y in points])
+                    metric_labels.append(key_label)
+            if metric_y_points:
+                pl.plot_resource_usage(metric_x_points, metric_y_points, title + '_' + metric, metric_labels,
+                                       x_label, label, highest_is_best=metric == 'cpu_efficiency')
+
+    def _average_results(self, src_data, performance, test_cases, counter_sets=None, accounting_sets=None):
         """
         Average the performance results. Use list of repetitive test case names to perform
-        the averaging
+        the averaging. Warm-up repetitions and outliers are dropped, then the repetitions are
+        represented by the statistic from the config file (see SrcData.get_statistic()).
+        Summaries of all test cases are stored, see get_summaries().
+        :param src_data: Object of SrcData
         :param performance: List of performance values
         :param test_cases: List of test cases (names or values)
+        :param counter_sets: List of metrics derived from the hardware counters of every
+                             performance value, see counters.derive_metrics()
+        :param accounting_sets: List of metrics derived from the resource usage of every
+                                performance value, see accounting.derive_metrics()
         :return: List of averaged performance and a list of corresponding test cases
         """
         res = []
+        if counter_sets is None:
+            counter_sets = [{}] * len(performance)
+        if accounting_sets is None:
+            accounting_sets = [{}] * len(performance)
 
         # Combine two lists
         combined_lists = defaultdict(list)
-        for test, perf in zip(test_cases, performance):
+        combined_counters = defaultdict(list)
+        combined_accounting = defaultdict(list)
+        for test, perf, metrics, usage in zip(test_cases, performance, counter_sets, accounting_sets):
             combined_lists[test].append(perf)
+            combined_counters[test].append(metrics)
+            combined_accounting[test].append(usage)
 
         # Find an average performance
+        self._summaries = []
         for test, perf in combined_lists.items():
-            res.append(sum(perf) / float(len(perf)))
+            summary = stats.summarize(perf, src_data.get_statistic(), src_data.get_outlier_rejection(),
+                                      src_data.get_outlier_threshold(), src_data.get_warmup_runs(),
+                                      src_data.get_ci_confidence(), src_data.get_bootstrap_resamples())
+            if summary['num_rejected'] > 0:
+                io_manager.print_dbg_info('Test case ' + str(test) + ': ' + str(summary['num_rejected'])
+                                          + ' repetition(s) rejected as warm-up runs or outliers')
+            summary['counters'] = counters.summarize(combined_counters[test], src_data.get_statistic())
+            summary['accounting'] = accounting.summarize(combined_accounting[test], src_data.get_statistic())
+            self._summaries.append(summary)
+            res.append(summary['value'])
 
         return res, [*combined_lists.keys()]
 
-    def report_parallel_results(self, exc, src_data, successful_jobs, title_scalability = 'scalability', title_efficiency = 'efficiency'):
+    def rank_test_cases(self, exc, src_data, list_job_id, list_wrk_dirs, list_tests):
+        """
+        Rank test cases by their performance, the lowest value (e.g. time) is the best
+        :param exc: Object of Executor
+        :param src_data: Object of SrcData
+        :param list_job_id: List of jobs IDs
+        :param list_wrk_dirs: List of working directories
+        :param list_tests: List of test cases (e.g. names, or corresponding values)
+        :return: List of tuples (test case, performance) sorted from the best to the worst.
+                 Test cases without results are not in the list.
+        """
+        res, cases = self._parse_results(exc, src_data, list_job_id, list_wrk_dirs, list_tests)
+        return sorted(zip(cases, res), key=lambda item: item[1])
+
+    def report_parallel_results(self, exc, src_data, successful_jobs, title_scalability = 'scalability', title_efficiency = 'efficiency',
+                                weak_scaling=False, fit_models=False):
         """
         Report results of parallel execution
         :param exc: Object of Executor
         :param src_data: Object of SrcData
         :param successful_jobs: Dictionary of lists from successfully executed jobs.
                                 The keys should be 'id', 'dir' and 'cores'
+        :param weak_scaling: True if the problem size grows with the number of cores, then
+                             the weak scaling efficiency is plotted instead of the parallel one
+        :param fit_models: True if scaling models should be fitted to the results, see
+                           get_scaling_models(). The results are assumed to be run times.
         :return: Tuple of lists with number of cores and parsed results
         """
         res = []
         cores = []
         key_labels = []
+        self._spread = []
         for data_set_id in range(len(successful_jobs)):
             loc_res, loc_cores = self._parse_results(exc, src_data,
                                                      successful_jobs[data_set_id]['id'],
@@ -84,14 +347,85 @@ class GenericReport:
             res.append(loc_res)
             cores.append(loc_cores)
             key_labels.append(successful_jobs[data_set_id]['label'])
+            self._spread.append(self.get_summaries())
             
         io_manager.print_dbg_info('Plotting results')
+        errors = [self._get_error_bars(summaries) for summaries in self._spread]
         pl = Plot()
-        pl.plot_scalability(cores, res, title_scalability, key_labels)
-        pl.plot_parallel_efficiency(cores, res, title_efficiency, key_labels, y_label='efficiency')
+        pl.plot_scalability(cores, res, title_scalability, key_labels, y_errors=errors)
+        if weak_scaling:
+            pl.plot_weak_scaling_efficiency(cores, res, title_efficiency, key_labels, y_label='weak scaling efficiency',
+                                            y_errors=errors)
+        else:
+            pl.plot_parallel_efficiency(cores, res, title_efficiency, key_labels, y_label='efficiency',
+                                        y_errors=errors)
+        self._plot_accounting(cores, key_labels, title_scalability)
+
+        self._scaling_models = []
+        if fit_models:
+            self._report_scaling_models(src_data, cores, res, key_labels, title_scalability + '_model', weak_scaling)
 
         return cores, res
 
+    def _report_scaling_models(self, src_data, cores, res, key_labels, title, weak_scaling=False):
+        """
+        Fit scaling models to every data set, print the serial fraction, the predicted speedup
+        and the recommended number of cores, and plot the predicted run times
+        :param src_data: Object of SrcData
+        :param cores: List of lists of numbers of cores
+        :param res: List of lists of run times
+        :param key_labels: Labels of the data sets
+        :param title: Title of the plot and (also) the basename of the output file
+        :param weak_scaling: True if the problem size grows with the number of cores
+        :return: None
+        """
+        # Imported here, because it imports numpy, see stats._get_numpy()
+        from report import scaling_model
+
+        model_cores = []
+        model_res = []
+        model_labels = []
+        for loc_cores, loc_res, key_label in zip(cores, res, key_labels):
+            if len(loc_cores) < 2:
+                io_manager.print_dbg_info('Data set \'' + key_label + '\' has less than two points, '
+                                          'scaling models are not fitted')
+                self._scaling_models.append({})
+                continue
+            model = scaling_model.analyze(loc_cores, loc_res, weak_scaling, src_data.get_time_target(),
+                                          src_data.get_prediction_max_cores())
+            self._scaling_models.append(model)
+
+            if weak_scaling:
+                io_manager.print_info(key_label + ': serial fraction (Gustafson) '
+                                      + '{:.2%}'.format(model['fits'][0]['serial_fraction']), '')
+                continue
+
+            io_manager.print_info(key_label + ': ' + model['best_model'] + ' model, serial fraction '
+                                  + '{:.2%}'.format(model['serial_fraction']), '')
+            for fitted in model['fits']:
+                io_manager.print_info(fitted['model'] + ': serial fraction ' + '{:.2%}'.format(fitted['serial_fraction'])
+                                      + ' | RMS error ' + '{:.1%}'.format(fitted['rms_error']))
+            untested = [prediction for prediction in model['predictions'] if not prediction['measured']]
+            for prediction in untested:
+                io_manager.print_info('Predicted for ' + str(prediction['cores']) + ' cores: '
+                                      + '{:.4g}'.format(prediction['time']) + ' | speedup '
+                                      + '{:.2f}'.format(prediction['speedup']))
+            recommendation = model['recommendation']
+            if recommendation is None:
+                io_manager.print_info('No number of cores meets the time target of '
+                                      + str(src_data.get_time_target()))
+            else:
+                io_manager.print_info('Recommended: ' + str(recommendation['cores']) + ' cores | '
+                                      + '{:.4g}'.format(recommendation['time']) + ' | '
+                                      + '{:.4g}'.format(recommendation['core_hours']) + ' core-hours per run')
+
+            model_cores += [loc_cores, [prediction['cores'] for prediction in model['predictions']]]
+            model_res += [loc_res, [prediction['time'] for prediction in model['predictions']]]
+            model_labels += [key_label, key_label + ' (' + model['best_model'] + ' model)']
+
+        if model_cores:
+            Plot().plot_scalability(model_cores, model_res, title, model_labels, y_label=src_data.get_perf_label())
+
     def report_flags_results(self, exc, src_data, successful_jobs, labels, title='flags'):
         """
         Report results of compier flags tests
@@ -107,8 +441,59 @@ class GenericReport:
                                                  successful_jobs['id'],
                                                  successful_jobs['dir'],
                                                  labels)
+        self._spread = [self.get_summaries()]
         io_manager.print_dbg_info('Plotting results')
         pl = Plot()
-        pl.plot_compiler_flags(res, unique_labels, title)
+        pl.plot_compiler_flags(res, unique_labels, title, x_errors=self._get_error_bars(self.get_summaries()))
+        for metric, label in accounting.get_metric_labels().items():
+            points = [(flags, summary['accounting'][metric]) for flags, summary in zip(unique_labels, self.get_summaries())
+                      if metric in summary['accounting']]
+            if points:
+                pl.plot_resource_usage_bars([value for flags, value in points], [flags for flags, value in points],
+                                            title + '_' + metric, label, highest_is_best=metric == 'cpu_efficiency')
 
         return unique_labels, res
+
+    def report_hybrid_results(self, exc, src_data, successful_jobs, tasks_list, threads_list, title='hybrid'):
+        """
+        Report results of MPI tasks x OpenMP threads combinations
+        :param exc: Object of Executor
+        :param src_data: Object of SrcData
+        :param successful_jobs: Dictionary of lists from successfully executed jobs.
+                                The keys should be 'id', 'dir' and 'decomposition', where
+                                decompositions are tuples (tasks, threads)
+        :param tasks_list: List of numbers of MPI tasks
+        :param threads_list: List of numbers of OpenMP threads
+        :param title: Title of the plots and (also) the basename of the output files
+        :return: List of the best decompositions per number of cores. Every element is a
+                 dictionary with 'cores', 'tasks', 'threads' and 'value' keys
+        """
+        res, decompositions = self._parse_results(exc, src_data,
+                                                  successful_jobs['id'],
+                                                  successful_jobs['dir'],
+                                                  successful_jobs['decomposition'])
+        self._spread = [self.get_summaries()]
+        values = dict(zip(decompositions, res))
+
+        best = {}
+        for (tasks, threads), value in values.items():
+            cores = tasks * threads
+            if cores not in best or value < best[cores]['value']:
+                best[cores] = {
+                    'cores': cores,
+                    'tasks': tasks,
+                    'threads': threads,
+                    'value': value,
+                }
+        best = [best[cores] for cores in sorted(best)]
+
+        io_manager.print_dbg_info('Plotting results')
+        pl = Plot()
+        pl.plot_heatmap([[values.get((tasks, threads)) for threads in threads_list] for tasks in tasks_list],
+                        threads_list, tasks_list, title, z_label=src_data.get_perf_label())
+        if best:
+            pl.plot_scalability([[decomposition['cores'] for decomposition in best]],
+                                [[decomposition['value'] for decomposition in best]],
+                                title + '_best', ['best decomposition'], y_label=src_data.get_perf_label())
+
+        return best
@@ -0,0 +1,202 @@
+import math
+
+import numpy as np
+
+
+# Basis functions of the models of the run time T(p) on p cores, the coefficients are
+# fitted with linear least squares and must not be negative
+_models = {
+    # T(p) = a + b/p, the serial fraction is a/(a + b)
+    'amdahl': [lambda p: np.ones_like(p), lambda p: 1.0 / p],
+    # T(p) = a + b/p + c*log2(p), e.g. the cost of tree-based collectives grows with log(p)
+    'communication': [lambda p: np.ones_like(p), lambda p: 1.0 / p, lambda p: np.log2(p)],
+}
+
+
+def get_models():
+    """
+    :return: List of names of the supported models
+    """
+    return list(_models.keys()) + ['gustafson']
+
+
+def _fit_non_negative(basis, cores, times):
+    """
+    Least squares fit of non-negative coefficients. Coefficients that turn out negative
+    are fixed to zero and the remaining ones are fitted again.
+    :param basis: List of basis functions
+    :param cores: Array of numbers of cores
+    :param times: Array of run times
+    :return: Array of coefficients
+    """
+    design = np.column_stack([function(cores) for function in basis])
+    active = list(range(len(basis)))
+    coefficients = np.zeros(len(basis))
+    while active:
+        solution = np.linalg.lstsq(design[:, active], times, rcond=None)[0]
+        if np.all(solution >= 0):
+            coefficients[active] = solution
+            break
+        active = [column for column, value in zip(active, solution) if value >= 0]
+    return coefficients
+
+
+def _evaluate(basis, coefficients, cores):
+    """
+    :return: Run times predicted by the model for the given numbers of cores
+    """
+    cores = np.asarray(cores, dtype=float)
+    return sum(coefficient * function(cores) for coefficient, function in zip(coefficients, basis))
+
+
+def _information_criterion(residuals, num_parameters):
+    """
+    Akaike information criterion with the correction for small samples, lower is better
+    :param residuals: Array of residuals of the fit
+    :param num_parameters: Number of fitted parameters
+    :return: Value of the criterion, infinite if there are too few points
+    """
+    num_points = residuals.size
+    if num_points <= num_parameters + 1:
+        return math.inf
+    rss = max(float(np.sum(residuals ** 2)), 1e-300)
+    return num_points * math.log(rss / num_points) + 2 * num_parameters \
+        + 2 * num_parameters * (num_parameters + 1) / (num_points - num_parameters - 1)
+
+
+def fit(cores, times, model='amdahl'):
+    """
+    Fit a model of the strong scaling to the measured run times
+    :param cores: List of numbers of cores
+    :param times: List of run times (or any other values that are proportional to the run time)
+    :param model: 'amdahl' or 'communication', see get_models()
+    :return: Dictionary with 'model', 'coefficients', 'serial_fraction' (of the run time on
+             a single core), 'time_1' (predicted run time on a single core), 'rms_error'
+             (relative to the mean time) and 'aic' keys
+    """
+    basis = _models[model]
+    cores = np.asarray(cores, dtype=float)
+    times = np.asarray(times, dtype=float)
+    coefficients = _fit_non_negative(basis, cores, times)
+    residuals = _evaluate(basis, coefficients, cores) - times
+    time_1 = float(_evaluate(basis, coefficients, [1.0])[0])
+    return {
+        'model': model,
+        'coefficients': [float(coefficient) for coefficient in coefficients],
+        'serial_fraction': float(coefficients[0]) / time_1 if time_1 > 0 else math.nan,
+        'time_1': time_1,
+        'rms_error': float(np.sqrt(np.mean(residuals ** 2)) / np.mean(times)),
+        'aic': _information_criterion(residuals, len(basis)),
+    }
+
+
+def fit_gustafson(cores, times):
+    """
+    Fit Gustafson's law S(p) = s + (1 - s)*p to weak scaling data, where the scaled speedup
+    is S(p) = p*T(1)/T(p) and the problem size grows with the number of cores
+    :param cores: List of numbers of cores, the smallest one is the reference
+    :param times: List of run times
+    :return: Dictionary with 'model', 'serial_fraction' and 'rms_error' (of the speedup,
+             relative to its mean) keys
+    """
+    cores = np.asarray(cores, dtype=float)
+    times = np.asarray(times, dtype=float)
+    reference = int(np.argmin(cores))
+    # Normalize to the smallest number of cores if it is not 1
+    relative_cores = cores / cores[reference]
+    speedup = relative_cores * times[reference] / times
+    # S(p) - p = s*(1 - p)
+    design = (1.0 - relative_cores)[:, np.newaxis]
+    if np.all(design == 0):
+        serial_fraction = 0.0
+    else:
+        serial_fraction = float(np.clip(np.linalg.lstsq(design, speedup - relative_cores, rcond=None)[0][0], 0, 1))
+    residuals = serial_fraction + (1 - serial_fraction) * relative_cores - speedup
+    return {
+        'model': 'gustafson',
+        'serial_fraction': serial_fraction,
+        'rms_error': float(np.sqrt(np.mean(residuals ** 2)) / np.mean(speedup)),
+    }
+
+
+def predict(fitted, cores):
+    """
+    :param fitted: Fitted model, see fit()
+    :param cores: List of numbers of cores
+    :return: List of predicted run times
+    """
+    return [float(time) for time in _evaluate(_models[fitted['model']], fitted['coefficients'], cores)]
+
+
+def get_prediction_cores(measured_cores, max_cores=0):
+    """
+    :param measured_cores: List of measured numbers of cores
+    :param max_cores: Max number of cores of the prediction, 0 - four times the max measured one
+    :return: Sorted list of powers of two and measured numbers of cores up to 'max_cores'
+    """
+    if max_cores <= 0:
+        max_cores = 4 * max(measured_cores)
+    cores = set(measured_cores)
+    power = 1
+    while power <= max_cores:
+        cores.add(power)
+        power *= 2
+    return sorted(core for core in cores if core <= max_cores)
+
+
+def recommend(fitted, cores, time_target=0):
+    """
+    Find the number of cores that needs the least core-hours per run, while the predicted
+    run time does not exceed the target
+    :param fitted: Fitted model, see fit()
+    :param cores: List of candidate numbers of cores
+    :param time_target: Max run time, 0 - no target
+    :return: Dictionary with 'cores', 'time' and 'core_hours' keys (core-hours assume that
+             the times are in seconds), or None if no candidate meets the target
+    """
+    times = predict(fitted, cores)
+    candidates = [(core * time / 3600, core, time) for core, time in zip(cores, times)
+                  if time_target <= 0 or time <= time_target]
+    if not candidates:
+        return None
+    core_hours, best_cores, best_time = min(candidates)
+    return {
+        'cores': best_cores,
+        'time': best_time,
+        'core_hours': core_hours,
+    }
+
+
+def analyze(cores, times, weak_scaling=False, time_target=0, max_cores=0):
+    """
+    Fit all models to a scaling curve and predict the scaling beyond the measured range
+    :param cores: List of measured numbers of cores
+    :param times: List of measured run times
+    :param weak_scaling: True if the problem size grows with the number of cores, then
+                         only Gustafson's law is fitted
+    :param time_target: Max run time of the recommendation, 0 - no target
+    :param max_cores: Max number of cores of the prediction, see get_prediction_cores()
+    :return: Dictionary with the 'fits' key (list of fitted models). For the strong scaling also
+             'best_model' (name of the model with the lowest information criterion), 'serial_fraction',
+             'predictions' (list of dictionaries with 'cores', 'time', 'speedup' and 'measured' keys)
+             and 'recommendation' (see recommend())
+    """
+    if weak_scaling:
+        return {'fits': [fit_gustafson(cores, times)]}
+
+    fits = [fit(cores, times, model) for model in _models]
+    best = min(fits, key=lambda fitted: (fitted['aic'], len(fitted['coefficients'])))
+    prediction_cores = get_prediction_cores(cores, max_cores)
+    predictions = [{
+        'cores': core,
+        'time': time,
+        'speedup': best['time_1'] / time if time > 0 else math.inf,
+        'measured': core in cores,
+    } for core, time in zip(prediction_cores, predict(best, prediction_cores))]
+    return {
+        'fits': fits,
+        'best_model': best['model'],
+        'serial_fraction': best['serial_fraction'],
+        'predictions': predictions,
+        'recommendation': recommend(best, prediction_cores, time_target),
+    }
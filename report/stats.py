@@ -0,0 +1,237 @@
+import math
+
+# numpy is imported on the first use, see _get_numpy(), so commands that do not
+# summarize measurements start faster
+_numpy = None
+
+
+# Two-sided critical values of Student's t-distribution. The keys of the inner
+# dictionaries are degrees of freedom, the last key is used for any larger number.
+_t_table = {
+    0.90: {1: 6.314, 2: 2.920, 3: 2.353, 4: 2.132, 5: 2.015, 6: 1.943, 7: 1.895, 8: 1.860, 9: 1.833,
+           10: 1.812, 11: 1.796, 12: 1.782, 13: 1.771, 14: 1.761, 15: 1.753, 16: 1.746, 17: 1.740,
+           18: 1.734, 19: 1.729, 20: 1.725, 21: 1.721, 22: 1.717, 23: 1.714, 24: 1.711, 25: 1.708,
+           26: 1.706, 27: 1.703, 28: 1.701, 29: 1.699, 30: 1.697, 40: 1.684, 60: 1.671, 120: 1.658,
+           math.inf: 1.645},
+    0.95: {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+           10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110,
+           18: 2.101, 19: 2.093, 20: 2.086, 21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060,
+           26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980,
+           math.inf: 1.960},
+    0.99: {1: 63.657, 2: 9.925, 3: 5.841, 4: 4.604, 5: 4.032, 6: 3.707, 7: 3.499, 8: 3.355, 9: 3.250,
+           10: 3.169, 11: 3.106, 12: 3.055, 13: 3.012, 14: 2.977, 15: 2.947, 16: 2.921, 17: 2.898,
+           18: 2.878, 19: 2.861, 20: 2.845, 21: 2.831, 22: 2.819, 23: 2.807, 24: 2.797, 25: 2.787,
+           26: 2.779, 27: 2.771, 28: 2.763, 29: 2.756, 30: 2.750, 40: 2.704, 60: 2.660, 120: 2.617,
+           math.inf: 2.576},
+}
+
+
+def get_confidence_levels():
+    """
+    :return: List of supported confidence levels
+    """
+    return list(_t_table.keys())
+
+
+def t_critical_value(confidence, dof):
+    """
+    :param confidence: Confidence level, see get_confidence_levels()
+    :param dof: Degrees of freedom (>= 1)
+    :return: Two-sided critical value of Student's t-distribution. If 'dof' is not in
+             the table, the value of the closest smaller number of degrees of freedom
+             is used, so the interval is slightly wider than the exact one.
+    """
+    table = _t_table[confidence]
+    return table[max(key for key in table if key <= dof)]
+
+
+def confidence_interval(values, confidence=0.95):
+    """
+    Confidence interval of the mean, assuming normally distributed values
+    :param values: List of measured values
+    :param confidence: Confidence level, see get_confidence_levels()
+    :return: Tuple (mean, half-width of the interval), the half-width is infinite
+             if there are less than two values
+    """
+    num_values = len(values)
+    mean = sum(values) / num_values
+    if num_values < 2:
+        return mean, math.inf
+    variance = sum((value - mean) ** 2 for value in values) / (num_values - 1)
+    return mean, t_critical_value(confidence, num_values - 1) * math.sqrt(variance / num_values)
+
+
+def relative_ci_width(values, confidence=0.95):
+    """
+    :param values: List of measured values
+    :param confidence: Confidence level, see get_confidence_levels()
+    :return: Width of the confidence interval relative to the mean
+    """
+    mean, half_width = confidence_interval(values, confidence)
+    if half_width == 0:
+        return 0.0
+    if mean == 0:
+        return math.inf
+    return 2 * half_width / abs(mean)
+
+
+def _get_numpy():
+    """
+    :return: numpy module, imported on the first call
+    """
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+
+# Names of the numpy functions of the statistics
+_statistics = {
+    'mean': 'mean',
+    'median': 'median',
+    'min': 'min',
+}
+
+# Default thresholds of the outlier rejection methods
+_outlier_thresholds = {
+    'none': None,
+    'mad': 3.5,     # modified z-score
+    'iqr': 1.5,     # multiple of the interquartile range
+}
+
+
+def get_statistics():
+    """
+    :return: List of supported statistics that represent a set of values
+    """
+    return list(_statistics.keys())
+
+
+def get_outlier_methods():
+    """
+    :return: List of supported outlier rejection methods
+    """
+    return list(_outlier_thresholds.keys())
+
+
+def aggregate(values, statistic='mean'):
+    """
+    :param values: List of values
+    :param statistic: Statistic that represents the values, see get_statistics()
+    :return: Value of the statistic
+    """
+    np = _get_numpy()
+    return float(getattr(np, _statistics[statistic])(np.asarray(values, dtype=float)))
+
+
+def reduce_output(values, only_last=False, warmup=0, statistic='mean'):
+    """
+    Represent the values extracted from the output of a single job by a single value
+    :param values: List of values in the order they appear in the output
+    :param only_last: True if only the last value should be used
+    :param warmup: Number of first values that are dropped, if there are more values than that
+    :param statistic: Statistic that represents the remaining values, see get_statistics()
+    :return: Value of the job
+    """
+    if only_last:
+        return float(values[-1])
+    return aggregate(values[warmup:] or values, statistic)
+
+
+def reject_outliers(values, method='none', threshold=None):
+    """
+    Find values that are far from the bulk of the values. Nothing is rejected if
+    there are less than three values.
+    :param values: List of values
+    :param method: 'mad' - modified z-score based on the median absolute deviation,
+                   'iqr' - Tukey's fences based on the interquartile range, 'none'
+    :param threshold: Threshold of the method, None to use the default one
+    :return: Boolean array, True for the values that are kept
+    """
+    np = _get_numpy()
+    values = np.asarray(values, dtype=float)
+    keep = np.ones(values.shape, dtype=bool)
+    if method == 'none' or values.size < 3:
+        return keep
+    if threshold is None:
+        threshold = _outlier_thresholds[method]
+
+    if method == 'mad':
+        median = np.median(values)
+        deviation = np.abs(values - median)
+        mad = np.median(deviation)
+        if mad > 0:
+            keep = 0.6745 * deviation / mad <= threshold
+        else:
+            # More than half of the values are equal, use the mean absolute deviation instead
+            mean_ad = np.mean(deviation)
+            if mean_ad > 0:
+                keep = deviation / (1.253314 * mean_ad) <= threshold
+    elif method == 'iqr':
+        q1, q3 = np.percentile(values, [25, 75])
+        iqr = q3 - q1
+        keep = (values >= q1 - threshold * iqr) & (values <= q3 + threshold * iqr)
+    return keep
+
+
+def bootstrap_ci(values, statistic='mean', confidence=0.95, num_resamples=1000, seed=0):
+    """
+    Bootstrap confidence interval of the statistic. All resamples are drawn and
+    evaluated at once.
+    :param values: List of values
+    :param statistic: Statistic, see get_statistics()
+    :param confidence: Confidence level, between 0 and 1
+    :param num_resamples: Number of bootstrap resamples
+    :param seed: Seed of the random number generator, so the reports are reproducible
+    :return: Tuple (lower bound, upper bound)
+    """
+    np = _get_numpy()
+    values = np.asarray(values, dtype=float)
+    if values.size < 2 or num_resamples <= 0:
+        value = aggregate(values, statistic)
+        return value, value
+
+    rng = np.random.default_rng(seed)
+    resamples = values[rng.integers(0, values.size, size=(num_resamples, values.size))]
+    estimates = getattr(np, _statistics[statistic])(resamples, axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(estimates, [alpha, 1.0 - alpha])
+    return float(low), float(high)
+
+
+def summarize(values, statistic='mean', outlier_method='none', outlier_threshold=None, warmup=0,
+              confidence=0.95, num_resamples=1000):
+    """
+    Describe the repeated measurements of a single configuration
+    :param values: List of values in the order of measurement
+    :param statistic: Statistic that represents the values, see get_statistics()
+    :param outlier_method: Outlier rejection method, see reject_outliers()
+    :param outlier_threshold: Threshold of the outlier rejection method, None for the default one
+    :param warmup: Number of first values that are dropped, if there are more values than that
+    :param confidence: Confidence level of the bootstrap confidence interval
+    :param num_resamples: Number of bootstrap resamples
+    :return: Dictionary with 'value' (the statistic), 'median', 'mean', 'std', 'min', 'max',
+             'ci_low', 'ci_high', 'num_values' and 'num_rejected' keys
+    """
+    np = _get_numpy()
+    values = np.asarray(values, dtype=float)
+    num_dropped = 0
+    if values.size > warmup:
+        num_dropped = warmup
+        values = values[warmup:]
+
+    kept = values[reject_outliers(values, outlier_method, outlier_threshold)]
+    ci_low, ci_high = bootstrap_ci(kept, statistic, confidence, num_resamples)
+    return {
+        'value': aggregate(kept, statistic),
+        'median': float(np.median(kept)),
+        'mean': float(np.mean(kept)),
+        'std': float(np.std(kept, ddof=1)) if kept.size > 1 else 0.0,
+        'min': float(np.min(kept)),
+        'max': float(np.max(kept)),
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'num_values': int(kept.size),
+        'num_rejected': int(values.size - kept.size + num_dropped),
+    }
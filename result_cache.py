@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import io_manager
+from file_hash import hash_file
+
+
+class ResultCache:
+    """
+    Persistent cache of finished jobs. A job is identified by a hash of everything that
+    influences the measurement: the executable (or its sources if the code is recompiled),
+    the compile command, environment variables, resources, launcher, executable options,
+    modules, system, partition and time limit. The SLURM output file of every successful job is stored in the cache,
+    so the results can be parsed again with a different regex.
+    """
+    _enabled = False
+    _cache_dir = '.lassi_cache'
+    _index_name = 'index.json'
+    _max_age_days = 30          # 0 - entries never expire
+    _max_entries = 1000         # 0 - no limit on the number of configurations
+
+    _index = None
+
+    def is_enabled(self):
+        """
+        :return: True if the cache should be used
+        """
+        return self._enabled
+
+    def get_cache_dir(self):
+        """
+        :return: Directory of the cache
+        """
+        return self._cache_dir
+
+    def get_max_age_days(self):
+        """
+        :return: Max age of a configuration in days since its last use
+        """
+        return self._max_age_days
+
+    def get_max_entries(self):
+        """
+        :return: Max number of cached configurations
+        """
+        return self._max_entries
+
+    def read_config(self, config_file_name):
+        """
+        Read JSON config file
+        :param config_file_name: Name of the config file
+        """
+        f = open(config_file_name)
+        data = json.load(f)
+        f.close()
+
+        if 'result_cache' not in data:
+            return
+
+        cache_config = data['result_cache']
+        self._enabled = cache_config.get('enabled', True)
+        self._cache_dir = cache_config.get('path', self._cache_dir)
+        self._max_age_days = cache_config.get('max_age_days', self._max_age_days)
+        self._max_entries = cache_config.get('max_entries', self._max_entries)
+
+    def _get_index(self):
+        """
+        :return: Index of the cache, loaded from disk on the first call
+        """
+        if self._index is None:
+            index_file = os.path.join(self.get_cache_dir(), self._index_name)
+            if os.path.isfile(index_file):
+                with open(index_file, 'r') as file:
+                    self._index = json.load(file)
+            else:
+                self._index = {}
+        return self._index
+
+    def save(self):
+        """
+        Write the index of the cache to disk
+        :return: None
+        """
+        if self._index is None:
+            return
+        os.makedirs(self.get_cache_dir(), exist_ok=True)
+        index_file = os.path.join(self.get_cache_dir(), self._index_name)
+        tmp_file = index_file + '.tmp'
+        with open(tmp_file, 'w') as file:
+            file.write(json.dumps(self._index, indent=4))
+        os.replace(tmp_file, index_file)
+
+    def describe(self, batch_data, src_data, compiler_flag_id=0):
+        """
+        Describe the test case that is currently set up in 'batch_data'
+        :param batch_data: Object of BatchFileData
+        :param src_data: Object of SrcData
+        :param compiler_flag_id: ID pointing to an element in the list of compiler flags
+        :return: Dictionary with everything that influences the measurement
+        """
+        description = {
+            'envars': [[envar, str(value)] for envar, value in batch_data.get_envars()],
+            'nodes': batch_data.get_nodes(),
+            'ntasks': batch_data.get_ntasks(),
+            'cpus': batch_data.get_cpus(),
+            'launcher': batch_data.get_launcher(),
+            'executable_options': batch_data.get_exec_options(),
+            'modules': batch_data.get_modules(),
+            'system': batch_data.get_system_name(),
+            'partition': batch_data.get_partition(),
+            # Decides whether the job runs into a timeout
+            'time': batch_data.get_time(),
+        }
+        if batch_data.get_counters() is not None:
+            description['counters'] = batch_data.get_counters()
+        if src_data.get_recompile_flag():
+            description['compile_command'] = src_data.get_compile_cmd(compiler_flag_id)
+            description['sources'] = [hash_file(os.path.join(src_data.get_src_path(), src_file))
+                                      for src_file in src_data.get_list_of_src_files()]
+        else:
+            description['executable'] = hash_file(os.path.join(src_data.get_src_path(),
+                                                                src_data.get_exec_name()))
+        return description
+
+    def compute_key(self, description):
+        """
+        :param description: Description of the test case, see describe()
+        :return: Key of the configuration
+        """
+        text = json.dumps(description, sort_keys=True)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """
+        Find cached jobs of the configuration and mark the configuration as recently used
+        :param key: Key of the configuration, see compute_key()
+        :return: List of tuples (directory, job ID) of the cached SLURM output files
+        """
+        entry = self._get_index().get(key)
+        if entry is None:
+            return []
+
+        entry['last_used'] = time.time()
+        key_dir = os.path.join(os.path.abspath(self.get_cache_dir()), key)
+        return [(key_dir, job_id) for job_id in entry['jobs']
+                if os.path.isfile(os.path.join(key_dir, 'slurm-' + job_id + '.out'))]
+
+    def store(self, key, job_id, output_file):
+        """
+        Copy the SLURM output file of a finished job to the cache
+        :param key: Key of the configuration, see compute_key()
+        :param job_id: Job ID
+        :param output_file: Full path to the SLURM output file
+        :return: None
+        """
+        if not os.path.isfile(output_file):
+            io_manager.print_err_info('Cannot cache the output file, it does not exist: ' + output_file)
+            return
+
+        key_dir = os.path.join(self.get_cache_dir(), key)
+        os.makedirs(key_dir, exist_ok=True)
+        shutil.copy2(output_file, os.path.join(key_dir, 'slurm-' + str(job_id) + '.out'))
+
+        now = time.time()
+        entry = self._get_index().setdefault(key, {'created': now, 'last_used': now, 'jobs': []})
+        entry['last_used'] = now
+        if str(job_id) not in entry['jobs']:
+            entry['jobs'].append(str(job_id))
+
+    def _remove(self, key):
+        """
+        Remove the configuration from the cache
+        :param key: Key of the configuration
+        :return: None
+        """
+        self._get_index().pop(key, None)
+        shutil.rmtree(os.path.join(self.get_cache_dir(), key), ignore_errors=True)
+
+    def evict(self):
+        """
+        Remove configurations that were not used for more than get_max_age_days() days,
+        then remove the least recently used configurations above get_max_entries()
+        :return: Number of removed configurations
+        """
+        index = self._get_index()
+        removed = 0
+
+        if self.get_max_age_days() > 0:
+            min_time = time.time() - self.get_max_age_days() * 24 * 3600
+            for key in [key for key, entry in index.items() if entry['last_used'] < min_time]:
+                self._remove(key)
+                removed += 1
+
+        if 0 < self.get_max_entries() < len(index):
+            lru_keys = sorted(index.keys(), key=lambda k: index[k]['last_used'])
+            for key in lru_keys[:len(index) - self.get_max_entries()]:
+                self._remove(key)
+                removed += 1
+
+        if removed > 0:
+            io_manager.print_dbg_info('Evicted ' + str(removed) + ' configuration(s) from the result cache')
+        return removed
+
+    def invalidate(self, key=None):
+        """
+        Remove a configuration, or the whole cache. Exit if the prefix matches more than one
+        configuration.
+        :param key: Key (or a unique prefix of the key) of the configuration, None to remove all
+        :return: Number of removed configurations
+        """
+        index = self._get_index()
+        if key is None:
+            keys = list(index.keys())
+        else:
+            keys = [k for k in index.keys() if k.startswith(key)]
+            if len(keys) > 1:
+                io_manager.print_err_info('\'' + key + '\' matches ' + str(len(keys))
+                                          + ' configurations, use a longer prefix: ', keys)
+                exit(1)
+
+        for k in keys:
+            self._remove(k)
+        self.save()
+        io_manager.print_info('Removed ' + str(len(keys)) + ' configuration(s) from the result cache', '')
+        return len(keys)
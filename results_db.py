@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import time
+
+import io_manager
+
+
+class ResultsDB:
+    """
+    Store of the results. Every finished job is added as a row of the 'jobs' table with
+    the configuration of its test case, job ID, node list and timestamps. The raw values
+    extracted from its output are appended to the 'job_values' table later, one row per
+    extraction that refers to the row of the job. Job IDs are not unique (they repeat
+    across clusters and after ID resets), so a job is identified by its ID together with
+    its directory. Every run of a test is one row of the 'sweeps' table with the summary
+    of the report. Rows are only inserted, never updated, except for the summary of a
+    sweep. The database is an SQLite file in WAL mode, so it can be queried while a sweep
+    is running.
+    """
+    _enabled = True
+    _db_name = 'lassi_results.db'
+    _connection = None
+
+    _schema = [
+        'CREATE TABLE IF NOT EXISTS sweeps ('
+        '    id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        '    test_type TEXT NOT NULL,'
+        '    started_at REAL NOT NULL,'
+        '    finished_at REAL,'
+        '    config TEXT,'
+        '    summary TEXT'
+        ')',
+        'CREATE TABLE IF NOT EXISTS jobs ('
+        '    id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        '    sweep_id INTEGER REFERENCES sweeps(id),'
+        '    test_type TEXT NOT NULL,'
+        '    test_case TEXT,'
+        '    config_hash TEXT,'
+        '    config TEXT,'
+        '    job_id TEXT NOT NULL,'
+        '    dir TEXT,'
+        '    state TEXT,'
+        '    node_list TEXT,'
+        '    submitted_at REAL,'
+        '    finished_at REAL,'
+        '    accounting TEXT'
+        ')',
+        'CREATE TABLE IF NOT EXISTS job_values ('
+        '    id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        '    job_row INTEGER NOT NULL REFERENCES jobs(id),'
+        '    perf_regex TEXT,'
+        '    only_last INTEGER,'
+        '    raw_values TEXT,'
+        '    stored_at REAL'
+        ')',
+        'CREATE INDEX IF NOT EXISTS jobs_test_type ON jobs(test_type)',
+        'CREATE INDEX IF NOT EXISTS jobs_config_hash ON jobs(config_hash)',
+        'CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs(job_id)',
+        'CREATE INDEX IF NOT EXISTS job_values_job_row ON job_values(job_row)',
+    ]
+
+    # Columns added after the first version of the schema, they are added to existing databases
+    _added_columns = [
+        ('jobs', 'accounting', 'TEXT'),
+    ]
+
+    # Max number of host parameters in a single query
+    _max_query_params = 500
+
+    def is_enabled(self):
+        """
+        :return: True if results should be stored in the database
+        """
+        return self._enabled
+
+    def get_db_name(self):
+        """
+        :return: Name of the database file
+        """
+        return self._db_name
+
+    def read_config(self, config_file_name):
+        """
+        Read JSON config file
+        :param config_file_name: Name of the config file
+        """
+        f = open(config_file_name)
+        data = json.load(f)
+        f.close()
+
+        if 'results_db' in data:
+            self._enabled = data['results_db'].get('enabled', self._enabled)
+            self._db_name = data['results_db'].get('path', self._db_name)
+
+    def _connect(self):
+        """
+        :return: Connection to the database, opened and initialized on the first call
+        """
+        if self._connection is None:
+            db_dir = os.path.dirname(os.path.abspath(self.get_db_name()))
+            os.makedirs(db_dir, exist_ok=True)
+            self._connection = sqlite3.connect(self.get_db_name())
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            for statement in self._schema:
+                self._connection.execute(statement)
+            for table, column, column_type in self._added_columns:
+                columns = [row[1] for row in self._connection.execute('PRAGMA table_info(' + table + ')')]
+                if column not in columns:
+                    self._connection.execute('ALTER TABLE ' + table + ' ADD COLUMN ' + column + ' ' + column_type)
+            self._connection.commit()
+        return self._connection
+
+    def start_sweep(self, test_type, config=None):
+        """
+        Add a new sweep
+        :param test_type: Type of the test, see SrcData.get_type()
+        :param config: Dictionary with the configuration of the sweep
+        :return: ID of the sweep
+        """
+        if not self.is_enabled():
+            return None
+        connection = self._connect()
+        cursor = connection.execute('INSERT INTO sweeps (test_type, started_at, config) VALUES (?, ?, ?)',
+                                    (test_type, time.time(), json.dumps(config)))
+        connection.commit()
+        io_manager.print_dbg_info('Results are stored in ' + self.get_db_name() + ', sweep #' + str(cursor.lastrowid))
+        return cursor.lastrowid
+
+    def finish_sweep(self, sweep_id, summary):
+        """
+        Store the summary of the sweep
+        :param sweep_id: ID of the sweep, see start_sweep()
+        :param summary: Dictionary with the summary of the sweep
+        :return: None
+        """
+        if not self.is_enabled() or sweep_id is None:
+            return
+        connection = self._connect()
+        connection.execute('UPDATE sweeps SET finished_at = ?, summary = ? WHERE id = ?',
+                           (time.time(), json.dumps(summary), sweep_id))
+        connection.commit()
+
+    def record_job(self, sweep_id, test_type, job, state, node_list='', accounting=None, if_missing=False):
+        """
+        Add a finished job
+        :param sweep_id: ID of the sweep, see start_sweep()
+        :param test_type: Type of the test, see SrcData.get_type()
+        :param job: Dictionary that describes the job (see Executor.run_repetitive_tests())
+        :param state: Final state of the job
+        :param node_list: List of nodes the job was running on
+        :param accounting: Resource usage of the job, see JobMonitor.parse_accounting()
+        :param if_missing: True if the job should only be added if it is not in the database
+                           yet, e.g. a job that is reused from the result cache
+        :return: None
+        """
+        if not self.is_enabled():
+            return
+        connection = self._connect()
+        if if_missing and connection.execute('SELECT 1 FROM jobs WHERE job_id = ? AND dir = ?',
+                                             (str(job['id']), job['dir'])).fetchone() is not None:
+            return
+        connection.execute('INSERT INTO jobs (sweep_id, test_type, test_case, config_hash, config, job_id, dir, '
+                           'state, node_list, submitted_at, finished_at, accounting) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                           (sweep_id, test_type, json.dumps(job['test_case']), job.get('config_hash'),
+                            json.dumps(job.get('config')), str(job['id']), job['dir'], state, node_list,
+                            job.get('submitted_at'), time.time(), json.dumps(accounting or {})))
+        connection.commit()
+
+    def store_values(self, records, perf_regex, only_last):
+        """
+        Append values extracted from the output files. Values of jobs that are not in the
+        database are not stored.
+        :param records: List of records with 'job_id', 'dir', 'values' and 'error' keys, see
+                        GenericReport.get_records()
+        :param perf_regex: Regular expression that was used to extract the values
+        :param only_last: True if only the last value was extracted
+        :return: None
+        """
+        if not self.is_enabled():
+            return
+        connection = self._connect()
+        for record in records:
+            if record['error'] is not None:
+                continue
+            # Refer to the latest row of the job
+            connection.execute('INSERT INTO job_values (job_row, perf_regex, only_last, raw_values, stored_at) '
+                               'SELECT MAX(id), ?, ?, ?, ? FROM jobs WHERE job_id = ? AND dir = ? '
+                               'HAVING MAX(id) IS NOT NULL',
+                               (perf_regex, int(only_last), json.dumps(record['values']), time.time(),
+                                str(record['job_id']), record['dir']))
+        connection.commit()
+
+    def _lookup_column(self, jobs, column, condition='', params=(), table='jobs'):
+        """
+        Find the latest non-empty value of a column for every job
+        :param jobs: List of tuples (job ID, directory)
+        :param column: Name of the column with JSON values
+        :param condition: Additional SQL condition, starts with 'AND'
+        :param params: Parameters of the condition
+        :param table: Name of the table of the column, 'jobs' or a table with a 'job_row' column
+        :return: Dictionary with tuples (job ID, directory) as keys and decoded values as values
+        """
+        if not self.is_enabled() or not jobs:
+            return {}
+        connection = self._connect()
+        wanted = set((str(job_id), job_dir) for job_id, job_dir in jobs)
+        job_ids = sorted(set(job_id for job_id, job_dir in wanted))
+        values = {}
+        for first in range(0, len(job_ids), self._max_query_params):
+            chunk = job_ids[first:first + self._max_query_params]
+            source = 'jobs'
+            if table != 'jobs':
+                source = table + ' JOIN jobs ON jobs.id = ' + table + '.job_row'
+            rows = connection.execute('SELECT jobs.job_id, jobs.dir, ' + table + '.' + column + ' FROM ' + source
+                                      + ' WHERE ' + table + '.' + column + ' IS NOT NULL ' + condition
+                                      + ' AND jobs.job_id IN (' + ','.join('?' * len(chunk)) + ') ORDER BY '
+                                      + table + '.id', list(params) + chunk).fetchall()
+            for job_id, job_dir, value in rows:
+                if (job_id, job_dir) in wanted:
+                    values[(job_id, job_dir)] = json.loads(value)
+        return values
+
+    def lookup_values(self, jobs, perf_regex, only_last):
+        """
+        Find values that were already extracted from the output files of the jobs
+        :param jobs: List of tuples (job ID, directory)
+        :param perf_regex: Regular expression that was used to extract the values
+        :param only_last: True if only the last value was extracted
+        :return: Dictionary with tuples (job ID, directory) as keys and lists of values as values
+        """
+        return self._lookup_column(jobs, 'raw_values', 'AND perf_regex = ? AND only_last = ?',
+                                   (perf_regex, int(only_last)), 'job_values')
+
+    def lookup_accounting(self, jobs):
+        """
+        Find the resource usage of the jobs
+        :param jobs: List of tuples (job ID, directory)
+        :return: Dictionary with tuples (job ID, directory) as keys and the resource usage (see
+                 JobMonitor.parse_accounting()) as values. Jobs without it are not in the dictionary.
+        """
+        return self._lookup_column(jobs, 'accounting', 'AND accounting != \'{}\'')
@@ -2,6 +2,7 @@ import json
 import os
 
 import io_manager
+from report import stats
 
 
 class SrcData:
@@ -20,8 +21,26 @@ class SrcData:
     _list_of_src_files = []
     _threads_list = []
     _tasks_list = []
+    _cores_list = []
     _num_repetitions = 1
+    _max_repetitions = 0
+    _ci_width = 0.05
+    _ci_confidence = 0.95
+    _statistic = 'mean'
+    _outlier_rejection = 'none'
+    _outlier_threshold = None
+    _warmup_runs = 0
+    _warmup_values = 0
+    _bootstrap_resamples = 1000
+    _search_keep_fraction = 0.5
+    _search_job_budget = 0
+    _tuning_top_k = 3
+    _time_target = 0
+    _prediction_max_cores = 0
     _type = 'no_type'
+    _build_stage = 'inline'
+    _build_workers = 0
+    _report_workers = 0
 
     def get_compiler_cmd(self):
         """
@@ -91,20 +110,143 @@ class SrcData:
         """
         return self._tasks_list
 
+    def get_cores_list(self):
+        """
+        :return: Range of total numbers of cores of the hybrid test, an empty list if the
+                 test uses full nodes
+        """
+        return self._cores_list
+
     def get_num_repetitions(self):
         return self._num_repetitions
 
+    def get_max_repetitions(self):
+        """
+        :return: Max number of repetitions of a test case in the adaptive mode
+        """
+        return self._max_repetitions
+
+    def is_adaptive_repetitions(self):
+        """
+        :return: 'True' if test cases are repeated until the confidence interval of the
+                 performance is narrow enough, 'False' if every test case is repeated
+                 get_num_repetitions() times
+        """
+        return self._max_repetitions > self._num_repetitions
+
+    def get_ci_width(self):
+        """
+        :return: Target width of the confidence interval relative to the mean performance
+        """
+        return self._ci_width
+
+    def get_ci_confidence(self):
+        """
+        :return: Confidence level of the confidence interval
+        """
+        return self._ci_confidence
+
     def get_type(self):
         return self._type
 
-    def get_compile_cmd(self, compiler_flag_id=0):
+    def get_statistic(self):
+        """
+        :return: Statistic that represents the repetitions of a test case: 'median', 'mean' or 'min'
+        """
+        return self._statistic
+
+    def get_outlier_rejection(self):
+        """
+        :return: Outlier rejection method: 'mad', 'iqr' or 'none'
+        """
+        return self._outlier_rejection
+
+    def get_outlier_threshold(self):
+        """
+        :return: Threshold of the outlier rejection method, None - default threshold of the method
+        """
+        return self._outlier_threshold
+
+    def get_warmup_runs(self):
+        """
+        :return: Number of first repetitions of a test case that are not used in the report
+        """
+        return self._warmup_runs
+
+    def get_warmup_values(self):
+        """
+        :return: Number of first values in an output file that are not used in the report
+        """
+        return self._warmup_values
+
+    def get_bootstrap_resamples(self):
+        """
+        :return: Number of bootstrap resamples used to find the confidence interval in the report
+        """
+        return self._bootstrap_resamples
+
+    def get_search_keep_fraction(self):
+        """
+        :return: Fraction of the best configurations that are promoted to the next step of a search
+        """
+        return self._search_keep_fraction
+
+    def get_search_job_budget(self):
+        """
+        :return: Max number of jobs submitted by a search, 0 - no limit
+        """
+        return self._search_job_budget
+
+    def get_tuning_top_k(self):
+        """
+        :return: Number of the best algorithms of every collective that are repeated the
+                 full number of times after the screening
+        """
+        return self._tuning_top_k
+
+    def get_time_target(self):
+        """
+        :return: Max run time in seconds of the recommended number of cores, 0 - no target
+        """
+        return self._time_target
+
+    def get_prediction_max_cores(self):
+        """
+        :return: Max number of cores the scaling models predict, 0 - four times the max measured one
+        """
+        return self._prediction_max_cores
+
+    def get_build_stage(self):
+        """
+        :return: Where the code is compiled: 'inline' - in every job script, 'host' - once per
+                 set of compiler flags on the submit host, 'job' - once per set of compiler
+                 flags in a single build job
+        """
+        return self._build_stage
+
+    def get_build_workers(self):
+        """
+        :return: Number of parallel compiler processes, 0 - number of available cores
+        """
+        return self._build_workers
+
+    def get_report_workers(self):
+        """
+        :return: Number of processes that parse output files, 0 - number of available cores
+        """
+        return self._report_workers
+
+    def get_compile_cmd(self, compiler_flag_id=0, output_name=None):
         """
         Return a full command to compile the source code
         :param compiler_flag_id: ID of a compiler flag from the config file
+        :param output_name: Name of the compiled executable, if None the executable name is used
         :return: Full compile command
         """
+        if output_name is None:
+            output_name = self.get_exec_name()
         cmd = self.get_compiler_cmd() + ' ' + self.get_compiler_flags()[compiler_flag_id]
-        cmd += ' -o ' + self.get_exec_name()
+        cmd += ' -o ' + output_name
         for src_file in self.get_list_of_src_files():
             cmd += ' ' + src_file
         return cmd
@@ -124,8 +266,37 @@ class SrcData:
         """
         return os.path.isfile(self.get_src_path() + '/' + self.get_exec_name())
 
+    def set_build_stage(self, build_stage):
+        """
+        :param build_stage: Where the code is compiled, see get_build_stage()
+        :return: None
+        """
+        self._build_stage = build_stage
+
+    def set_threads_list(self, threads_list):
+        """
+        :param threads_list: Range of threads
+        :return: None
+        """
+        self._threads_list = threads_list
+
+    def set_tasks_list(self, tasks_list):
+        """
+        :param tasks_list: Range of MPI tasks
+        :return: None
+        """
+        self._tasks_list = tasks_list
+
     def _read_range(self, json_data, range_name):
+        """
+        :param json_data: Content of the config file
+        :param range_name: Name of the range, e.g. 'thread_range'
+        :return: List of values of the range, an empty list if the range is not set or
+                 is 'auto' (it is derived from the node topology then)
+        """
         range_list = []
+        if json_data['test_setup'].get(range_name, 'auto') == 'auto':
+            return range_list
         start = json_data['test_setup'][range_name]['start']
         stop = json_data['test_setup'][range_name]['stop']
         step = json_data['test_setup'][range_name]['step']
@@ -162,12 +333,54 @@ class SrcData:
         self._perf_label = data['test_setup']['perf_label']
         self._list_of_src_files = data['test_setup']['list_of_src_files']
         self._num_repetitions = data['test_setup']['num_repetitions']
+        self._max_repetitions = data['test_setup'].get('max_repetitions', self._max_repetitions)
+        self._ci_width = data['test_setup'].get('ci_width', self._ci_width)
+        self._ci_confidence = data['test_setup'].get('ci_confidence', self._ci_confidence)
+        self._statistic = data['test_setup'].get('statistic', self._statistic)
+        self._outlier_rejection = data['test_setup'].get('outlier_rejection', self._outlier_rejection)
+        self._outlier_threshold = data['test_setup'].get('outlier_threshold', self._outlier_threshold)
+        self._warmup_runs = data['test_setup'].get('warmup_runs', self._warmup_runs)
+        self._warmup_values = data['test_setup'].get('warmup_values', self._warmup_values)
+        self._bootstrap_resamples = data['test_setup'].get('bootstrap_resamples', self._bootstrap_resamples)
+        self._search_keep_fraction = data['test_setup'].get('search_keep_fraction', self._search_keep_fraction)
+        self._search_job_budget = data['test_setup'].get('search_job_budget', self._search_job_budget)
+        self._tuning_top_k = data['test_setup'].get('tuning_top_k', self._tuning_top_k)
+        self._time_target = data['test_setup'].get('time_target', self._time_target)
+        self._prediction_max_cores = data['test_setup'].get('prediction_max_cores', self._prediction_max_cores)
         self._type = data['test_setup']['type']
+        self._build_stage = data['test_setup'].get('build_stage', self._build_stage)
+        self._build_workers = data['test_setup'].get('build_workers', self._build_workers)
+        self._report_workers = data['test_setup'].get('report_workers', self._report_workers)
+
+        if self._build_stage not in ['inline', 'host', 'job']:
+            io_manager.print_err_info('Unknown build stage \'' + str(self._build_stage)
+                                      + '\'. Use \'inline\', \'host\' or \'job\'')
+            exit(1)
+
+        if self._ci_confidence not in stats.get_confidence_levels():
+            io_manager.print_err_info('Unsupported confidence level ' + str(self._ci_confidence)
+                                      + '. Supported levels: ', stats.get_confidence_levels())
+            exit(1)
+
+        if self._statistic not in stats.get_statistics():
+            io_manager.print_err_info('Unknown statistic \'' + str(self._statistic) + '\'. Known statistics: ',
+                                      stats.get_statistics())
+            exit(1)
+
+        if self._outlier_rejection not in stats.get_outlier_methods():
+            io_manager.print_err_info('Unknown outlier rejection method \'' + str(self._outlier_rejection)
+                                      + '\'. Known methods: ', stats.get_outlier_methods())
+            exit(1)
+
+        if not 0 < self._search_keep_fraction <= 1:
+            io_manager.print_err_info('The search keep fraction should be in (0, 1]: ', self._search_keep_fraction)
+            exit(1)
 
         if self._num_repetitions < 1:
             self._num_repetitions = 1
 
         self._threads_list = self._read_range(data, 'thread_range')
         self._tasks_list = self._read_range(data, 'tasks_range')
+        self._cores_list = self._read_range(data, 'cores_range')
 
         f.close()
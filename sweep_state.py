@@ -0,0 +1,157 @@
+import json
+import os
+import time
+
+import io_manager
+
+
+class SweepState:
+    """
+    Journal of the current sweep, so an interrupted sweep can be resumed. Every planned
+    test case, every submitted job and every finished job (with its state and the values
+    extracted from its output) is appended to a JSON lines file as soon as it happens.
+    The file is only appended to, so it stays consistent if the process is killed. On
+    resume, the journal of the previous run is replayed: completed jobs are reused, jobs
+    that are still known to the scheduler are waited for, and only the remaining
+    repetitions are submitted. Jobs are matched by the hash of their configuration (see
+    Executor._describe_test_case()) and their test case.
+    """
+    _file_name = None
+    # Jobs of the previous run, dictionaries with 'id', 'dir', 'key', 'submitted_at',
+    # 'state' and 'values' keys
+    _previous_jobs = {}
+    # IDs of the jobs of the previous run that were already reused
+    _taken_ids = set()
+
+    def get_file_name(self):
+        """
+        :return: Name of the journal file, None if the journal is not opened
+        """
+        return self._file_name
+
+    def make_key(self, config_hash, test_case):
+        """
+        :param config_hash: Hash of the configuration of the test case
+        :param test_case: Name of the test case (e.g. number of threads)
+        :return: Key of the test case, None if the configuration is unknown
+        """
+        if config_hash is None:
+            return None
+        return config_hash + '|' + json.dumps(test_case)
+
+    def open(self, file_name, test_type, config_file_name, resume=False):
+        """
+        Start the journal. If 'resume' is True, the existing journal is replayed and new
+        events are appended to it, otherwise the journal is started from scratch.
+        :param file_name: Name of the journal file
+        :param test_type: Type of the test, see SrcData.get_type()
+        :param config_file_name: Name of the config file
+        :param resume: True if the previous run should be resumed
+        :return: None
+        """
+        self._file_name = file_name
+        self._previous_jobs = {}
+        self._taken_ids = set()
+        if resume:
+            if os.path.isfile(file_name):
+                self._load(file_name)
+                io_manager.print_dbg_info('Resuming the sweep from ' + file_name + ': '
+                                          + str(len(self._previous_jobs)) + ' job(s) found')
+            else:
+                io_manager.print_err_info('Nothing to resume, the sweep state does not exist: ' + file_name)
+        else:
+            open(file_name, 'w').close()
+        self._append({'event': 'start', 'test_type': test_type, 'config': config_file_name})
+
+    def _load(self, file_name):
+        """
+        Replay the journal of the previous run
+        :param file_name: Name of the journal file
+        :return: None
+        """
+        with open(file_name, 'r') as file:
+            line = ''
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if the process was killed while writing it
+                    continue
+                if event['event'] == 'submit':
+                    self._previous_jobs[event['job_id']] = {
+                        'id': event['job_id'],
+                        'dir': event['dir'],
+                        'key': event['key'],
+                        'submitted_at': event['time'],
+                        'state': None,
+                        'values': None,
+                    }
+                elif event['event'] == 'finish' and event['job_id'] in self._previous_jobs:
+                    self._previous_jobs[event['job_id']]['state'] = event['state']
+                    self._previous_jobs[event['job_id']]['values'] = event['values']
+        if not line.endswith('\n'):
+            # Start new events on a new line
+            with open(file_name, 'a') as file:
+                file.write('\n')
+
+    def _append(self, event):
+        """
+        Append an event to the journal
+        :param event: Dictionary that describes the event
+        :return: None
+        """
+        if self._file_name is None:
+            return
+        event['time'] = event.get('time', time.time())
+        with open(self._file_name, 'a') as file:
+            file.write(json.dumps(event) + '\n')
+
+    def plan(self, config_hash, test_case, num_repetitions):
+        """
+        Record a planned test case
+        :param config_hash: Hash of the configuration of the test case
+        :param test_case: Name of the test case
+        :param num_repetitions: Number of repetitions that should be submitted
+        :return: None
+        """
+        self._append({'event': 'plan', 'key': self.make_key(config_hash, test_case),
+                      'test_case': test_case, 'num_repetitions': num_repetitions})
+
+    def submit(self, job):
+        """
+        Record a submitted job
+        :param job: Dictionary that describes the job, see Executor._make_job()
+        :return: None
+        """
+        key = self.make_key(job['config_hash'], job['test_case'])
+        if key is None:
+            return
+        self._append({'event': 'submit', 'key': key, 'job_id': str(job['id']), 'dir': job['dir'],
+                      'time': job['submitted_at']})
+
+    def finish(self, job, state, values=None):
+        """
+        Record a finished job
+        :param job: Dictionary that describes the job, see Executor._make_job()
+        :param state: Final state of the job
+        :param values: Values extracted from the output of the job
+        :return: None
+        """
+        self._append({'event': 'finish', 'job_id': str(job['id']), 'state': state, 'values': values})
+
+    def take_jobs(self, config_hash, test_case):
+        """
+        Find the jobs of the test case in the previous run that can be reused: completed
+        jobs and jobs that did not finish before the previous run was interrupted. Every
+        job is returned only once.
+        :param config_hash: Hash of the configuration of the test case
+        :param test_case: Name of the test case
+        :return: List of jobs, see _load()
+        """
+        key = self.make_key(config_hash, test_case)
+        if key is None:
+            return []
+        jobs = [job for job in self._previous_jobs.values()
+                if job['key'] == key and job['id'] not in self._taken_ids and job['state'] in (None, 'COMPLETED')]
+        self._taken_ids.update(job['id'] for job in jobs)
+        return jobs
@@ -1,13 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
 from shutil import which
-import subprocess
+import hashlib
+import json
+import os
 import re
+import socket
+import subprocess
+import time
 
 import io_manager
 
 
 class SystemInfo:
+    """
+    Probe the system, compilers and libraries. All probes run concurrently, every probe
+    has a timeout. The results are cached on disk, the key of the cache is the host name,
+    the list of modules and the PATH, so repeated runs in the same environment do not
+    probe anything.
+    """
     _list_of_mpi_vendors = ['Intel', 'Open MPI']
 
+    _list_of_apps = [('uname', '-o'), ('uname', '-r'), ('uname', '-m'),
+                     ('module', '--version'), ('mpirun', '--version'),
+                     ('gcc', '--version'), ('g++', '--version'), ('gfortran', '--version'),
+                     ('icc', '--version'), ('icpc', '--version'), ('ifort', '--version'),
+                     ('clang', '--version'), ('clang++', '--version'), ('flang', '--version'),
+                     ('python', '--version'), ('python2', '--version'), ('python3', '--version')]
+
+    _probe_timeout = 10         # seconds
+    _cache_file = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+                               'lassi', 'systeminfo.json')
+    _max_age_days = 7
+
+    # Results of the probes of the current run, see probe_all()
+    _results = {}
+
     def get_list_of_mpi_vendors(self):
         """
         :return: List of known MPI vendors
@@ -47,18 +74,127 @@ class SystemInfo:
         """
         return which(app_name) is not None
 
-    def execute_app(self, app_name, app_keys, stderr=subprocess.DEVNULL):
+    def execute_app(self, app_name, app_keys, stderr=subprocess.DEVNULL, timeout=None):
         """
         Execute application with provided keys
         :param app_name: Name of the application
         :param app_keys: String of keys
         :param stderr: Redirect stderr to a specific stream
-        :return: Stdout after execution
+        :param timeout: Max time in seconds, None - no limit
+        :return: Stdout after execution, or None if the application did not finish in time
         """
-        result = subprocess.run([app_name, app_keys], stdout=subprocess.PIPE,
-                                stderr=stderr)
+        try:
+            result = subprocess.run([app_name, app_keys], stdout=subprocess.PIPE,
+                                    stderr=stderr, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            io_manager.print_err_info('\'' + app_name + ' ' + app_keys + '\' did not finish in '
+                                      + str(timeout) + ' sec')
+            return None
         return result.stdout.decode('utf-8')
 
+    def _probe(self, app, keys):
+        """
+        :param app: Application name
+        :param keys: String of keys
+        :return: Output of the application, None if the application is not available or did not
+                 finish in time
+        """
+        if not self.is_available(app):
+            return None
+        if app == 'python2':
+            # Python2 outputs `--version` to stderr, see
+            # https://bugs.python.org/issue18338. We need
+            # a separate treatment to handle this bug.
+            return self.execute_app(app, keys, subprocess.STDOUT, self._probe_timeout)
+        return self.execute_app(app, keys, timeout=self._probe_timeout)
+
+    def _get_cache_key(self, module_list):
+        """
+        :param module_list: List of modules to be loaded
+        :return: Key of the probed environment
+        """
+        environment = [socket.gethostname(), list(module_list), os.environ.get('LOADEDMODULES', ''),
+                       os.environ.get('PATH', '')]
+        return hashlib.sha256(json.dumps(environment).encode('utf-8')).hexdigest()
+
+    def _read_cache(self):
+        """
+        :return: Content of the cache file, an empty dictionary if it does not exist or is broken
+        """
+        try:
+            with open(self._cache_file, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, key, results, created=None):
+        """
+        Store the results of the probes in the cache file, expired entries are removed
+        :param key: Key of the probed environment, see _get_cache_key()
+        :param results: Dictionary with 'app keys' as keys and outputs as values
+        :param created: Time the entry was created, None - now
+        :return: None
+        """
+        now = time.time()
+        cache = {k: entry for k, entry in self._read_cache().items()
+                 if now - entry['created'] < self._max_age_days * 24 * 3600}
+        cache[key] = {'created': now if created is None else created, 'results': results}
+        try:
+            os.makedirs(os.path.dirname(self._cache_file), exist_ok=True)
+            tmp_file = self._cache_file + '.' + str(os.getpid())
+            with open(tmp_file, 'w') as file:
+                json.dump(cache, file)
+            os.replace(tmp_file, self._cache_file)
+        except OSError as err:
+            io_manager.print_err_info('Cannot write the system info cache: ', str(err))
+
+    def probe_all(self, module_list):
+        """
+        Run all probes concurrently, or take their results from the cache. Probes without
+        output (the application was not found or did not finish in time) are run again
+        instead of being taken from the cache.
+        :param module_list: List of modules to be loaded
+        :return: Dictionary with 'app keys' as keys and outputs (None if the application
+                 is not available) as values
+        """
+        key = self._get_cache_key(module_list)
+        if key in SystemInfo._results:
+            return SystemInfo._results[key]
+
+        results = {}
+        entry = self._read_cache().get(key)
+        if entry is not None and time.time() - entry['created'] < self._max_age_days * 24 * 3600:
+            io_manager.print_dbg_info('System info is taken from the cache: ' + self._cache_file)
+            results = entry['results']
+        else:
+            entry = None
+        apps = [(app, keys) for app, keys in self._list_of_apps if results.get(app + ' ' + keys) is None]
+        if apps:
+            with ThreadPoolExecutor(max_workers=len(apps)) as pool:
+                outputs = list(pool.map(lambda app: self._probe(*app), apps))
+            results = dict(results)
+            results.update({app + ' ' + keys: output for (app, keys), output in zip(apps, outputs)})
+            if entry is None:
+                self._write_cache(key, results)
+            elif any(output is not None for output in outputs):
+                self._write_cache(key, results, entry['created'])
+        SystemInfo._results[key] = results
+        return results
+
+    def get_mpi_vendor(self, module_list):
+        """
+        :param module_list: List of modules to be loaded
+        :return: Name of the MPI vendor (see get_list_of_mpi_vendors()), or an empty string
+                 if the MPI library was not detected
+        """
+        output = self.probe_all(module_list).get('mpirun --version')
+        if output is None:
+            return ''
+        for vendor in self._list_of_mpi_vendors:
+            if vendor in output:
+                return vendor
+        return ''
+
     def report_all(self, module_list):
         """
         Report information about the system, compilers and libraries
@@ -66,25 +202,20 @@ class SystemInfo:
         :return: Name of the the MPI vendor, or an empty string if MPI library
                  was not detected
         """
-        list_of_apps = [('uname', '-o'), ('uname', '-r'), ('uname', '-m'),
-                        ('module', '--version'), ('mpirun', '--version'),
-                        ('gcc', '--version'), ('g++', '--version'), ('gfortran', '--version'),
-                        ('icc', '--version'), ('icpc', '--version'), ('ifort', '--version'),
-                        ('clang', '--version'), ('clang++', '--version'), ('flang', '--version'),
-                        ('python', '--version'), ('python2', '--version'), ('python3', '--version')]
-
         # Load modules
         # load_modules(module_list)
 
+        results = self.probe_all(module_list)
+
         io_manager.print_prefix('Environment:', ' ')
         io_manager.print_info('', '')
-        mpi_vendor = ''
+        mpi_vendor = self.get_mpi_vendor(module_list)
 
         # Check list of apps
-        for app, keys in list_of_apps:
-            if self.is_available(app):
+        for app, keys in self._list_of_apps:
+            output = results[app + ' ' + keys]
+            if output is not None:
                 if app == 'uname':
-                    output = self.execute_app(app, keys)
                     output = output.strip()  # remove leading and trailing spaces
                     info_type = 'none'
                     if keys == '-o':
@@ -96,18 +227,8 @@ class SystemInfo:
                     io_manager.print_info(info_type + ': ' + output)
                 else:
                     io_manager.print_info(app + ': found')
-                    if app == 'python2':
-                        # Python2 outputs `--version` to stderr, see
-                        # https://bugs.python.org/issue18338. We need
-                        # a separate treatment to handle this bug.
-                        output = self.execute_app(app, keys, subprocess.STDOUT)
-                    else:
-                        output = self.execute_app(app, keys)
-                    if app == 'mpirun':
-                        for vendor in self._list_of_mpi_vendors:
-                            if vendor in output:
-                                mpi_vendor = vendor
-                                io_manager.print_info(app + ' vendor: ' + vendor)
+                    if app == 'mpirun' and mpi_vendor != '':
+                        io_manager.print_info(app + ' vendor: ' + mpi_vendor)
                     self.print_version(app, output)
             else:
                 io_manager.print_info(app + ': not found')
@@ -116,6 +237,190 @@ class SystemInfo:
         
         return mpi_vendor
 
+    def parse_cpu_list(self, text):
+        """
+        :param text: List of CPUs in the kernel format, e.g. '0-3,8,10-11'
+        :return: List of CPU IDs
+        """
+        cpus = []
+        for item in text.strip().split(','):
+            if '-' in item:
+                first, last = item.split('-')
+                cpus.extend(range(int(first), int(last) + 1))
+            elif item:
+                cpus.append(int(item))
+        return cpus
+
+    def _read_text(self, file_name, default=None):
+        """
+        :param file_name: Name of the file
+        :param default: Value that is returned if the file cannot be read
+        :return: Stripped content of the file
+        """
+        try:
+            with open(file_name, 'r') as file:
+                return file.read().strip()
+        except OSError:
+            return default
+
+    def read_sysfs_topology(self, sysfs_root='/sys'):
+        """
+        Read the CPU topology from sysfs. Any directory with the same layout (e.g. a copy
+        of /sys/devices/system captured on a compute node) can be used as the root.
+        :param sysfs_root: Root of sysfs
+        :return: List of dictionaries with 'cpu', 'core', 'socket', 'numa' and 'llc' keys,
+                 one per online logical CPU
+        """
+        cpu_dir = os.path.join(sysfs_root, 'devices', 'system', 'cpu')
+        node_dir = os.path.join(sysfs_root, 'devices', 'system', 'node')
+
+        numa_of_cpu = {}
+        if os.path.isdir(node_dir):
+            for entry in os.listdir(node_dir):
+                if re.fullmatch(r'node\d+', entry):
+                    for cpu in self.parse_cpu_list(self._read_text(os.path.join(node_dir, entry, 'cpulist'), '')):
+                        numa_of_cpu[cpu] = int(entry[4:])
+
+        cpus = []
+        for entry in sorted(os.listdir(cpu_dir)):
+            if not re.fullmatch(r'cpu\d+', entry):
+                continue
+            path = os.path.join(cpu_dir, entry)
+            if self._read_text(os.path.join(path, 'online'), '1') == '0' \
+                    or not os.path.isdir(os.path.join(path, 'topology')):
+                continue
+            cpu = int(entry[3:])
+            socket_id = int(self._read_text(os.path.join(path, 'topology', 'physical_package_id'), '0'))
+            # The last level cache is the unified cache with the highest level
+            llc = None
+            llc_level = 0
+            cache_dir = os.path.join(path, 'cache')
+            if os.path.isdir(cache_dir):
+                for index in os.listdir(cache_dir):
+                    index_path = os.path.join(cache_dir, index)
+                    level = int(self._read_text(os.path.join(index_path, 'level'), '0'))
+                    if self._read_text(os.path.join(index_path, 'type')) != 'Instruction' and level > llc_level:
+                        llc_level = level
+                        llc = self._read_text(os.path.join(index_path, 'shared_cpu_list'))
+            cpus.append({
+                'cpu': cpu,
+                'core': (socket_id, int(self._read_text(os.path.join(path, 'topology', 'core_id'), str(cpu)))),
+                'socket': socket_id,
+                'numa': numa_of_cpu.get(cpu, socket_id),
+                'llc': llc,
+            })
+        return cpus
+
+    def parse_lscpu(self, text):
+        """
+        Extract the CPU topology from the output of 'lscpu -p', e.g. of
+        'srun -N 1 lscpu -p=CPU,CORE,SOCKET,NODE,CACHE' captured on a compute node
+        :param text: Output of lscpu
+        :return: List of dictionaries, see read_sysfs_topology()
+        """
+        columns = []
+        cpus = []
+        for line in text.splitlines():
+            if line.startswith('#'):
+                # The last comment line holds the names of the columns
+                columns = [column.strip().lower() for column in line[1:].split(',')]
+                continue
+            fields = line.strip().split(',')
+            if not columns or len(fields) != len(columns):
+                continue
+            values = dict(zip(columns, fields))
+            socket_id = int(values.get('socket') or 0)
+            # The caches are either separate columns or a single column separated by ':',
+            # the last one is the last level cache
+            llc = fields[-1].split(':')[-1] if re.match(r'^l\d|.*:', columns[-1]) else None
+            cpus.append({
+                'cpu': int(values['cpu']),
+                'core': (socket_id, int(values.get('core') or values['cpu'])),
+                'socket': socket_id,
+                'numa': int(values.get('node') or socket_id),
+                'llc': llc or None,
+            })
+        return cpus
+
+    def summarize_topology(self, cpus):
+        """
+        :param cpus: List of logical CPUs, see read_sysfs_topology()
+        :return: Dictionary with 'cpus' (logical CPUs), 'cores' (physical cores), 'sockets',
+                 'threads_per_core', 'numa_domains', 'llc_groups' (groups of cores sharing
+                 the last level cache), 'cores_per_socket', 'cores_per_numa' and 'cores_per_llc'
+                 keys, None if the list is empty
+        """
+        if not cpus:
+            return None
+        num_cores = len(set(cpu['core'] for cpu in cpus))
+        num_sockets = len(set(cpu['socket'] for cpu in cpus))
+        num_numa = len(set(cpu['numa'] for cpu in cpus))
+        llc_groups = set(cpu['llc'] for cpu in cpus if cpu['llc'] is not None)
+        num_llc = len(llc_groups) if llc_groups else num_numa
+        return {
+            'cpus': len(cpus),
+            'cores': num_cores,
+            'sockets': num_sockets,
+            'threads_per_core': len(cpus) // num_cores,
+            'numa_domains': num_numa,
+            'llc_groups': num_llc,
+            'cores_per_socket': num_cores // num_sockets,
+            'cores_per_numa': max(num_cores // num_numa, 1),
+            'cores_per_llc': max(num_cores // num_llc, 1),
+        }
+
+    def discover_topology(self, source='host', sysfs_root='/sys'):
+        """
+        Discover the topology of a node
+        :param source: 'host' - the current machine (sysfs, or lscpu if sysfs is not available),
+                       name of a directory - root of a sysfs snapshot, name of a file - output
+                       of 'lscpu -p'
+        :param sysfs_root: Root of sysfs of the current machine
+        :return: Topology, see summarize_topology(), None if it cannot be discovered
+        """
+        if source == 'host':
+            if os.path.isdir(os.path.join(sysfs_root, 'devices', 'system', 'cpu')):
+                return self.summarize_topology(self.read_sysfs_topology(sysfs_root))
+            if self.is_available('lscpu'):
+                return self.summarize_topology(self.parse_lscpu(self.execute_app('lscpu', '-p',
+                                                                                 timeout=self._probe_timeout) or ''))
+            return None
+        if os.path.isdir(source):
+            return self.summarize_topology(self.read_sysfs_topology(source))
+        if os.path.isfile(source):
+            return self.summarize_topology(self.parse_lscpu(self._read_text(source, '')))
+        return None
+
+    def get_aligned_points(self, topology):
+        """
+        Numbers of cores aligned to the boundaries of the node: powers of two below the size
+        of an LLC group, then an LLC group, a NUMA domain, a socket and the whole node
+        :param topology: Topology, see summarize_topology()
+        :return: Sorted list of numbers of cores
+        """
+        points = {topology['cores_per_llc'], topology['cores_per_numa'],
+                  topology['cores_per_socket'], topology['cores']}
+        power = 1
+        while power < topology['cores_per_llc']:
+            points.add(power)
+            power *= 2
+        return sorted(points)
+
+    def report_topology(self, topology):
+        """
+        Report the topology of a node
+        :param topology: Topology, see summarize_topology()
+        :return: None
+        """
+        io_manager.print_prefix('Node topology:', ' ')
+        io_manager.print_info('', '')
+        io_manager.print_info(str(topology['sockets']) + ' socket(s) x ' + str(topology['cores_per_socket'])
+                              + ' cores x ' + str(topology['threads_per_core']) + ' thread(s)')
+        io_manager.print_info(str(topology['numa_domains']) + ' NUMA domain(s) of ' + str(topology['cores_per_numa'])
+                              + ' cores, ' + str(topology['llc_groups']) + ' LLC group(s) of '
+                              + str(topology['cores_per_llc']) + ' cores')
+        io_manager.print_info('')
+
     def load_modules(self, module_list):
         """
         Load modules from the list
@@ -0,0 +1,70 @@
+"""
+Parsers of the outputs of 'perf stat -x,' and 'likwid-perfctr -O', checked against
+recorded samples in tests/fixtures, and the selection of the counter tool. Run with
+'python -m pytest tests' or 'python -m unittest discover tests' from the root of the
+repository.
+"""
+import os
+import sys
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from batch_data import BatchFileData
+from report import counters
+
+_fixtures_dir = os.path.join(_root_dir, 'tests', 'fixtures')
+
+
+def _read_fixture(file_name):
+    """
+    :param file_name: Name of the file in the fixtures directory
+    :return: Content of the file
+    """
+    with open(os.path.join(_fixtures_dir, file_name), 'r') as file:
+        return file.read()
+
+
+class TestCounters(unittest.TestCase):
+
+    def test_perf(self):
+        values = counters.parse(_read_fixture('perf_stat.txt').splitlines())
+        # Summed over the tasks, except for the duration
+        self.assertEqual(values['cycles'], 8.2e9)
+        self.assertEqual(values['instructions'], 6.3e9)
+        self.assertEqual(values['LLC-load-misses'], 2.5e7)
+        self.assertEqual(values['duration_time'], 1.25e9)
+        self.assertNotIn('LLC-store-misses', values)
+
+        metrics = counters.derive_metrics(values)
+        self.assertAlmostEqual(metrics['ipc'], 6.3 / 8.2)
+        self.assertAlmostEqual(metrics['bandwidth'], 2.5e7 * 64 / 1.25 * 1e-9)
+        self.assertNotIn('gflops', metrics)
+
+    def test_likwid(self):
+        values = counters.parse(_read_fixture('likwid.csv').splitlines())
+        # Summed over the hardware threads, statistics lines are ignored
+        self.assertEqual(values['INSTR_RETIRED_ANY'], 4e9)
+        self.assertEqual(values['CPU_CLK_UNHALTED_CORE'], 4e9)
+        self.assertEqual(values['Runtime (RDTSC) [s]'], 1.0)
+        self.assertNotIn('CPI', values)
+
+        metrics = counters.derive_metrics(values)
+        self.assertAlmostEqual(metrics['ipc'], 1.0)
+        self.assertAlmostEqual(metrics['bandwidth'], 1.024)
+        self.assertAlmostEqual(metrics['gflops'], 1.0555556)
+
+    def test_tool_of_mpi_launchers(self):
+        batch_data = BatchFileData()
+        batch_data.set_counters({'tool': 'auto'})
+        batch_data.set_launcher('bash')
+        self.assertIn('likwid-perfctr', batch_data._assemble_counters())
+        # Every task would measure the same counters with likwid-perfctr
+        batch_data.set_launcher('srun')
+        self.assertNotIn('likwid-perfctr', batch_data._assemble_counters())
+        self.assertIn('perf stat', batch_data._assemble_counters())
+
+
+if __name__ == '__main__':
+    unittest.main()
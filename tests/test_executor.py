@@ -0,0 +1,85 @@
+"""
+Handling of finished jobs and job arrays by the executor. The results database, the result
+cache and the sweep state are disabled, so only the lists of successful jobs are checked.
+Run with 'python -m pytest tests' or 'python -m unittest discover tests' from the root of
+the repository.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from executor import Executor
+from result_cache import ResultCache
+from results_db import ResultsDB
+from src_data import SrcData
+from sweep_state import SweepState
+
+
+class TestFinishJob(unittest.TestCase):
+
+    def setUp(self):
+        self.wrk_dir = tempfile.mkdtemp(prefix='lassi_test_')
+        self.executor = Executor()
+        self.executor._results_db = ResultsDB()
+        self.executor._results_db._enabled = False
+        self.executor._sweep_id = 0
+        self.executor._result_cache = ResultCache()
+        self.executor._sweep_state = SweepState()
+        self.executor._src_data = SrcData()
+        self.executor._src_data._perf_regex = r'Time:\s+\S+\s+s'
+        self.lists = ([], [], [])
+
+    def tearDown(self):
+        shutil.rmtree(self.wrk_dir)
+
+    def _finish(self, job_id, state, values=(), test_config=None):
+        """
+        Write the output file of the job and pass the job to the executor
+        :return: Value returned by Executor._finish_job()
+        """
+        with open(os.path.join(self.wrk_dir, 'slurm-' + job_id + '.out'), 'w') as file:
+            for value in values:
+                file.write('Time: ' + str(value) + ' s\n')
+        job = self.executor._make_job(job_id, self.wrk_dir, 4, self.lists, test_config)
+        return self.executor._finish_job(job, state)
+
+    def test_only_completed_jobs_are_used(self):
+        self.assertTrue(self._finish('1', 'COMPLETED', [1.5]))
+        for job_id, state in [('2', 'FAILED'), ('3', 'TIMEOUT'), ('4', 'UNKNOWN'), ('5', 'CANCELLED by 123'),
+                              ('6', 'OUT_OF_MEMORY')]:
+            self.assertFalse(self._finish(job_id, state, [1.5]))
+        self.assertEqual(self.lists, (['1'], [self.wrk_dir], [4]))
+
+    def test_adaptive_metric(self):
+        # The value of a job is the same as in the report: warm-up values are dropped and
+        # the rest is represented by the statistic
+        self.executor._src_data._warmup_values = 1
+        self.executor._src_data._statistic = 'median'
+        test_config = {'description': None, 'hash': None, 'cache_key': None, 'metrics': []}
+        self._finish('1', 'COMPLETED', [100.0, 2.0, 3.0, 10.0], test_config)
+        self._finish('2', 'FAILED', [5.0], test_config)
+        self.assertEqual(test_config['metrics'], [3.0])
+
+        self.executor._src_data._use_only_last_value = True
+        self._finish('3', 'COMPLETED', [100.0, 2.0, 4.0], test_config)
+        self.assertEqual(test_config['metrics'], [3.0, 4.0])
+
+
+class TestJobArrays(unittest.TestCase):
+
+    def test_group_by_resources(self):
+        cases = [{'name': name, 'nodes': 1, 'ntasks': ntasks, 'cpus': cpus, 'num_repetitions': 3}
+                 for name, ntasks, cpus in [('a', 128, 1), ('b', 1, 128), ('c', 128, 1), ('d', 64, 2), ('e', 128, 1)]]
+        arrays = Executor()._group_array_cases(cases, 6)
+        self.assertEqual([[case['name'] for case in array] for array in arrays], [['a', 'c'], ['e'], ['b'], ['d']])
+        for array in arrays:
+            self.assertEqual(len(set((case['nodes'], case['ntasks'], case['cpus']) for case in array)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Decompositions of the hybrid MPI x OpenMP test. Run with 'python -m pytest tests' or
+'python -m unittest discover tests' from the root of the repository.
+"""
+import os
+import sys
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from analysis.hybrid_analysis import HybridAnalysis
+from batch_data import BatchFileData
+from src_data import SrcData
+
+
+class TestDecompositions(unittest.TestCase):
+
+    def setUp(self):
+        self.analysis = HybridAnalysis()
+        self.analysis._batch_data = BatchFileData()
+        self.analysis._batch_data._max_cores_pre_node = 4
+        self.analysis._src_data = SrcData()
+        self.analysis._src_data._tasks_list = [1, 2, 4, 8]
+        self.analysis._src_data._threads_list = [1, 2, 4, 8]
+
+    def test_full_nodes(self):
+        # Only multiples of the cores of a node, a task with 8 threads does not fit
+        self.assertEqual(self.analysis.get_decompositions(),
+                         [(1, 4), (2, 2), (4, 1), (2, 4), (4, 2), (8, 1), (4, 4), (8, 2), (8, 4)])
+
+    def test_cores_range(self):
+        self.analysis._src_data._cores_list = [2, 8]
+        self.assertEqual(self.analysis.get_decompositions(), [(1, 2), (2, 1), (2, 4), (4, 2), (8, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
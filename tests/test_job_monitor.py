@@ -0,0 +1,133 @@
+"""
+Parsing of the recorded sacct and squeue outputs in tests/fixtures, the resource usage
+derived from them and the matching of job array tasks. Run with 'python -m pytest tests'
+or 'python -m unittest discover tests' from the root of the repository.
+"""
+import os
+import sys
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from job_monitor import JobMonitor
+from report import accounting
+
+_fixtures_dir = os.path.join(_root_dir, 'tests', 'fixtures')
+
+
+def _read_fixture(file_name):
+    """
+    :param file_name: Name of the file in the fixtures directory
+    :return: Content of the file
+    """
+    with open(os.path.join(_fixtures_dir, file_name), 'r') as file:
+        return file.read()
+
+
+class TestSacct(unittest.TestCase):
+
+    def setUp(self):
+        self.records = JobMonitor().parse_sacct_output(_read_fixture('sacct.txt'))
+
+    def test_jobs(self):
+        # Job steps are merged into their jobs
+        self.assertEqual(sorted(self.records.keys()), ['1001', '1002', '1003', '1004', '1005'])
+        self.assertEqual(self.records['1001']['state'], 'COMPLETED')
+        self.assertEqual(self.records['1001']['node_list'], 'node[01-02]')
+        self.assertEqual(self.records['1002']['exit_code'], '1:0')
+
+    def test_finished_states(self):
+        monitor = JobMonitor()
+        finished = {job_id: monitor.is_finished_state(record['state']) for job_id, record in self.records.items()}
+        self.assertEqual(finished, {'1001': True, '1002': True, '1003': False, '1004': True, '1005': False})
+
+    def test_accounting(self):
+        usage = self.records['1001']['accounting']
+        self.assertEqual(usage['elapsed'], 100)
+        self.assertAlmostEqual(usage['total_cpu'], 640)
+        # Max over the steps
+        self.assertEqual(usage['max_rss'], 1024 ** 3)
+        self.assertEqual(usage['ave_cpu_freq'], 2.6e9)
+        self.assertEqual(usage['ntasks'], 8)
+        self.assertEqual(usage['alloc_cpus'], 8)
+        # The value of the job line is kept
+        self.assertEqual(usage['consumed_energy'], 12.5e3)
+        self.assertEqual(usage['start_time'] - usage['submit_time'], 30)
+        self.assertEqual(usage['end_time'] - usage['start_time'], 100)
+
+        # Frequencies without a suffix are in kHz
+        self.assertEqual(self.records['1002']['accounting']['ave_cpu_freq'], 2e9)
+        self.assertIsNone(self.records['1003']['accounting']['end_time'])
+        self.assertIsNone(self.records['1005']['accounting']['start_time'])
+
+    def test_metrics(self):
+        metrics = accounting.derive_metrics(self.records['1001']['accounting'])
+        self.assertAlmostEqual(metrics['memory_per_core'], 1024)
+        self.assertAlmostEqual(metrics['cpu_efficiency'], 0.8)
+        self.assertAlmostEqual(metrics['energy'], 12.5e3)
+        # No energy accounting
+        self.assertNotIn('energy', accounting.derive_metrics(self.records['1002']['accounting']))
+
+
+class _RecordedMonitor(JobMonitor):
+    """
+    Job monitor that returns recorded outputs instead of calling sacct and squeue
+    """
+
+    def __init__(self, sacct_output, squeue_output):
+        self.outputs = {'sacct': sacct_output, 'squeue': squeue_output}
+        self.calls = []
+        self.set_initial_interval(0)
+        self.set_max_interval(0)
+
+    def _run(self, cmd):
+        self.calls.append(cmd)
+        return self.outputs[cmd[0]]
+
+
+class TestArrays(unittest.TestCase):
+
+    def test_expand_array_ids(self):
+        monitor = JobMonitor()
+        self.assertEqual(monitor.expand_array_ids('2001_[3-5,7%2]'), ['2001_3', '2001_4', '2001_5', '2001_7'])
+        self.assertEqual(monitor.expand_array_ids('2001_[0-6:3]'), ['2001_0', '2001_3', '2001_6'])
+        self.assertEqual(monitor.expand_array_ids('2001_3'), ['2001_3'])
+        self.assertEqual(monitor.expand_array_ids('1001'), ['1001'])
+
+    def test_query(self):
+        monitor = _RecordedMonitor(_read_fixture('sacct_array.txt'), _read_fixture('squeue_array.txt'))
+        records = monitor.query(['2001_1', '2001_2', '2001_4', '2001_7'])
+        self.assertEqual({job_id: record['state'] for job_id, record in records.items()},
+                         {'2001_1': 'COMPLETED', '2001_2': 'RUNNING', '2001_4': 'PENDING', '2001_7': 'PENDING'})
+        self.assertEqual(records['2001_1']['accounting']['max_rss'], 512 * 1024 ** 2)
+        # Array tasks are requested one per line
+        self.assertIn('--array', monitor.calls[0])
+        self.assertEqual(len(monitor.calls), 1)
+
+    def test_pending_array(self):
+        # sacct does not know the tasks yet, squeue still lists the array
+        monitor = _RecordedMonitor('', '2001_[9-10]|PENDING|0:00|\n')
+        records = monitor.query(['2001_4', '2001_9'])
+        self.assertEqual(records['2001_9']['state'], 'PENDING')
+        self.assertEqual(records['2001_4']['state'], 'PENDING')
+        self.assertIn('-r', monitor.calls[1])
+        self.assertIn('2001', monitor.calls[1][monitor.calls[1].index('-j') + 1].split(','))
+
+    def test_wait(self):
+        monitor = _RecordedMonitor(_read_fixture('sacct_array.txt'), '')
+        monitor.set_max_empty_polls(3)
+        records = monitor.wait(['2001_1', '2001_8'])
+        self.assertEqual(records['2001_1']['state'], 'COMPLETED')
+        # Neither sacct nor squeue know the task
+        self.assertEqual(records['2001_8']['state'], 'UNKNOWN')
+        self.assertEqual(len([cmd for cmd in monitor.calls if cmd[0] == 'sacct']), 3)
+
+    def test_wait_fallback(self):
+        monitor = _RecordedMonitor('', '')
+        records = monitor.wait(['3001'], {'3001': 'FAILED'})
+        self.assertEqual(records['3001']['state'], 'FAILED')
+
+
+if __name__ == '__main__':
+    unittest.main()
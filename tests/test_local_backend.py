@@ -0,0 +1,83 @@
+"""
+Execution of job scripts by the local backend. The jobs run in a temporary directory.
+Run with 'python -m pytest tests' or 'python -m unittest discover tests' from the root of
+the repository.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from backend.local_backend import LocalBackend
+
+
+class TestLocalBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.wrk_dir = tempfile.mkdtemp(prefix='lassi_test_')
+        os.chdir(self.wrk_dir)
+        self.backend = LocalBackend()
+        self.backend._pool = None
+        self.backend._futures = {}
+        self.backend._records = {}
+        self.backend.set_max_workers(2)
+
+    def tearDown(self):
+        if self.backend._pool is not None:
+            self.backend._pool.shutdown()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.wrk_dir)
+
+    def _write_script(self, name, body, sbatch=()):
+        """
+        Write a job script with the given '#SBATCH' options
+        :return: Name of the script
+        """
+        with open(name, 'w') as file:
+            file.write('#!/bin/bash\n')
+            for option in sbatch:
+                file.write('#SBATCH ' + option + '\n')
+            file.write(body + '\n')
+        return name
+
+    def _read_output(self, job_id):
+        with open(os.path.join(self.wrk_dir, 'slurm-' + job_id + '.out')) as file:
+            return file.read()
+
+    def test_submit(self):
+        job_id, state = self.backend.submit(self._write_script('ok.sh', 'echo "Time: 1.5 s"', ['-n 1', '-c 1']),
+                                            False)
+        self.assertEqual(state, 'COMPLETED')
+        output = self._read_output(job_id)
+        self.assertIn('Time: 1.5 s', output)
+        self.assertIn('State: COMPLETED (exit code 0)', output)
+        record = self.backend.query([job_id])[job_id]
+        self.assertEqual(record['exit_code'], '0:0')
+        self.assertEqual(record['accounting']['alloc_cpus'], 1)
+        # The cores of the finished job are free again
+        self.assertEqual(self.backend._free_cores, self.backend._get_available_cores())
+
+    def test_failed_job(self):
+        job_id, state = self.backend.submit(self._write_script('fail.sh', 'exit 3'), False)
+        self.assertEqual(state, 'FAILED')
+        self.assertIn('State: FAILED (exit code 3)', self._read_output(job_id))
+        self.assertEqual(self.backend.wait(['0'])['0']['state'], 'UNKNOWN')
+
+    def test_job_array(self):
+        job_id, state = self.backend.submit(self._write_script('array.sh', 'echo "Task $SLURM_ARRAY_TASK_ID"',
+                                                               ['--array=0-1,5']), True)
+        self.assertEqual(state, '')
+        job_ids = [job_id + '_' + str(task_id) for task_id in [0, 1, 5]]
+        records = self.backend.wait(job_ids)
+        for task_id, array_job_id in zip([0, 1, 5], job_ids):
+            self.assertEqual(records[array_job_id]['state'], 'COMPLETED')
+            self.assertIn('Task ' + str(task_id), self._read_output(array_job_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
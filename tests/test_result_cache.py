@@ -0,0 +1,87 @@
+"""
+Keys, lookups and invalidation of the result cache. The cache is created in a temporary
+directory. Run with 'python -m pytest tests' or 'python -m unittest discover tests' from
+the root of the repository.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from batch_data import BatchFileData
+from result_cache import ResultCache
+from src_data import SrcData
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='lassi_test_')
+        self.cache = ResultCache()
+        self.cache._cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.cache._index = None
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _store(self, key, job_id):
+        """
+        Store a job with a dummy output file in the cache
+        """
+        output_file = os.path.join(self.tmp_dir, 'slurm-' + job_id + '.out')
+        with open(output_file, 'w') as file:
+            file.write('Time: 1.5 s\n')
+        self.cache.store(key, job_id, output_file)
+
+    def test_key(self):
+        batch_data = BatchFileData()
+        src_data = SrcData()
+        src_data._compiler_flags = ['-O2']
+        keys = [self.cache.compute_key(self.cache.describe(batch_data, src_data))]
+        # Measurements of another partition, system or time limit are not reused
+        for attribute, value in [('_partition', 'fat'), ('_system_name', 'other'), ('_time', 30)]:
+            setattr(batch_data, attribute, value)
+            keys.append(self.cache.compute_key(self.cache.describe(batch_data, src_data)))
+        self.assertEqual(len(set(keys)), 4)
+        self.assertEqual(keys[-1], self.cache.compute_key(self.cache.describe(batch_data, src_data)))
+
+    def test_store_and_lookup(self):
+        self._store('abc1', '11')
+        self._store('abc1', '12')
+        self._store('abc1', '12')
+        jobs = self.cache.lookup('abc1')
+        self.assertEqual([job_id for cache_dir, job_id in jobs], ['11', '12'])
+        self.assertTrue(os.path.isfile(os.path.join(jobs[0][0], 'slurm-11.out')))
+        self.assertEqual(self.cache.lookup('xyz'), [])
+
+    def test_invalidate(self):
+        self._store('abc1', '11')
+        self._store('abd2', '21')
+        self._store('xyz3', '31')
+        # The prefix matches two configurations, nothing is removed
+        with self.assertRaises(SystemExit):
+            self.cache.invalidate('ab')
+        self.assertEqual(len(self.cache.lookup('abc1')), 1)
+
+        self.assertEqual(self.cache.invalidate('abd'), 1)
+        self.assertEqual(self.cache.lookup('abd2'), [])
+        self.assertFalse(os.path.isdir(os.path.join(self.cache.get_cache_dir(), 'abd2')))
+        self.assertEqual(self.cache.invalidate(), 2)
+        self.assertEqual(self.cache.lookup('abc1'), [])
+
+    def test_evict(self):
+        self.cache._max_entries = 2
+        for key in ['k1', 'k2', 'k3']:
+            self._store(key, '1')
+        self.cache.lookup('k1')
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(self.cache.lookup('k2'), [])
+        self.assertEqual(len(self.cache.lookup('k1')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
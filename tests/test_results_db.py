@@ -0,0 +1,67 @@
+"""
+Jobs, values and lookups of the results database. The database is created in a temporary
+directory. Run with 'python -m pytest tests' or 'python -m unittest discover tests' from
+the root of the repository.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from results_db import ResultsDB
+
+
+class TestResultsDB(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='lassi_test_')
+        self.db = ResultsDB()
+        self.db._db_name = os.path.join(self.tmp_dir, 'results.db')
+        self.db._connection = None
+        self.sweep_id = self.db.start_sweep('omp_scalability', {'name': 'test'})
+
+    def tearDown(self):
+        self.db._connection.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _record(self, job_id, job_dir, if_missing=False, accounting=None):
+        job = {'id': job_id, 'dir': job_dir, 'test_case': 4, 'config_hash': 'abc', 'config': {}}
+        self.db.record_job(self.sweep_id, 'omp_scalability', job, 'COMPLETED', 'node1', accounting, if_missing)
+
+    def _store(self, job_id, job_dir, values, perf_regex='Time'):
+        self.db.store_values([{'job_id': job_id, 'dir': job_dir, 'values': values, 'error': None}],
+                             perf_regex, False)
+
+    def _count(self, table):
+        return self.db._connect().execute('SELECT COUNT(*) FROM ' + table).fetchone()[0]
+
+    def test_values_are_appended(self):
+        self._record('1', '/wrk/a')
+        self._record('1', '/wrk/b')
+        self._store('1', '/wrk/a', [1.0, 2.0])
+        self._store('1', '/wrk/a', [3.0])
+        self._store('1', '/wrk/a', [4.0], perf_regex='Other')
+        # Values of jobs that are not in the database are not stored
+        self._store('2', '/wrk/a', [5.0])
+        self.assertEqual(self._count('job_values'), 3)
+
+        # The latest values of the same job ID and directory extracted with the same regex
+        values = self.db.lookup_values([('1', '/wrk/a'), ('1', '/wrk/b'), ('2', '/wrk/a')], 'Time', False)
+        self.assertEqual(values, {('1', '/wrk/a'): [3.0]})
+        self.assertEqual(self.db.lookup_values([('1', '/wrk/a')], 'Time', True), {})
+
+    def test_cached_jobs_are_not_duplicated(self):
+        self._record('1', '/wrk/a', accounting={'max_rss': 10})
+        self._record('1', '/wrk/a', if_missing=True)
+        self._record('2', '/wrk/a', if_missing=True)
+        self.assertEqual(self._count('jobs'), 2)
+        self.assertEqual(self.db.lookup_accounting([('1', '/wrk/a'), ('2', '/wrk/a')]),
+                         {('1', '/wrk/a'): {'max_rss': 10}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Statistics of the repeated measurements. Run with 'python -m pytest tests' or
+'python -m unittest discover tests' from the root of the repository.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from report import stats
+
+
+class TestStats(unittest.TestCase):
+
+    def test_aggregate(self):
+        values = [3.0, 1.0, 2.0, 10.0]
+        self.assertEqual(stats.aggregate(values, 'mean'), 4.0)
+        self.assertEqual(stats.aggregate(values, 'median'), 2.5)
+        self.assertEqual(stats.aggregate(values, 'min'), 1.0)
+
+    def test_reduce_output(self):
+        values = [100.0, 2.0, 3.0, 10.0]
+        self.assertEqual(stats.reduce_output(values, only_last=True), 10.0)
+        self.assertEqual(stats.reduce_output(values, warmup=1, statistic='median'), 3.0)
+        # All values are used if there are not more values than warm-up ones
+        self.assertEqual(stats.reduce_output([4.0], warmup=1), 4.0)
+
+    def test_reject_outliers(self):
+        values = [10.0, 10.1, 9.9, 10.2, 9.8, 30.0]
+        for method in ['mad', 'iqr']:
+            self.assertEqual(list(stats.reject_outliers(values, method)), [True] * 5 + [False])
+        self.assertTrue(all(stats.reject_outliers(values, 'none')))
+        self.assertTrue(all(stats.reject_outliers([1.0, 100.0], 'mad')))
+        # More than half of the values are equal, the MAD is zero
+        self.assertEqual(list(stats.reject_outliers([5.0, 5.0, 5.0, 5.0, 50.0], 'mad')), [True] * 4 + [False])
+
+    def test_summarize(self):
+        summary = stats.summarize([50.0, 10.0, 10.1, 9.9, 10.2, 9.8, 30.0], 'median', 'mad', warmup=1)
+        self.assertEqual(summary['num_values'], 5)
+        self.assertEqual(summary['num_rejected'], 2)
+        self.assertEqual(summary['value'], 10.0)
+        self.assertEqual((summary['min'], summary['max']), (9.8, 10.2))
+        self.assertTrue(summary['ci_low'] <= summary['value'] <= summary['ci_high'])
+        # The bootstrap is seeded, so reports are reproducible
+        self.assertEqual(summary, stats.summarize([50.0, 10.0, 10.1, 9.9, 10.2, 9.8, 30.0], 'median', 'mad',
+                                                  warmup=1))
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_numpy_is_not_imported(self):
+        # numpy is only imported when measurements are summarized
+        code = 'import sys; import main; print(\'numpy\' in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], cwd=_root_dir, capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Journal of a sweep and its replay on resume. The journal is written to a temporary
+directory. Run with 'python -m pytest tests' or 'python -m unittest discover tests' from
+the root of the repository.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from sweep_state import SweepState
+
+
+class TestSweepState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix='lassi_test_')
+        self.file_name = os.path.join(self.tmp_dir, 'sweep_state_omp_scalability.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _job(self, job_id, test_case, config_hash='abc'):
+        return {'id': job_id, 'dir': '/wrk/run' + str(test_case), 'config_hash': config_hash,
+                'test_case': test_case, 'submitted_at': 100.0}
+
+    def _interrupted_run(self):
+        """
+        Journal of a run that was killed while writing a line
+        """
+        state = SweepState()
+        state.open(self.file_name, 'omp_scalability', 'config.json')
+        state.plan('abc', 4, 3)
+        for job_id, state_name in [('1', 'COMPLETED'), ('2', 'FAILED'), ('3', None)]:
+            job = self._job(job_id, 4)
+            state.submit(job)
+            if state_name is not None:
+                state.finish(job, state_name, [1.5] if state_name == 'COMPLETED' else [])
+        state.submit(self._job('4', 8))
+        with open(self.file_name, 'a') as file:
+            file.write('{"event": "finish", "job_id": "4", "sta')
+
+    def test_resume(self):
+        self._interrupted_run()
+        state = SweepState()
+        state.open(self.file_name, 'omp_scalability', 'config.json', resume=True)
+
+        # Completed and unfinished jobs are reused, failed ones are submitted again
+        jobs = state.take_jobs('abc', 4)
+        self.assertEqual([(job['id'], job['state'], job['values']) for job in jobs],
+                         [('1', 'COMPLETED', [1.5]), ('3', None, None)])
+        self.assertEqual(jobs[0]['submitted_at'], 100.0)
+        # Every job is returned only once
+        self.assertEqual(state.take_jobs('abc', 4), [])
+        # The incomplete last line is ignored
+        self.assertEqual([job['id'] for job in state.take_jobs('abc', 8)], ['4'])
+        # The configuration was changed
+        self.assertEqual(state.take_jobs('xyz', 4), [])
+
+        # New events are appended to the journal, after the incomplete line
+        with open(self.file_name) as file:
+            self.assertEqual(json.loads(file.readlines()[-1])['event'], 'start')
+
+    def test_start_from_scratch(self):
+        self._interrupted_run()
+        state = SweepState()
+        state.open(self.file_name, 'omp_scalability', 'config.json')
+        self.assertEqual(state.take_jobs('abc', 4), [])
+        with open(self.file_name) as file:
+            self.assertEqual(len(file.readlines()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
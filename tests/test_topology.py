@@ -0,0 +1,51 @@
+"""
+Discovery of the node topology from a recorded sysfs snapshot and the output of
+'lscpu -p' in tests/fixtures. Run with 'python -m pytest tests' or
+'python -m unittest discover tests' from the root of the repository.
+"""
+import os
+import sys
+import unittest
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root_dir)
+
+from systeminfo import SystemInfo
+
+_fixtures_dir = os.path.join(_root_dir, 'tests', 'fixtures')
+
+
+class TestTopology(unittest.TestCase):
+
+    _expected = {
+        'cpus': 8,
+        'cores': 4,
+        'sockets': 2,
+        'threads_per_core': 2,
+        'numa_domains': 2,
+        'llc_groups': 2,
+        'cores_per_socket': 2,
+        'cores_per_numa': 2,
+        'cores_per_llc': 2,
+    }
+
+    def test_sysfs(self):
+        system_info = SystemInfo()
+        cpus = system_info.read_sysfs_topology(os.path.join(_fixtures_dir, 'sysfs'))
+        self.assertEqual([cpu['cpu'] for cpu in cpus], list(range(8)))
+        self.assertEqual(cpus[4]['core'], cpus[0]['core'])
+        self.assertEqual(cpus[2]['llc'], '2-3,6-7')
+        self.assertEqual(system_info.summarize_topology(cpus), self._expected)
+
+    def test_lscpu(self):
+        system_info = SystemInfo()
+        topology = system_info.discover_topology(os.path.join(_fixtures_dir, 'lscpu.txt'))
+        self.assertEqual(topology, self._expected)
+        self.assertEqual(system_info.get_aligned_points(topology), [1, 2, 4])
+
+    def test_cpu_list(self):
+        self.assertEqual(SystemInfo().parse_cpu_list('0-2,8,10-11\n'), [0, 1, 2, 8, 10, 11])
+
+
+if __name__ == '__main__':
+    unittest.main()
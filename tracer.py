@@ -0,0 +1,158 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+import io_manager
+
+
+class Tracer:
+    """
+    Timed spans of the phases of a sweep: copying the sources, generating and submitting
+    job scripts, waiting in the queue, running the jobs, parsing the outputs and plotting.
+    The spans are written as a Chrome trace (JSON, can be opened with Perfetto or
+    chrome://tracing) and summarized in a table at the end of the run. The state is
+    stored in class attributes, so spans of all objects end up in the same trace.
+    """
+    # Spans, dictionaries with 'name', 'start', 'end' (seconds since the epoch), 'lane'
+    # (see _lanes) and 'args' keys
+    _spans = []
+    # Names of the rows of the trace: LAsSI itself and one row per job
+    _lanes = ['lassi']
+    _lock = threading.Lock()
+
+    # Spans of the jobs, their time is not spent by LAsSI
+    _job_spans = ['queue_wait', 'job_run']
+
+    def get_spans(self):
+        """
+        :return: List of recorded spans
+        """
+        return self._spans
+
+    def reset(self):
+        """
+        Remove all recorded spans
+        :return: None
+        """
+        with self._lock:
+            del self._spans[:]
+            del self._lanes[1:]
+
+    def add_span(self, name, start, end, args=None, lane=0):
+        """
+        Record a span that was timed elsewhere
+        :param name: Name of the phase
+        :param start: Start time in seconds since the epoch
+        :param end: End time in seconds since the epoch
+        :param args: Dictionary with details of the span, e.g. a file name
+        :param lane: Index of the row of the trace
+        :return: None
+        """
+        with self._lock:
+            self._spans.append({'name': name, 'start': start, 'end': end, 'lane': lane, 'args': args or {}})
+
+    @contextlib.contextmanager
+    def span(self, name, args=None):
+        """
+        Time the enclosed block, e.g. 'with Tracer().span('plot'): ...'
+        :param name: Name of the phase
+        :param args: Dictionary with details of the span
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.time(), args)
+
+    def add_job(self, job_id, submit_time, start_time, end_time):
+        """
+        Record the time a job waited in the queue and the time it ran. Times that are
+        not known (e.g. of jobs taken from the result cache) are None, then the
+        corresponding span is not recorded.
+        :param job_id: Job ID
+        :param submit_time: Time the job was submitted, in seconds since the epoch
+        :param start_time: Time the job started
+        :param end_time: Time the job ended
+        :return: None
+        """
+        if start_time is None:
+            return
+        with self._lock:
+            self._lanes.append('job ' + str(job_id))
+            lane = len(self._lanes) - 1
+        if submit_time is not None and submit_time <= start_time:
+            self.add_span('queue_wait', submit_time, start_time, {'job_id': str(job_id)}, lane)
+        if end_time is not None and start_time <= end_time:
+            self.add_span('job_run', start_time, end_time, {'job_id': str(job_id)}, lane)
+
+    def summarize(self):
+        """
+        :return: List of dictionaries with 'name', 'count', 'total', 'mean' and 'max' (seconds)
+                 keys, one per phase in the order of the first span of the phase
+        """
+        phases = {}
+        for span in sorted(self._spans, key=lambda span: span['start']):
+            duration = span['end'] - span['start']
+            phase = phases.setdefault(span['name'], {'name': span['name'], 'count': 0, 'total': 0.0, 'max': 0.0})
+            phase['count'] += 1
+            phase['total'] += duration
+            phase['max'] = max(phase['max'], duration)
+        for phase in phases.values():
+            phase['mean'] = phase['total'] / phase['count']
+        return list(phases.values())
+
+    def write(self, file_name):
+        """
+        Write the spans in the Chrome trace event format
+        :param file_name: Name of the output file
+        :return: None
+        """
+        origin = min([span['start'] for span in self._spans], default=0.0)
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': 'LAsSI'}}]
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': lane, 'args': {'name': name}}
+                   for lane, name in enumerate(self._lanes)]
+        events += [{
+            'name': span['name'],
+            'cat': 'job' if span['name'] in self._job_spans else 'lassi',
+            'ph': 'X',
+            'ts': (span['start'] - origin) * 1e6,
+            'dur': (span['end'] - span['start']) * 1e6,
+            'pid': 1,
+            'tid': span['lane'],
+            'args': span['args'],
+        } for span in self._spans]
+        with open(file_name, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    def report(self, file_name):
+        """
+        Write the trace and print the summary of the phases. The time the jobs spent in the
+        queue is reported separately from their run time.
+        :param file_name: Name of the trace file
+        :return: None
+        """
+        if not self._spans:
+            return
+        self.write(file_name)
+        io_manager.print_dbg_info('Trace is written to ' + os.path.abspath(file_name))
+
+        summary = self.summarize()
+        io_manager.print_prefix('Phases:', ' ')
+        io_manager.print_info('', '')
+        io_manager.print_info('{0:<24} {1:>8} {2:>12} {3:>12} {4:>12}'.format('phase', 'count', 'total, [s]',
+                                                                               'mean, [s]', 'max, [s]'))
+        for phase in summary:
+            io_manager.print_info('{0:<24} {1:>8} {2:>12.3f} {3:>12.3f} {4:>12.3f}'.format(
+                phase['name'], phase['count'], phase['total'], phase['mean'], phase['max']))
+
+        totals = {phase['name']: phase['total'] for phase in summary}
+        queue_wait = totals.get('queue_wait', 0.0)
+        job_run = totals.get('job_run', 0.0)
+        if queue_wait + job_run > 0:
+            io_manager.print_info('Queue overhead: ' + '{0:.3f}'.format(queue_wait) + ' s in the queue vs '
+                                  + '{0:.3f}'.format(job_run) + ' s of application run time ('
+                                  + '{0:.1f}'.format(100 * queue_wait / (queue_wait + job_run))
+                                  + '% of the job time is spent in the queue)')
+        io_manager.print_info('')
@@ -0,0 +1,128 @@
+import fcntl
+import fnmatch
+import json
+import os
+import shutil
+
+import io_manager
+
+
+class Workspace:
+    """
+    Populate the directories of the test cases. Instead of copying the whole source tree
+    into every run directory, immutable files can be shared via hardlinks, reflinks or
+    symlinks. Files that are written by the application (see get_writable_patterns())
+    are always copied, so the shared inputs are never modified.
+    """
+    _known_modes = ['copy', 'hardlink', 'reflink', 'symlink']
+    _mode = 'copy'
+    _writable_patterns = []
+
+    # ioctl request to clone a file on Linux (FICLONE from linux/fs.h)
+    _ficlone = 0x40049409
+
+    def read_config(self, config_file_name):
+        """
+        Read JSON config file
+        :param config_file_name: Name of the config file
+        """
+        f = open(config_file_name)
+        data = json.load(f)
+        f.close()
+
+        self.set_mode(data['test_setup'].get('workspace_mode', self._mode))
+        self.set_writable_patterns(data['test_setup'].get('workspace_writable', self._writable_patterns))
+
+    def get_mode(self):
+        """
+        :return: The way files are shared: 'copy', 'hardlink', 'reflink' or 'symlink'
+        """
+        return self._mode
+
+    def set_mode(self, mode):
+        """
+        Set the way files are shared. Exit on failure.
+        :param mode: One of 'copy', 'hardlink', 'reflink' or 'symlink'
+        :return: None
+        """
+        if mode not in self._known_modes:
+            io_manager.print_err_info('Unknown workspace mode \'' + str(mode) + '\'. Known modes: ',
+                                      self._known_modes)
+            exit(1)
+        self._mode = mode
+
+    def get_writable_patterns(self):
+        """
+        :return: List of glob patterns of files that are modified by the application
+        """
+        return self._writable_patterns
+
+    def set_writable_patterns(self, patterns):
+        """
+        Set glob patterns of files that are modified by the application
+        :param patterns: List of glob patterns, matched against paths relative to the source root
+        :return: None
+        """
+        self._writable_patterns = patterns
+
+    def is_writable(self, rel_path):
+        """
+        :param rel_path: Path relative to the root of the source tree
+        :return: True if the file should be copied, because the application writes to it
+        """
+        for pattern in self.get_writable_patterns():
+            if fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(os.path.basename(rel_path), pattern):
+                return True
+        return False
+
+    def _reflink(self, src, dst):
+        """
+        Clone the file, the data blocks are shared until one of the files is modified
+        :return: None
+        """
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            fcntl.ioctl(dst_file.fileno(), self._ficlone, src_file.fileno())
+        shutil.copystat(src, dst)
+
+    def populate_file(self, src, dst, writable=False):
+        """
+        Make a file available in the run directory. Falls back to copying if the file
+        cannot be shared, e.g. if the file systems differ.
+        :param src: Full path to the source file
+        :param dst: Full path to the destination file
+        :param writable: True if the application writes to the file
+        :return: None
+        """
+        if os.path.lexists(dst):
+            os.remove(dst)
+
+        mode = 'copy' if writable else self.get_mode()
+        try:
+            if mode == 'hardlink':
+                os.link(src, dst)
+            elif mode == 'reflink':
+                self._reflink(src, dst)
+            elif mode == 'symlink':
+                os.symlink(os.path.abspath(src), dst)
+            else:
+                shutil.copy2(src, dst)
+        except OSError:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            shutil.copy2(src, dst)
+
+    def populate_tree(self, src, dst):
+        """
+        Recreate the directory structure of 'src' in 'dst' and populate it with files
+        :param src: Full path to the source tree
+        :param dst: Full path to the destination directory
+        :return: None
+        """
+        for root, dirs, files in os.walk(src, followlinks=True):
+            rel_root = os.path.relpath(root, src)
+            dst_root = os.path.normpath(os.path.join(dst, rel_root))
+            os.makedirs(dst_root, exist_ok=True)
+            for file_name in files:
+                rel_path = os.path.normpath(os.path.join(rel_root, file_name))
+                self.populate_file(os.path.join(root, file_name), os.path.join(dst_root, file_name),
+                                   self.is_writable(rel_path))